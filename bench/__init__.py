@@ -0,0 +1,32 @@
+"""
+Benchmarks for the static site generator.
+
+Run them from the repository root as modules:
+
+    python3 -m bench            full suite on a synthetic corpus, JSON output
+    python3 -m bench.corpus     write a synthetic corpus to a directory
+    python3 -m bench.inline     inline lexer vs. the chained split_nodes_*
+    python3 -m bench.blocks     block classifier throughput
+
+Importing this package puts src/ on sys.path, the same way the unittest
+runner does with `discover -s src`.
+"""
+import os, sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+def best_of(function, repeat):
+    """
+    Returns the fastest of `repeat` timed calls to function, in seconds.
+    """
+    import time
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
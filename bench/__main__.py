@@ -0,0 +1,131 @@
+"""
+Runs the benchmark suite on a synthetic corpus and prints the results as
+JSON, so runs from different commits can be compared.
+
+    python3 -m bench --pages 500 --output bench_output.json
+    python3 -m bench --pages 500 --compare bench_output.json
+"""
+import argparse, contextlib, io, json, os, platform, subprocess, sys, tempfile
+
+from bench import best_of
+from bench.corpus import generate_corpus, parse_mix
+from markdown_conversion import markdown_to_blocks, block_to_block_type, text_to_textnodes, markdown_to_html_node
+from markdown_enums import BlockType
+import main as site
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def result(seconds, items, unit):
+    return {"seconds": seconds, "items": items, "unit": unit, "per_second": items / seconds if seconds else None}
+
+def read_corpus(files):
+    documents = []
+    for path in files:
+        with open(path, "r") as f:
+            documents.append(f.read())
+    return documents
+
+def bench_functions(documents, repeat):
+    results = {}
+
+    blocks = []
+    seconds = best_of(lambda: [markdown_to_blocks(document) for document in documents], repeat)
+    for document in documents:
+        blocks.extend(markdown_to_blocks(document))
+    results["markdown_to_blocks"] = result(seconds, sum(len(document) for document in documents), "chars")
+
+    seconds = best_of(lambda: [block_to_block_type(block) for block in blocks], repeat)
+    results["block_to_block_type"] = result(seconds, len(blocks), "blocks")
+
+    paragraphs = [block for block in blocks if block_to_block_type(block) == BlockType.PARAGRAPH]
+    seconds = best_of(lambda: [text_to_textnodes(block) for block in paragraphs], repeat)
+    results["text_to_textnodes"] = result(seconds, sum(len(block) for block in paragraphs), "chars")
+
+    seconds = best_of(lambda: [markdown_to_html_node(document).to_html() for document in documents], repeat)
+    results["markdown_to_html"] = result(seconds, sum(len(document) for document in documents), "chars")
+
+    return results
+
+def bench_build(root, pages, jobs):
+    """
+    Times main.main() in the corpus directory: a cold build, a rebuild with
+    nothing changed, and a rebuild after editing one page.
+    """
+    results = {}
+    previous_dir = os.getcwd()
+    os.chdir(root)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["build_cold"] = result(best_of(lambda: site.main("/", jobs=jobs), 1), pages, "pages")
+            results["build_unchanged"] = result(best_of(lambda: site.main("/", jobs=jobs), 1), pages, "pages")
+            with open(os.path.join("content", "index.md"), "a") as f:
+                f.write("\nOne more edited line.\n")
+            results["build_one_edit"] = result(best_of(lambda: site.main("/", jobs=jobs), 1), 1, "pages")
+    finally:
+        os.chdir(previous_dir)
+    return results
+
+def compare(old, new):
+    lines = [f"{'benchmark':<22} {'old s':>10} {'new s':>10} {'change':>8}"]
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if old_result is None:
+            continue
+        change = new_result["seconds"] / old_result["seconds"] - 1
+        lines.append(f"{name:<22} {old_result['seconds']:>10.4f} {new_result['seconds']:>10.4f} {change:>+7.1%}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--mix", type=parse_mix, default=None)
+    parser.add_argument("--blocks", type=int, default=30)
+    parser.add_argument("--large-pages", type=int, default=1)
+    parser.add_argument("--large-page-mb", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", metavar="JSON", help="print the change against an earlier results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        files = generate_corpus(root, args.pages, args.mix, args.blocks, args.large_pages, int(args.large_page_mb * 1_000_000), args.seed)
+        documents = read_corpus(files)
+        results = bench_functions(documents, args.repeat)
+        results.update(bench_build(root, len(files), args.jobs))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "corpus": {
+                "pages": len(files),
+                "bytes": sum(len(document.encode("utf-8")) for document in documents),
+                "mix": args.mix,
+                "blocks_per_page": args.blocks,
+                "large_pages": args.large_pages,
+                "seed": args.seed,
+            },
+            "jobs": args.jobs,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print(compare(json.load(f), report), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures blocks classified per second by block_to_block_type, compared
+with the original cascade of is_* regex checks.
+
+    python3 -m bench.blocks --blocks 20000
+"""
+import argparse, random
+
+from bench import best_of
+from markdown_conversion import block_to_block_type, is_header, is_codeblock, is_quoteblock, is_unordered_list, is_ordered_list
+from markdown_enums import BlockType
+
+def cascade_block_to_block_type(block):
+    if is_header(block):
+        return BlockType.HEADING
+    elif is_codeblock(block):
+        return BlockType.CODE
+    elif is_quoteblock(block):
+        return BlockType.QUOTE
+    elif is_unordered_list(block):
+        return BlockType.UNORDERED_LIST
+    elif is_ordered_list(block):
+        return BlockType.ORDERED_LIST
+    elif is_ordered_list(block):
+        return BlockType.ORDERED_LIST
+    else:
+        return BlockType.PARAGRAPH
+
+def sample_blocks(count, seed=0):
+    """
+    A mix of block types in roughly the proportions of a blog post.
+    """
+    rng = random.Random(seed)
+    sentence = "The quick **brown** fox jumps over the _lazy_ dog and [a link](/x)."
+    makers = [
+        (40, lambda: "\n".join(sentence for _ in range(rng.randint(1, 6)))),
+        (20, lambda: "#" * rng.randint(1, 3) + " A heading about things"),
+        (15, lambda: "\n".join(f"- {sentence}" for _ in range(rng.randint(2, 8)))),
+        (10, lambda: "\n".join(f"{i + 1}. {sentence}" for i in range(rng.randint(2, 8)))),
+        (10, lambda: "```\n" + "\n".join("print('code')" for _ in range(rng.randint(2, 12))) + "\n```"),
+        (5, lambda: "\n".join(f"> {sentence}" for _ in range(rng.randint(1, 4)))),
+    ]
+    weights = [weight for weight, _ in makers]
+    return [rng.choices(makers, weights)[0][1]() for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = sample_blocks(args.blocks)
+    for block in blocks:
+        if block_to_block_type(block) != cascade_block_to_block_type(block):
+            raise Exception(f"classifiers disagree on {block!r}")
+
+    before = best_of(lambda: [cascade_block_to_block_type(block) for block in blocks], args.repeat)
+    after = best_of(lambda: [block_to_block_type(block) for block in blocks], args.repeat)
+    print(f"{'classifier':<10} {'blocks/s':>12}")
+    print(f"{'before':<10} {len(blocks) / before:>12,.0f}")
+    print(f"{'after':<10} {len(blocks) / after:>12,.0f}")
+    print(f"speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
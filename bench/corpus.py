@@ -0,0 +1,164 @@
+"""
+Generates synthetic markdown corpora for the benchmarks.
+
+    python3 -m bench.corpus /tmp/corpus --pages 2000 --mix links=3,lists=1
+
+writes content/, static/ and template.html under the target directory, so
+it can be built by running src/main.py from there.
+"""
+import argparse, os, random
+
+KINDS = ["headings", "lists", "code", "links", "mixed"]
+DEFAULT_MIX = {"headings": 1, "lists": 1, "code": 1, "links": 1, "mixed": 2}
+
+WORDS = ("middle earth ring fellowship shire elves dwarves wizard river mountain "
+         "forest tower road journey song lore king steward council bridge").split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+class CorpusWriter():
+    """
+    Produces deterministic markdown for a given seed. Every page starts with
+    an h1 title and only uses markup the converter accepts.
+    """
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def words(self, low, high):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high)))
+
+    def sentence(self):
+        parts = [self.words(3, 8)]
+        roll = self.rng.random()
+        if roll < 0.2:
+            parts.append(f"**{self.words(1, 2)}**")
+        elif roll < 0.35:
+            parts.append(f"_{self.words(1, 2)}_")
+        elif roll < 0.45:
+            parts.append(f"`{self.rng.choice(WORDS)}()`")
+        parts.append(self.words(2, 6))
+        return " ".join(parts) + "."
+
+    def paragraph(self, sentences=4):
+        return " ".join(self.sentence() for _ in range(sentences))
+
+    def link(self, i):
+        if i % 7 == 6:
+            return f"![{self.words(1, 3)}](/images/img{i % 50}.png)"
+        return f"[{self.words(1, 3)}](/blog/post{i % 1000}/)"
+
+    def block(self, kind):
+        if kind == "headings":
+            return "#" * self.rng.randint(2, 6) + " " + self.words(2, 6)
+        if kind == "lists":
+            items = self.rng.randint(3, 12)
+            if self.rng.random() < 0.5:
+                return "\n".join(f"- {self.sentence()}" for _ in range(items))
+            return "\n".join(f"{i + 1}. {self.sentence()}" for i in range(items))
+        if kind == "code":
+            lines = [f"{self.rng.choice(WORDS)} = compute({self.rng.randint(0, 99)})" for _ in range(self.rng.randint(3, 20))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        if kind == "links":
+            return " ".join(f"{self.words(1, 4)} {self.link(i)}" for i in range(self.rng.randint(10, 60)))
+        if kind == "quote":
+            return "\n".join(f"> {self.sentence()}" for _ in range(self.rng.randint(1, 4)))
+        return self.paragraph(self.rng.randint(2, 6))
+
+    def page(self, kind, blocks=30):
+        """
+        Returns a page dominated by blocks of `kind`, with ordinary
+        paragraphs in between.
+        """
+        parts = [f"# {self.words(3, 7).title()}"]
+        for i in range(blocks):
+            if kind == "mixed":
+                parts.append(self.block(self.rng.choice(["headings", "lists", "code", "links", "quote", "paragraph"])))
+            elif i % 3 == 2:
+                parts.append(self.block("paragraph"))
+            else:
+                parts.append(self.block(kind))
+        return "\n\n".join(parts) + "\n"
+
+def parse_mix(text):
+    """
+    Parses "links=3,lists=1" into {"links": 3, "lists": 1}.
+    """
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"unknown page kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def generate_corpus(root, pages=200, mix=None, blocks_per_page=30, large_pages=0, large_page_bytes=5_000_000, seed=0):
+    """
+    Writes a synthetic site under root and returns the list of markdown
+    files it created.
+
+    :param pages: Number of regular pages
+    :param mix: {kind: weight} for the regular pages (see KINDS)
+    :param blocks_per_page: Blocks in each regular page
+    :param large_pages: Number of additional very large single pages
+    :param large_page_bytes: Approximate size of each large page
+    """
+    writer = CorpusWriter(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+
+    write_file(os.path.join(root, "template.html"), TEMPLATE)
+    write_file(os.path.join(root, "static", "index.css"), "body { margin: 0 auto; max-width: 40em; }\n")
+    write_file(os.path.join(root, "content", "index.md"), "# Synthetic Corpus\n\n" + writer.paragraph() + "\n")
+    files = [os.path.join(root, "content", "index.md")]
+
+    for i in range(pages):
+        kind = writer.rng.choices(kinds, weights)[0]
+        path = os.path.join(root, "content", kind, f"post{i}", "index.md")
+        write_file(path, writer.page(kind, blocks_per_page))
+        files.append(path)
+
+    for i in range(large_pages):
+        parts = [f"# Large Page {i}"]
+        size = 0
+        while size < large_page_bytes:
+            block = writer.block(writer.rng.choice(["headings", "lists", "code", "links", "paragraph"]))
+            parts.append(block)
+            size += len(block) + 2
+        path = os.path.join(root, "content", "large", f"page{i}", "index.md")
+        write_file(path, "\n\n".join(parts) + "\n")
+        files.append(path)
+
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--mix", type=parse_mix, default=None, help=f"weights per kind, from {', '.join(KINDS)}")
+    parser.add_argument("--blocks", type=int, default=30, help="blocks per regular page")
+    parser.add_argument("--large-pages", type=int, default=0)
+    parser.add_argument("--large-page-mb", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    files = generate_corpus(args.root, args.pages, args.mix, args.blocks, args.large_pages, int(args.large_page_mb * 1_000_000), args.seed)
+    print(f"Wrote {len(files)} pages under {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compares the single-pass inline lexer with the original chained
+split_nodes_* pipeline on link-heavy paragraphs.
+
+    python3 -m bench.inline --links 100 300 1000
+"""
+import argparse
+
+from bench import best_of
+from markdown_conversion import text_to_textnodes, split_nodes_delimiter, split_nodes_image, split_nodes_link
+from markdown_enums import TextType
+from textnode import TextNode
+
+def chained_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, '**', TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, '`', TextType.CODE)
+    nodes = split_nodes_delimiter(nodes, '_', TextType.ITALIC)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+def link_paragraph(links):
+    """
+    A paragraph of `links` links, with an image every 10 links and some
+    emphasis every 100, like a generated index or changelog page.
+    """
+    parts = []
+    for i in range(links):
+        if i % 100 == 99:
+            parts.append(f"**part {i // 100}** of _the index_")
+        if i % 10 == 9:
+            parts.append(f"see ![figure {i}](/images/fig{i}.png)")
+        parts.append(f"read [page {i}](/docs/page{i}/) for details")
+    return " ".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--links", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'links':>6} {'chained ms':>11} {'lexer ms':>9} {'speedup':>8}")
+    for links in args.links:
+        text = link_paragraph(links)
+        if text_to_textnodes(text) != chained_text_to_textnodes(text):
+            raise Exception("lexer output differs from the chained pipeline")
+        chained = best_of(lambda: chained_text_to_textnodes(text), args.repeat)
+        lexer = best_of(lambda: text_to_textnodes(text), args.repeat)
+        print(f"{links:>6} {chained * 1000:>11.2f} {lexer * 1000:>9.2f} {chained / lexer:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures memory used while converting a synthetic corpus to HTML node
+trees: tracemalloc peak, live allocated blocks and peak RSS.
+
+    python3 -m bench.memory --mb 50
+"""
+import argparse, gc, json, resource, sys, tempfile, time, tracemalloc
+
+from bench.corpus import generate_corpus
+from bench.__main__ import read_corpus
+from markdown_conversion import markdown_to_html_node
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=50.0, help="approximate corpus size in MB")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        # a regular page of 30 blocks is roughly 15 KB
+        pages = max(1, int(args.mb * 1_000_000 / 15_000))
+        documents = read_corpus(generate_corpus(root, pages, seed=args.seed))
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    start = time.perf_counter()
+    # keep every tree alive so the node representation dominates the peak
+    trees = [markdown_to_html_node(document) for document in documents]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    live_blocks = sys.getallocatedblocks() - blocks_before
+
+    report = {
+        "corpus_bytes": sum(len(document.encode("utf-8")) for document in documents),
+        "pages": len(trees),
+        "seconds": elapsed,
+        "tracemalloc_current_bytes": current,
+        "tracemalloc_peak_bytes": peak,
+        "live_allocated_blocks": live_blocks,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    json.dump(report, sys.stdout, indent=1)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+python3 src/daemon.py "$@"
\ No newline at end of file
@@ -0,0 +1 @@
+python3 src/explain.py "$@"
\ No newline at end of file
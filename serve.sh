@@ -0,0 +1 @@
+python3 src/serve.py --watch
\ No newline at end of file
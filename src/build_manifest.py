@@ -0,0 +1,257 @@
+import hashlib, json, os
+
+MANIFEST_VERSION = 1
+
+def hash_file(file_path):
+    """
+    Returns the sha256 hex digest of a file, read in chunks so large
+    sources don't have to fit in memory.
+
+    :param file_path: Path of the file to hash
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def context_hash(context):
+    if context is None:
+        return None
+    return hash_text(json.dumps(context, sort_keys=True))
+
+class BuildManifest():
+    """
+    A persistent record of the inputs that produced each generated page.
+
+    Entries are keyed by source path and remember the source hash (plus the
+    stat values it was computed from, so unchanged files are not re-hashed),
+    the output path, the hashes of the files the output depends on (such as
+    its template), a hash of any extra render context and any data recorded
+    with the page, such as its links. Global inputs such
+    as the basepath live in `inputs`; when any of them changes every page is
+    dirty.
+
+    The recorded dependencies make up the site's dependency graph: pages
+    point at their template and every partial it includes, so an edited
+    template or partial dirties exactly the pages that use it. dependents
+    and stale_reasons answer questions about it (see explain.py).
+    """
+
+    def __init__(self, path=None, inputs=None, entries=None):
+        self.path = path
+        self.inputs = inputs if inputs is not None else {}
+        self.entries = entries if entries is not None else {}
+        self.seen = set()
+        # dependency hashes computed during this build
+        self.dep_hashes = {}
+        # earlier outputs of sources recorded with new ones during this build
+        self.replaced = set()
+
+    @classmethod
+    def load(cls, path):
+        if path is None or not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"Ignoring unreadable build manifest: {path}")
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("inputs", {}), data.get("entries", {}))
+
+    def save(self):
+        if self.path is None:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "inputs": self.inputs,
+            "entries": self.entries,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def new_build(self):
+        """
+        Clears the per-build state, for manifests kept in memory across
+        several builds.
+        """
+        self.seen = set()
+        self.dep_hashes = {}
+        self.replaced = set()
+
+    def set_inputs(self, **inputs):
+        """
+        Records the global build inputs. If they differ from the ones the
+        manifest was saved with, all page entries are discarded.
+        """
+        if inputs != self.inputs:
+            self.entries = {}
+        self.inputs = inputs
+
+    def invalidate(self):
+        """
+        Marks every entry out of date, so the next build regenerates every
+        page while still removing the outputs of deleted sources.
+        """
+        for entry in self.entries.values():
+            entry["hash"] = None
+
+    def source_hash(self, source_path):
+        """
+        Returns the content hash of a source, reusing the stored hash when
+        the file's size and mtime are unchanged since it was recorded.
+        """
+        stat = os.stat(source_path)
+        entry = self.entries.get(source_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+        return hash_file(source_path)
+
+    def dep_hash(self, dep_path):
+        if dep_path not in self.dep_hashes:
+            self.dep_hashes[dep_path] = hash_file(dep_path) if os.path.exists(dep_path) else None
+        return self.dep_hashes[dep_path]
+
+    def is_current(self, source_path, dest_path, deps=(), context=None):
+        """
+        True when the page at dest_path was generated from the current
+        contents of source_path and of every file in deps, with the same
+        render context and global inputs.
+
+        :param deps: Paths of other files the output was built from
+        :param context: JSON-serializable values the output was built from
+        """
+        self.seen.add(source_path)
+        entry = self.entries.get(source_path)
+        if entry is None or entry["output"] != dest_path:
+            return False
+        if not os.path.exists(dest_path):
+            return False
+        if entry.get("context") != context_hash(context):
+            return False
+        if entry.get("deps", {}) != {dep: self.dep_hash(dep) for dep in deps}:
+            return False
+        return entry["hash"] == self.source_hash(source_path)
+
+    def stale_reasons(self, source_path, dest_path, deps=(), context=None):
+        """
+        Returns why the page would be rebuilt, as a list of messages, empty
+        when is_current holds. Unlike is_current, every input is checked
+        rather than stopping at the first change.
+        """
+        entry = self.entries.get(source_path)
+        if entry is None:
+            return ["never built"]
+        reasons = []
+        if entry["output"] != dest_path:
+            reasons.append(f"output moved from {entry['output']} to {dest_path}")
+        elif not os.path.exists(dest_path):
+            reasons.append(f"output missing: {dest_path}")
+        if entry["hash"] != self.source_hash(source_path):
+            reasons.append("source changed")
+        if entry.get("context") != context_hash(context):
+            reasons.append("render context changed (date, navigation or front matter)")
+        recorded = entry.get("deps", {})
+        for dep in deps:
+            if dep not in recorded:
+                reasons.append(f"new dependency: {dep}")
+            elif recorded[dep] != self.dep_hash(dep):
+                reasons.append(f"dependency changed: {dep}")
+        for dep in recorded:
+            if dep not in deps:
+                reasons.append(f"dependency removed: {dep}")
+        return reasons
+
+    def dependencies(self, source_path):
+        entry = self.entries.get(source_path)
+        return list(entry.get("deps", {})) if entry else []
+
+    def dependents(self, dep_path):
+        """
+        Returns the sorted sources whose outputs were built from dep_path.
+        """
+        return sorted(source_path for source_path, entry in self.entries.items() if dep_path in entry.get("deps", {}))
+
+    def record(self, source_path, dest_path, deps=(), context=None, data=None, extra_outputs=()):
+        """
+        Records that dest_path was generated from the current inputs.
+        Outputs recorded for the source before, e.g. under an old slug or
+        fingerprint, are deleted by remove_stale unless another source now
+        produces them.
+
+        :param data: Optional JSON-serializable values gathered while the
+            page was built (e.g. its links), kept until it is rebuilt
+        :param extra_outputs: Other files generated from the source, such
+            as resized images, removed along with dest_path
+        """
+        self.seen.add(source_path)
+        old_entry = self.entries.get(source_path)
+        if old_entry is not None:
+            self.replaced.update(set([old_entry["output"]] + old_entry.get("extra_outputs", []))
+                                 - set([dest_path] + list(extra_outputs)))
+        stat = os.stat(source_path)
+        entry = {
+            "hash": self.source_hash(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "output": dest_path,
+        }
+        if deps:
+            entry["deps"] = {dep: self.dep_hash(dep) for dep in deps}
+        if context is not None:
+            entry["context"] = context_hash(context)
+        if data:
+            entry["data"] = data
+        if extra_outputs:
+            entry["extra_outputs"] = list(extra_outputs)
+        self.entries[source_path] = entry
+
+    def data(self, source_path):
+        entry = self.entries.get(source_path)
+        return entry.get("data", {}) if entry else {}
+
+    def outputs(self):
+        outputs = []
+        for entry in self.entries.values():
+            outputs.append(entry["output"])
+            outputs.extend(entry.get("extra_outputs", []))
+        return outputs
+
+    def forget(self, source_path):
+        """
+        Drops the entry for source_path and returns its output path.
+        """
+        self.seen.discard(source_path)
+        entry = self.entries.pop(source_path, None)
+        return entry["output"] if entry else None
+
+    def remove_stale(self):
+        """
+        Forgets every source that was not seen during this build and deletes
+        the output that was generated from it, along with the outputs that
+        recorded sources no longer produce. Returns the deleted outputs of
+        forgotten sources.
+        """
+        removed = []
+        for source_path in sorted(set(self.entries) - self.seen):
+            entry = self.entries.pop(source_path)
+            for output in [entry["output"]] + entry.get("extra_outputs", []):
+                if os.path.exists(output):
+                    print(f"Removing stale output: {output}")
+                    os.remove(output)
+            removed.append(entry["output"])
+        # two pages may have swapped outputs
+        for output in sorted(self.replaced - set(self.outputs())):
+            if os.path.exists(output):
+                print(f"Removing stale output: {output}")
+                os.remove(output)
+        self.replaced = set()
+        return removed
@@ -0,0 +1,146 @@
+import json, time
+from contextlib import contextmanager
+
+PAGE_PHASES = ["read", "block split", "fragment cache", "block classify", "inline parse", "template", "serialize", "write"]
+
+class PageProfile():
+    """
+    Accumulates per-phase timings and byte counts while one page is built.
+    """
+    enabled = True
+
+    def __init__(self, source_path):
+        self.source_path = source_path
+        self.timings = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        # time spent in nested phases, one entry per open phase
+        self.child_time = []
+
+    def add(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times a phase. Phases may nest (e.g. reading lines while splitting
+        blocks); each phase is charged only for its own time.
+        """
+        start = time.perf_counter()
+        self.child_time.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed - self.child_time.pop())
+            if self.child_time:
+                self.child_time[-1] += elapsed
+
+    def timed_iter(self, name, iterable):
+        """
+        Yields from iterable, charging the time spent producing each item
+        to the named phase.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def write_chunks(self, chunks, f):
+        """
+        Writes chunks to f, charging the time spent producing each chunk to
+        "serialize" and the time spent writing it to "write".
+        """
+        for chunk in self.timed_iter("serialize", chunks):
+            with self.phase("write"):
+                f.write(chunk)
+
+    def to_dict(self):
+        return {
+            "source": self.source_path,
+            "total": sum(self.timings.values()),
+            "timings": self.timings,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+class NullProfile():
+    """
+    Stands in for PageProfile when profiling is off; every call is a no-op.
+    """
+    enabled = False
+
+    def add(self, phase, seconds):
+        pass
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def write_chunks(self, chunks, f):
+        for chunk in chunks:
+            f.write(chunk)
+
+class BuildProfile():
+    """
+    Collects build-level phase timings and the PageProfile results of every
+    generated page, and turns them into a JSON report and a text summary.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.pages = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def add_pages(self, page_results):
+        self.pages.extend(page for page in page_results if page is not None)
+
+    def phase_totals(self):
+        totals = {}
+        for page in self.pages:
+            for phase, seconds in page["timings"].items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def report(self):
+        return {
+            "build": self.timings,
+            "pages": len(self.pages),
+            "page_phases": self.phase_totals(),
+            "bytes_read": sum(page["bytes_read"] for page in self.pages),
+            "bytes_written": sum(page["bytes_written"] for page in self.pages),
+            "page_profiles": sorted(self.pages, key=lambda page: page["source"]),
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+    def summary(self, top=10):
+        lines = ["Build phases:"]
+        for phase, seconds in self.timings.items():
+            lines.append(f"  {phase:<16} {seconds * 1000:>10.1f} ms")
+        totals = self.phase_totals()
+        lines.append(f"Page phases ({len(self.pages)} pages, summed over workers):")
+        for phase in PAGE_PHASES:
+            if phase in totals:
+                lines.append(f"  {phase:<16} {totals[phase] * 1000:>10.1f} ms")
+        lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+        for page in sorted(self.pages, key=lambda page: page["total"], reverse=True)[:top]:
+            slowest_phase = max(page["timings"], key=page["timings"].get)
+            lines.append(f"  {page['total'] * 1000:>8.1f} ms  {page['bytes_read']:>9} B  {page['source']} (mostly {slowest_phase})")
+        return "\n".join(lines)
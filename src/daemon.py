@@ -0,0 +1,185 @@
+import argparse, json, os, socket, sys, time
+from page_template import template_cache
+
+DAEMON_SOCKET_PATH = ".build_daemon.sock"
+COMMANDS = ("build", "rebuild", "stats", "shutdown")
+
+class BuildDaemon():
+    """
+    A long-running build server. It answers JSON-line requests on a unix
+    socket, one response line per request line:
+
+        {"command": "build"}                          full incremental build
+        {"command": "rebuild", "paths": ["content/a.md"]}
+                                                      rebuild for changed inputs
+        {"command": "rebuild"}                        poll every input
+        {"command": "stats"}
+        {"command": "shutdown"}
+
+    Responses have "ok" and, on failure, "error". Between requests the
+    process keeps everything a fresh build pays for again: imported
+    modules and their compiled patterns, parsed templates, both manifests
+    and the open fragment cache, so a rebuild of one page takes
+    milliseconds.
+
+    :param watcher: The SiteWatcher holding the build state
+    """
+
+    def __init__(self, watcher, socket_path=DAEMON_SOCKET_PATH):
+        self.watcher = watcher
+        self.socket_path = socket_path
+        self.running = False
+        self.started = time.time()
+        self.requests = 0
+        self.builds = 0
+        self.last_elapsed_ms = None
+
+    def local_path(self, path):
+        # clients send absolute paths; the watcher may use relative ones
+        path = os.path.normpath(path)
+        if os.path.isabs(path) and not os.path.isabs(self.watcher.content_dir):
+            path = os.path.relpath(path)
+        return path
+
+    def handle(self, request):
+        """
+        Runs one request and returns its response dict.
+        """
+        command = request.get("command")
+        self.requests += 1
+        if command == "stats":
+            return {
+                "ok": True,
+                "uptime_s": round(time.time() - self.started, 3),
+                "requests": self.requests,
+                "builds": self.builds,
+                "pages": len(self.watcher.page_manifest.entries),
+                "templates": len(template_cache),
+                "fragment_cache": self.watcher.fragment_cache,
+                "last_elapsed_ms": self.last_elapsed_ms,
+            }
+        if command == "shutdown":
+            self.running = False
+            return {"ok": True}
+        if command not in COMMANDS:
+            raise Exception(f"unknown command: {command!r}")
+
+        start = time.perf_counter()
+        if command == "build":
+            self.watcher.build()
+            changed = None
+        elif request.get("paths"):
+            changed = self.watcher.update([self.local_path(path) for path in request["paths"]])
+        else:
+            changed = self.watcher.poll()
+        self.watcher.save()
+        self.builds += 1
+        self.last_elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+        response = {"ok": True, "elapsed_ms": self.last_elapsed_ms}
+        if changed is not None:
+            response["changed"] = changed
+        return response
+
+    def handle_connection(self, connection):
+        reader = connection.makefile("r", encoding="utf-8")
+        writer = connection.makefile("w", encoding="utf-8")
+        for line in reader:
+            if not line.strip():
+                continue
+            try:
+                response = self.handle(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            writer.write(json.dumps(response) + "\n")
+            writer.flush()
+            if not self.running:
+                break
+
+    def listen(self):
+        if os.path.exists(self.socket_path):
+            try:
+                send_request({"command": "stats"}, self.socket_path)
+            except OSError:
+                # left behind by a daemon that did not shut down
+                os.remove(self.socket_path)
+            else:
+                raise Exception(f"A build daemon is already listening on {self.socket_path}")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        return server
+
+    def serve(self, server=None):
+        """
+        Answers connections one at a time, so builds never overlap, until a
+        shutdown request. The manifests are saved and the socket removed on
+        the way out.
+
+        :param server: A socket from listen(), or None to open one
+        """
+        server = server or self.listen()
+        self.running = True
+        print(f"Build daemon listening on {self.socket_path}")
+        try:
+            while self.running:
+                connection, _ = server.accept()
+                with connection:
+                    self.handle_connection(connection)
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.watcher.save()
+
+def send_request(request, socket_path=DAEMON_SOCKET_PATH):
+    """
+    Sends one request to a running daemon and returns its response dict.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        line = client.makefile("r", encoding="utf-8").readline()
+    if not line:
+        raise Exception("The build daemon closed the connection")
+    return json.loads(line)
+
+def serve_daemon(args):
+    # imported here so the client mode starts without the build modules
+    from main import FRAGMENT_CACHE_PATH
+    from serve import SiteWatcher
+    fragment_cache = FRAGMENT_CACHE_PATH if args.fragment_cache is True else args.fragment_cache
+    watcher = SiteWatcher(args.basepath, args.jobs, fragment_cache=fragment_cache)
+    daemon = BuildDaemon(watcher, args.socket)
+    server = daemon.listen()
+    start = time.perf_counter()
+    watcher.build()
+    watcher.save()
+    print(f"Initial build in {(time.perf_counter() - start) * 1000:.1f} ms")
+    daemon.serve(server)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Run a persistent build daemon, or send it a request")
+    parser.add_argument("command", choices=("serve",) + COMMANDS,
+                        help="serve starts the daemon; the other commands are sent to a running one")
+    parser.add_argument("paths", nargs="*", help="changed inputs for rebuild (default: poll every input)")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help=f"unix socket path (default: {DAEMON_SOCKET_PATH})")
+    parser.add_argument("--basepath", default="/", help="path prefix for published links (serve only)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processes used for full page rebuilds (serve only)")
+    parser.add_argument("--fragment-cache", nargs="?", const=True, metavar="PATH",
+                        help="reuse the rendered HTML of unchanged blocks (serve only)")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    if args.command == "serve":
+        serve_daemon(args)
+        return 0
+    request = {"command": args.command}
+    if args.paths:
+        request["paths"] = [os.path.abspath(path) for path in args.paths]
+    response = send_request(request, args.socket)
+    print(json.dumps(response))
+    return 0 if response.get("ok") else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+import argparse, os, sys
+from build_manifest import BuildManifest
+from front_matter import read_front_matter, is_draft
+from markdown_conversion import page_destination, page_job
+from page_template import load_template, template_dependencies
+from main import CONTENT_DIR, TEMPLATE_PATH, DEST_DIR, PAGE_MANIFEST_PATH
+
+def graph_dependencies(manifest):
+    """
+    Returns every template and partial recorded in the manifest, sorted.
+    """
+    return sorted(set(dep for source_path in manifest.entries for dep in manifest.dependencies(source_path)))
+
+def explain_page(manifest, source_path, content_dir=CONTENT_DIR, template_path=TEMPLATE_PATH, dest_dir=DEST_DIR):
+    """
+    Describes a markdown page: its output, the files it depends on now and
+    why the next build would re-render it, if it would.
+    """
+    fields = read_front_matter(source_path)
+    if is_draft(fields):
+        return [f"{source_path}: draft, not built"]
+    dest_path = page_destination(source_path, content_dir, dest_dir, fields.get("slug"))
+    _, page_template_path, _, context = page_job(source_path, dest_path, content_dir, template_path, fields)
+    deps = template_dependencies(page_template_path)
+    lines = [f"{source_path} -> {dest_path}", "  depends on:"]
+    lines += [f"    {dep}" for dep in deps]
+    reasons = manifest.stale_reasons(source_path, dest_path, deps, context)
+    if reasons:
+        lines.append("  next build re-renders it: " + "; ".join(reasons))
+    else:
+        lines.append("  up to date")
+    return lines
+
+def explain_dependency(manifest, dep_path):
+    """
+    Describes a template or partial: the pages an edit to it re-renders and
+    the templates and partials that include it.
+    """
+    pages = manifest.dependents(dep_path)
+    included_by = [path for path in graph_dependencies(manifest)
+                   if path != dep_path and os.path.isfile(path) and dep_path in load_template(path).partials]
+    lines = [f"{dep_path}: an edit re-renders {len(pages)} page(s)"]
+    lines += [f"    {source_path}" for source_path in pages]
+    if included_by:
+        lines.append("  included by:")
+        lines += [f"    {path}" for path in included_by]
+    return lines
+
+def explain_graph(manifest):
+    """
+    Summarizes the dependency graph: every template and partial with the
+    number of pages that depend on it.
+    """
+    return [f"{dep}: {len(manifest.dependents(dep))} page(s)" for dep in graph_dependencies(manifest)]
+
+def explain(paths, manifest, content_dir=CONTENT_DIR, template_path=TEMPLATE_PATH, dest_dir=DEST_DIR):
+    """
+    Returns the explain output for a list of paths, as lines: a markdown
+    page is explained with explain_page, any other file with
+    explain_dependency. Without paths the whole graph is summarized.
+    """
+    if not manifest.entries:
+        return ["No pages in the build manifest; build the site first"]
+    if not paths:
+        return explain_graph(manifest)
+    # compare against the files as they are now
+    manifest.new_build()
+    lines = []
+    for path in paths:
+        path = os.path.normpath(path)
+        if path in manifest.entries or (path.endswith(".md") and os.path.isfile(path)):
+            lines += explain_page(manifest, path, content_dir, template_path, dest_dir)
+        elif os.path.exists(path) or manifest.dependents(path):
+            lines += explain_dependency(manifest, path)
+        else:
+            lines.append(f"{path}: not in the dependency graph")
+    return lines
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Explain which pages depend on which templates and partials, and why they rebuild")
+    parser.add_argument("paths", nargs="*", help="markdown pages, templates or partials (default: summarize the whole graph)")
+    parser.add_argument("--manifest", default=PAGE_MANIFEST_PATH, help=f"build manifest to read (default: {PAGE_MANIFEST_PATH})")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    for line in explain(args.paths, BuildManifest.load(args.manifest)):
+        print(line)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
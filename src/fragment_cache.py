@@ -0,0 +1,189 @@
+import hashlib, json, os, sqlite3, time
+from build_manifest import hash_text
+
+# modules whose code decides the HTML produced for a block
+CONVERTER_MODULES = [
+    "markdown_conversion.py",
+    "markdown_ast.py",
+    "renderers.py",
+    "markdown_enums.py",
+    "inline_lexer.py",
+    "htmlnode.py",
+    "leafnode.py",
+    "parentnode.py",
+    "textnode.py",
+    # cached HTML has its URLs rewritten and cached links come from block_links
+    "url_rewrite.py",
+    "link_index.py",
+]
+# bumped when the fragments table changes shape
+SCHEMA_VERSION = 3
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# pending writes are flushed to the database in batches of this size
+FLUSH_EVERY = 512
+
+def converter_version():
+    """
+    Returns a hash of the converter's source files, so cached fragments are
+    discarded whenever the code that rendered them changes.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in CONVERTER_MODULES:
+        with open(os.path.join(src_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class FragmentCache():
+    """
+    A persistent SQLite map from the sha256 of a raw markdown block (and the
+    render settings) to the HTML rendered for it, along with its internal
+    links and plain text.
+
+    Lookups go straight to the database; new fragments and LRU timestamps
+    are buffered and written in one transaction by flush(). Hit and miss
+    counts are stored alongside the fragments, so worker processes sharing
+    the file all contribute to the totals reported by stats().
+    """
+
+    def __init__(self, path, version=None):
+        self.path = path
+        self.pid = os.getpid()
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            # hold the write lock while checking, so worker processes opening
+            # a new cache together create its tables only once
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.check_version(f"{SCHEMA_VERSION}:{version or converter_version()}")
+        self.hits = 0
+        self.misses = 0
+        self.pending = {}
+        self.touched = set()
+
+    def check_version(self, version):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] == version:
+            return
+        if row is not None:
+            print(f"Converter changed, clearing fragment cache: {self.path}")
+        self.connection.execute("DROP TABLE IF EXISTS fragments")
+        self.connection.execute(
+            "CREATE TABLE fragments (key TEXT PRIMARY KEY, html TEXT, links TEXT, text TEXT, size INTEGER, used INTEGER)"
+        )
+        self.connection.execute("CREATE INDEX fragments_used ON fragments (used)")
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('hits', '0')")
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('misses', '0')")
+
+    def get(self, block, variant=""):
+        """
+        Returns the cached (html, links, text) for a raw block, or None.
+        links and text are the block's internal links and plain text as
+        recorded by put().
+
+        :param variant: Identifies render settings, such as the URL rewrite,
+            that change the HTML produced for the same block
+        """
+        key = hash_text(f"{variant}\0{block}")
+        fragment = self.pending.get(key)
+        if fragment is None:
+            row = self.connection.execute("SELECT html, links, text FROM fragments WHERE key = ?", (key,)).fetchone()
+            fragment = (row[0], json.loads(row[1]), row[2]) if row else None
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched.add(key)
+        return fragment
+
+    def put(self, block, html, links=(), variant="", text=""):
+        self.pending[hash_text(f"{variant}\0{block}")] = (html, list(links), text)
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered fragments, LRU timestamps and counters.
+        """
+        if not (self.pending or self.touched or self.hits or self.misses):
+            return
+        now = time.time_ns()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, html, json.dumps(links), text, len(html.encode("utf-8")), now)
+                 for key, (html, links, text) in self.pending.items()],
+            )
+            self.connection.executemany(
+                "UPDATE fragments SET used = ? WHERE key = ?",
+                [(now, key) for key in self.touched - self.pending.keys()],
+            )
+            for name, count in (("hits", self.hits), ("misses", self.misses)):
+                self.connection.execute(
+                    "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = ?", (count, name)
+                )
+        self.pending = {}
+        self.touched = set()
+        self.hits = 0
+        self.misses = 0
+
+    def evict(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Deletes the least recently used fragments until the cached HTML
+        takes at most max_bytes, and returns the number deleted.
+        """
+        self.flush()
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        evicted = []
+        for key, size in self.connection.execute("SELECT key, size FROM fragments ORDER BY used"):
+            if total <= max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        with self.connection:
+            self.connection.executemany("DELETE FROM fragments WHERE key = ?", evicted)
+        return len(evicted)
+
+    def stats(self):
+        """
+        Returns the stored (hits, misses, entries, bytes) totals.
+        """
+        self.flush()
+        counters = dict(self.connection.execute("SELECT key, value FROM meta WHERE key IN ('hits', 'misses')"))
+        entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM fragments").fetchone()
+        return (int(counters["hits"]), int(counters["misses"]), entries, size)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+open_caches = {}
+
+def open_fragment_cache(path):
+    """
+    Returns this process's FragmentCache for path, opening it on first use.
+    A connection inherited from a parent process is never reused.
+
+    :param path: Path of the SQLite cache file, or None for no cache
+    """
+    if path is None:
+        return None
+    cache = open_caches.get(path)
+    if cache is None or cache.pid != os.getpid():
+        cache = FragmentCache(path)
+        open_caches[path] = cache
+    return cache
+
+def close_fragment_caches():
+    """
+    Flushes and closes every cache opened by this process, e.g. before
+    forking worker processes, which must not share a SQLite connection.
+    """
+    for cache in open_caches.values():
+        if cache.pid == os.getpid():
+            cache.close()
+    open_caches.clear()
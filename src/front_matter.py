@@ -0,0 +1,94 @@
+import itertools, os
+
+FRONT_MATTER_DELIMITER = "---"
+TRUE_VALUES = ("true", "yes", "on")
+FALSE_VALUES = ("false", "no", "off")
+
+def parse_value(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    return value
+
+def split_front_matter(lines, source_path="<markdown>", parse=True):
+    """
+    Reads the front matter from the head of an iterable of lines, such as
+    an open file, and returns (fields, first body line number, body lines).
+    The body lines are the rest of the same iterator, so the document is
+    neither re-read nor copied.
+
+    Front matter is a block of "key: value" lines between two "---" lines
+    at the very top of the document. Quoted values are taken literally,
+    true/false (or yes/no) become booleans and # starts a comment line:
+
+        ---
+        title: "Why Tom Bombadil Was a Mistake"
+        date: 2024-03-01
+        draft: false
+        ---
+
+    :param source_path: Used in error messages
+    :param parse: Parse the fields; when False only the body is located
+        and fields is empty
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or first.rstrip("\n").strip() != FRONT_MATTER_DELIMITER:
+        return {}, 1, itertools.chain([] if first is None else [first], lines)
+
+    fields = {}
+    for number, line in enumerate(lines, 2):
+        line = line.rstrip("\n").strip()
+        if line == FRONT_MATTER_DELIMITER:
+            return fields, number + 1, lines
+        if not parse or not line or line.startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator or not key.strip():
+            raise Exception(f"{source_path}:{number}: expected 'key: value' in front matter")
+        fields[key.strip().lower()] = parse_value(value)
+    raise Exception(f"{source_path}: front matter is not closed with '{FRONT_MATTER_DELIMITER}'")
+
+def read_front_matter(source_path):
+    """
+    Returns the front matter fields of a markdown file, reading only the
+    front matter itself.
+    """
+    with open(source_path, "r") as f:
+        fields, _, _ = split_front_matter(f, source_path)
+    return fields
+
+def is_draft(fields):
+    return fields.get("draft") is True
+
+def front_matter_context(fields):
+    """
+    Returns the placeholder values set by front matter: Title and Date.
+    """
+    context = {}
+    if "title" in fields:
+        context["Title"] = str(fields["title"])
+    if "date" in fields:
+        context["Date"] = str(fields["date"])
+    return context
+
+def check_slug(slug, source_path):
+    slug = str(slug)
+    if not slug or "/" in slug or os.sep in slug or slug in (".", ".."):
+        raise Exception(f"{source_path}: invalid slug {slug!r}")
+    return slug
+
+def resolve_template(name, source_path, default_template_path):
+    """
+    Returns the path of a template named in front matter: relative to the
+    page's directory, or else to the directory of the site template.
+    """
+    for base_dir in (os.path.dirname(source_path), os.path.dirname(default_template_path)):
+        candidate = os.path.join(base_dir, str(name))
+        if os.path.isfile(candidate):
+            return candidate
+    raise Exception(f"{source_path}: template {name!r} not found")
@@ -1,4 +1,7 @@
 class HTMLNode():
+    # pages create many short-lived nodes, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,18 +9,39 @@ class HTMLNode():
         self.props = props
 
     def __eq__(self, other):
-        pass
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        return type(self) is type(other) \
+            and self.tag == other.tag \
+            and self.value == other.value \
+            and self.children == other.children \
+            and self.props == other.props
+
+    def iter_html(self, url_rewriter=None):
+        """
+        Yields the node's HTML as a sequence of string chunks, so large
+        trees can be written out without building the whole string.
 
-    def to_html(self):
+        :param url_rewriter: Optional UrlRewriter applied to the props of
+            every node as it is serialized
+        """
         raise NotImplementedError()
+
+    def to_html(self, url_rewriter=None):
+        return "".join(self.iter_html(url_rewriter))
+
+    def write_to(self, fp, url_rewriter=None):
+        for chunk in self.iter_html(url_rewriter):
+            fp.write(chunk)
     
-    def props_to_html(self):
+    def props_to_html(self, url_rewriter=None):
         if len(self.props) == 0:
             return None
+        props = self.props if url_rewriter is None else url_rewriter.rewrite_props(self.props, self.tag)
         props_string = ""
-        for k in sorted(list(self.props.keys())):
-            props_string += f' {k}="{self.props[k]}"'
+        for k in sorted(list(props.keys())):
+            props_string += f' {k}="{props[k]}"'
         return props_string
     
     def __repr__(self):
-        return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
\ No newline at end of file
+        return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -0,0 +1,211 @@
+import hashlib, json, os, shutil, struct, zlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    # without Pillow, PNGs are only recompressed and no variants are made
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+DEFAULT_WIDTHS = (480, 960)
+# bumped when the derivatives written for the same inputs change
+PIPELINE_VERSION = 2
+# resized JPEG variants cannot keep the source's quantization tables
+JPEG_VARIANT_QUALITY = 90
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+def variant_path(path, width):
+    """
+    Returns the path of a resized variant, e.g. a.png -> a.480w.png.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{width}w{ext}"
+
+def image_size(path):
+    """
+    Returns (width, height) read from a PNG, GIF or JPEG header, or None
+    for anything else.
+    """
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head.startswith(PNG_SIGNATURE):
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if not head.startswith(b"\xff\xd8"):
+            return None
+        # walk the JPEG segments to the first start-of-frame marker
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length = struct.unpack(">H", f.read(2))[0]
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+def png_chunks(data):
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += length + 12
+
+def png_chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+def recompress_png(data):
+    """
+    Returns the PNG with its image data deflated again at the highest zlib
+    level into a single IDAT chunk. The pixels are unchanged.
+    """
+    chunks = list(png_chunks(data))
+    pixels = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    output = [PNG_SIGNATURE]
+    merged = False
+    for kind, body in chunks:
+        if kind != b"IDAT":
+            output.append(png_chunk(kind, body))
+        elif not merged:
+            output.append(png_chunk(b"IDAT", zlib.compress(pixels, 9)))
+            merged = True
+    return b"".join(output)
+
+def image_cache_key(source_hash, widths):
+    engine = "pillow" if Image is not None else "zlib"
+    return hashlib.sha256(f"{PIPELINE_VERSION}:{engine}:{sorted(widths)}:{source_hash}".encode("utf-8")).hexdigest()
+
+def write_derivative(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+def optimize_image(source_path, source_hash, cache_dir, widths=DEFAULT_WIDTHS):
+    """
+    Produces the recompressed image and its resized variants in the cache,
+    unless they are already there for this source hash and set of widths,
+    and returns their description:
+
+        {"width", "height", "file", "hash",
+         "variants": [[file, width, hash], ...]}
+
+    The recompressed image is only used when it is smaller than the
+    source. Variants are only made for widths smaller than the image, and
+    only when Pillow is installed.
+
+    :param source_hash: Content hash of source_path
+    :param cache_dir: Directory holding the derivatives of every image
+    :param widths: Widths of the resized variants
+    """
+    key = image_cache_key(source_hash, widths)
+    entry_dir = os.path.join(cache_dir, key[:2], key)
+    meta_path = os.path.join(entry_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    print(f"Optimizing image: {source_path}")
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    name = os.path.basename(source_path)
+    with open(source_path, "rb") as f:
+        original = f.read()
+
+    optimized, variants = original, []
+    if Image is not None:
+        optimized, size, variants = pillow_derivatives(source_path, original, tmp_dir, widths)
+    else:
+        size = image_size(source_path)
+        if original.startswith(PNG_SIGNATURE):
+            optimized = min(original, recompress_png(original), key=len)
+
+    meta = {
+        "width": size[0] if size else None,
+        "height": size[1] if size else None,
+        "file": os.path.join(entry_dir, name),
+        "hash": write_derivative(os.path.join(tmp_dir, name), optimized),
+        "variants": [[os.path.join(entry_dir, file), width, digest] for file, width, digest in variants],
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    return meta
+
+def pillow_derivatives(source_path, original, tmp_dir, widths):
+    """
+    Writes the resized variants of an image with Pillow and returns
+    (optimized bytes, size, variants). JPEGs are saved again with their
+    own quantization tables, so the full-size image loses no quality.
+    Animated images keep every frame and get no variants.
+    """
+    name = os.path.basename(source_path)
+    variants = []
+    with Image.open(source_path) as image:
+        size = image.size
+        image_format = image.format
+        animated = getattr(image, "is_animated", False)
+        options = {"optimize": True}
+        if image_format == "JPEG":
+            options["quality"] = "keep"
+        if animated:
+            options["save_all"] = True
+        optimized_path = os.path.join(tmp_dir, "optimized")
+        image.save(optimized_path, image_format, **options)
+        with open(optimized_path, "rb") as f:
+            optimized = min(original, f.read(), key=len)
+        os.remove(optimized_path)
+        if animated:
+            return optimized, size, variants
+        if image_format == "JPEG":
+            options["quality"] = JPEG_VARIANT_QUALITY
+        for width in sorted(set(widths)):
+            if width >= size[0]:
+                continue
+            height = max(1, round(size[1] * width / size[0]))
+            file = variant_path(name, width)
+            image.resize((width, height), Image.LANCZOS).save(os.path.join(tmp_dir, file), image_format, **options)
+            with open(os.path.join(tmp_dir, file), "rb") as f:
+                variants.append([file, width, hashlib.sha256(f.read()).hexdigest()])
+    return optimized, size, variants
+
+def optimize_images(sources, cache_dir, widths=DEFAULT_WIDTHS, jobs=1):
+    """
+    Runs optimize_image for a list of (source path, source hash) pairs,
+    in a process pool when jobs > 1, and returns {source path: description}.
+
+    :param jobs: Number of worker processes (0 means one per CPU)
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    paths = [path for path, _ in sources]
+    hashes = [digest for _, digest in sources]
+    if jobs == 1 or len(sources) < 2:
+        return {path: optimize_image(path, digest, cache_dir, widths) for path, digest in sources}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(optimize_image, paths, hashes, [cache_dir] * len(paths), [widths] * len(paths))
+        return dict(zip(paths, results))
+
+def image_attributes(url, image):
+    """
+    Returns the img attributes for an optimized image served at url: its
+    width and height and, when it has variants, a srcset of the variants
+    and the full-size image. URLs are the unfingerprinted site URLs.
+    """
+    if image["width"] is None:
+        return {}
+    attributes = {"width": image["width"], "height": image["height"]}
+    if image["variants"]:
+        candidates = [f"{variant_path(url, width)} {width}w" for _, width, _ in image["variants"]]
+        candidates.append(f"{url} {image['width']}w")
+        attributes["srcset"] = ", ".join(candidates)
+    return attributes
@@ -0,0 +1,85 @@
+import re
+from textnode import TextNode
+from markdown_enums import TextType
+
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+DELIMITER_PATTERN = re.compile(r"\*\*|`|_")
+
+def tokenize_inline(text):
+    """
+    Splits inline markdown into TextNodes in a single left-to-right scan.
+
+    Produces the same nodes as running split_nodes_delimiter for **, ` and _
+    followed by split_nodes_image and split_nodes_link:
+
+    * ** always toggles bold, so ` and _ inside bold text are literal.
+    * ` toggles code outside bold, so _ inside code is literal.
+    * A delimiter left open at the end of its enclosing run is an error.
+    * Images, then links, are only recognised inside plain text runs.
+
+    :param text: Inline markdown, e.g. the text of a paragraph or list item
+    """
+
+    nodes = []
+    bold = code = italic = False
+    start = 0
+
+    for match in DELIMITER_PATTERN.finditer(text):
+        delimiter = match.group()
+        if delimiter == "**":
+            if code or italic:
+                raise Exception("unmatched delimiters")
+        elif bold or (delimiter == "_" and code):
+            # literal character inside an enclosing span
+            continue
+        elif delimiter == "`" and italic:
+            raise Exception("unmatched delimiters")
+
+        emit_run(nodes, text, start, match.start(), bold, code, italic)
+        start = match.end()
+
+        if delimiter == "**":
+            bold = not bold
+        elif delimiter == "`":
+            code = not code
+        else:
+            italic = not italic
+
+    if bold or code or italic:
+        raise Exception("unmatched delimiters")
+    emit_run(nodes, text, start, len(text), bold, code, italic)
+
+    return nodes
+
+def emit_run(nodes, text, start, end, bold, code, italic):
+    if start == end:
+        return
+    if bold:
+        nodes.append(TextNode(text[start:end], TextType.BOLD))
+    elif code:
+        nodes.append(TextNode(text[start:end], TextType.CODE))
+    elif italic:
+        nodes.append(TextNode(text[start:end], TextType.ITALIC))
+    else:
+        emit_images(nodes, text[start:end])
+
+def emit_images(nodes, text):
+    position = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        if match.start() > position:
+            emit_links(nodes, text[position:match.start()])
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        position = match.end()
+    if position < len(text):
+        emit_links(nodes, text[position:] if position else text)
+
+def emit_links(nodes, text):
+    position = 0
+    for match in LINK_PATTERN.finditer(text):
+        if match.start() > position:
+            nodes.append(TextNode(text[position:match.start()], TextType.TEXT))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        position = match.end()
+    if position < len(text):
+        nodes.append(TextNode(text[position:] if position else text, TextType.TEXT))
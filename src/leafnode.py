@@ -4,16 +4,19 @@ class LeafNode(HTMLNode):
     """
     A LeafNode is an HTMLNode with no children
     """
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def iter_html(self, url_rewriter=None):
         if self.value is None:
             raise ValueError("missing node value")
         if self.tag is None:
-            return self.value
-        props_string = "" if not self.props else self.props_to_html()
-        return f"<{self.tag}{props_string}>{self.value}</{self.tag}>"
+            yield self.value
+            return
+        props_string = "" if not self.props else self.props_to_html(url_rewriter)
+        yield f"<{self.tag}{props_string}>{self.value}</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
\ No newline at end of file
@@ -0,0 +1,227 @@
+import os, re, sqlite3
+from urllib.parse import unquote
+
+# attributes holding the target of a link or image
+LINK_ATTRIBUTES = ("href", "src")
+# bumped when the link index tables change shape
+LINK_INDEX_VERSION = 2
+SCHEME_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+def is_internal(url):
+    """
+    True for links into the site itself: site-absolute or relative paths,
+    but not external URLs, protocol-relative URLs or bare #fragments.
+    """
+    return bool(url) and not url.startswith(("#", "//")) and not SCHEME_PATTERN.match(url)
+
+def iter_node_urls(node):
+    """
+    Yields the link and image targets in an HTML node tree, in document
+    order.
+    """
+    if node.props:
+        for name in LINK_ATTRIBUTES:
+            if name in node.props:
+                yield node.props[name]
+    for child in node.children or ():
+        yield from iter_node_urls(child)
+
+def block_links(block, node):
+    """
+    Returns [line offset, url] pairs for the internal links of a block, the
+    offset counting lines from the start of the block.
+
+    :param block: Raw markdown of the block
+    :param node: HTML node rendered from the block
+    """
+    links = []
+    position = 0
+    for url in iter_node_urls(node):
+        if not is_internal(url):
+            continue
+        found = block.find(f"]({url}", position)
+        if found != -1:
+            position = found + 1
+        links.append([block.count("\n", 0, position), url])
+    return links
+
+def link_targets(url, page_output, dest_dir):
+    """
+    Returns the output files a link may point to, resolving relative links
+    against the directory of the page that contains them. A directory link
+    points to its index.html; an extensionless path may also be a page.
+    """
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if not path:
+        return [page_output]
+    if path.startswith("/"):
+        target = os.path.join(dest_dir, path.lstrip("/"))
+    else:
+        target = os.path.join(os.path.dirname(page_output), path)
+    target = os.path.normpath(target)
+    if path.endswith("/"):
+        return [os.path.join(target, "index.html")]
+    return [target, os.path.join(target, "index.html"), target + ".html"]
+
+def resolve_link(url, page_output, dest_dir, outputs, assets=None):
+    """
+    Returns the output a link points to, or None when it is broken.
+
+    :param outputs: Set of normalized paths of every generated file
+    :param assets: Optional {url: fingerprinted url} map of static assets
+    """
+    if assets:
+        path = url.split("#", 1)[0].split("?", 1)[0]
+        url = assets.get(path, path)
+    for target in link_targets(url, page_output, dest_dir):
+        if target in outputs:
+            return target
+    return None
+
+class LinkIndex():
+    """
+    A persistent SQLite store of every page's internal links and the output
+    each one resolved to when it was last checked, kept apart from the page
+    manifest so that a build only touches the rows of the pages it
+    rendered.
+
+    update() stages the links of a rendered page; check() then resolves
+    only the links that may have changed: those of updated pages, broken
+    links when outputs were added, and links whose target was removed.
+    Every other link keeps its stored result. Builds that render pages
+    without checking links (see serve.py) store them with save(), and the
+    next check() resolves them.
+    """
+
+    def __init__(self, path, dest_dir):
+        self.path = path
+        self.dest_dir = dest_dir
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.pending = {}
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # a new or reset index has no links for pages that were not
+            # rendered, so callers should render every page once
+            self.reset = self.check_version(f"{LINK_INDEX_VERSION}:{os.path.normpath(dest_dir)}")
+
+    def check_version(self, version):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] == version:
+            return False
+        for table in ("pages", "links", "outputs", "dirty"):
+            self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+        self.connection.execute("CREATE TABLE pages (source TEXT PRIMARY KEY, output TEXT)")
+        self.connection.execute("CREATE TABLE links (source TEXT, line INTEGER, url TEXT, target TEXT)")
+        self.connection.execute("CREATE INDEX links_source ON links (source)")
+        self.connection.execute("CREATE INDEX links_target ON links (target)")
+        self.connection.execute("CREATE TABLE outputs (path TEXT PRIMARY KEY)")
+        # pages stored by save() whose links have not been resolved yet
+        self.connection.execute("CREATE TABLE dirty (source TEXT PRIMARY KEY)")
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        return True
+
+    def update(self, source_path, output_path, links):
+        """
+        Stages the [line, url] links of a page rendered in this build.
+        """
+        self.pending[source_path] = (output_path, links)
+
+    def save(self):
+        """
+        Stores the staged pages without resolving their links, which are
+        left for the next check().
+        """
+        with self.connection:
+            for source_path, (page_output, links) in self.pending.items():
+                self.connection.execute("DELETE FROM links WHERE source = ?", (source_path,))
+                self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (source_path, page_output))
+                self.connection.executemany("INSERT INTO links VALUES (?, ?, ?, NULL)",
+                                            [(source_path, line, url) for line, url in links])
+                self.connection.execute("INSERT OR IGNORE INTO dirty VALUES (?)", (source_path,))
+        self.pending = {}
+
+    def check(self, pages, outputs, assets=None):
+        """
+        Stores the staged pages, forgets pages that are no longer built and
+        resolves the links that may have changed against outputs. Returns
+        (number of links resolved, the broken ones among them as (source,
+        line, url), sorted). Links that were not resolved again keep their
+        earlier result; see broken_count and broken.
+
+        :param pages: {source path: output path} of every page in the site
+        :param outputs: Paths of every generated page and static file
+        :param assets: Optional {url: fingerprinted url} map of static assets
+        """
+        outputs = set(os.path.normpath(path) for path in outputs)
+        broken = []
+        with self.connection:
+            stored = set(source for source, in self.connection.execute("SELECT source FROM pages"))
+            gone = [(source,) for source in stored - set(pages)]
+            self.connection.executemany("DELETE FROM pages WHERE source = ?", gone)
+            self.connection.executemany("DELETE FROM links WHERE source = ?", gone)
+            self.connection.executemany("DELETE FROM dirty WHERE source = ?", gone)
+
+            stored_outputs = set(path for path, in self.connection.execute("SELECT path FROM outputs"))
+            added = outputs - stored_outputs
+            removed = stored_outputs - outputs
+            self.connection.executemany("DELETE FROM outputs WHERE path = ?", [(path,) for path in removed])
+            self.connection.executemany("INSERT INTO outputs VALUES (?)", [(path,) for path in added])
+
+            recheck = []
+            query = "SELECT links.rowid, links.source, line, url, output FROM links JOIN pages ON links.source = pages.source"
+            if added:
+                recheck += self.connection.execute(query + " WHERE target IS NULL").fetchall()
+            for path in removed:
+                recheck += self.connection.execute(query + " WHERE target = ?", (path,)).fetchall()
+            recheck += self.connection.execute(query + " WHERE links.source IN (SELECT source FROM dirty)").fetchall()
+            self.connection.execute("DELETE FROM dirty")
+            # pages rendered in this build replace all of their rows; a
+            # broken link of a dirty page is found twice when outputs were added
+            recheck = sorted(set(row for row in recheck if row[1] not in self.pending))
+            updates = []
+            for rowid, source_path, line, url, page_output in recheck:
+                target = resolve_link(url, page_output, self.dest_dir, outputs, assets)
+                updates.append((target, rowid))
+                if target is None:
+                    broken.append((source_path, line, url))
+            self.connection.executemany("UPDATE links SET target = ? WHERE rowid = ?", updates)
+            checked = len(recheck)
+
+            for source_path, (page_output, links) in self.pending.items():
+                rows = []
+                for line, url in links:
+                    target = resolve_link(url, page_output, self.dest_dir, outputs, assets)
+                    rows.append((source_path, line, url, target))
+                    if target is None:
+                        broken.append((source_path, line, url))
+                self.connection.execute("DELETE FROM links WHERE source = ?", (source_path,))
+                self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (source_path, page_output))
+                self.connection.executemany("INSERT INTO links VALUES (?, ?, ?, ?)", rows)
+                checked += len(links)
+        self.pending = {}
+        return checked, sorted(broken)
+
+    def broken_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM links WHERE target IS NULL").fetchone()[0]
+
+    def broken(self):
+        """
+        Returns every broken link in the index as (source, line, url), sorted.
+        """
+        return self.connection.execute(
+            "SELECT source, line, url FROM links WHERE target IS NULL ORDER BY source, line, rowid"
+        ).fetchall()
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+def site_outputs(page_manifest, static_manifest, extra_outputs=()):
+    """
+    Returns every file the build produced: the pages and static files in
+    the two manifests plus extra_outputs, such as generated listing pages.
+    """
+    return page_manifest.outputs() + static_manifest.outputs() + list(extra_outputs)
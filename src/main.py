@@ -1,41 +1,399 @@
 # import textnode
 # from markdown_enums import TextType
-import os, sys
-from shutil import copy, rmtree
-from markdown_conversion import generate_pages_recursive
+import argparse, hashlib, json, os, sys
+from shutil import copy2, copystat
+from markdown_conversion import generate_pages_recursive, PIPELINE_DEPTH
+from build_manifest import BuildManifest, hash_file
+from build_profile import BuildProfile
+from url_rewrite import URL_ATTRIBUTES, UrlRewriter, url_rewriter, rewrite_css_urls
+from site_metadata import collect_metadata, generate_aggregates, remove_aggregates
+from page_io import atomic_write
+from link_index import LinkIndex, site_outputs
+from fragment_cache import open_fragment_cache, close_fragment_caches
+from search_index import SHARD_PREFIX_LENGTH, write_search_index, site_search_pages
+from precompress import COMPRESS_EXTENSIONS, DEFAULT_MIN_SIZE, precompress_site, remove_precompressed
+from image_pipeline import DEFAULT_WIDTHS, is_image, variant_path, optimize_images, image_attributes
 
-def copy_static_contents(source_dir, target_dir):
+STATIC_DIR = "static"
+CONTENT_DIR = "content"
+TEMPLATE_PATH = "template.html"
+DEST_DIR = "docs"
+PAGE_MANIFEST_PATH = ".build_manifest.json"
+STATIC_MANIFEST_PATH = ".static_manifest.json"
+AGGREGATE_STATE_PATH = ".aggregate_manifest.json"
+METADATA_CACHE_PATH = ".page_metadata.json"
+FRAGMENT_CACHE_PATH = ".fragment_cache.sqlite"
+LINK_INDEX_PATH = ".link_index.sqlite"
+ASSET_MANIFEST_PATH = "asset-manifest.json"
+FINGERPRINT_LENGTH = 10
+IMAGE_CACHE_DIR = ".image_cache"
 
-    # clean old public
-    if os.path.exists(target_dir):
-        print(f"Removing target directory: {target_dir}")
-        rmtree(target_dir)
+class SyncStats():
+    """
+    Counts what sync_static_contents did, so the build can report how much
+    of the static tree actually had to be rewritten.
+    """
+    def __init__(self):
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.removed_files = 0
 
-    # make the target directory (since we know it was removed)
-    print(f"Creating target directory: {target_dir}")
-    os.mkdir(target_dir)
+    def __repr__(self):
+        return f"SyncStats(copied {self.copied_files} files / {self.copied_bytes} bytes, skipped {self.skipped_files} files / {self.skipped_bytes} bytes, removed {self.removed_files} files)"
 
-    # find and copy source contents
-    print(f"Crawling directory: {source_dir}")
+def is_in_sync(source_path, target_path, use_hash=False):
+    """
+    True when target_path already holds the contents of source_path.
 
-    contents = os.listdir(source_dir)
-    for item in contents:
+    Files of equal size and mtime are considered equal. With use_hash,
+    files of equal size but different mtime are compared by content, so a
+    touched but otherwise unchanged file is not copied again.
+    """
+    if not os.path.isfile(target_path):
+        return False
+    source_stat = os.stat(source_path)
+    target_stat = os.stat(target_path)
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == target_stat.st_mtime_ns:
+        return True
+    if use_hash and hash_file(source_path) == hash_file(target_path):
+        # align the mtime so the next sync can skip without hashing
+        copystat(source_path, target_path)
+        return True
+    return False
+
+def sync_static_file(source_path, target_path, manifest=None, use_hash=False, stats=None):
+    """
+    Copies a single static file if target_path is missing or out of date.
+    """
+    if stats is None:
+        stats = SyncStats()
+    size = os.path.getsize(source_path)
+    if is_in_sync(source_path, target_path, use_hash):
+        stats.skipped_files += 1
+        stats.skipped_bytes += size
+    else:
+        print(f"Copying changed file: {source_path}")
+        os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+        tmp_path = target_path + ".tmp"
+        copy2(source_path, tmp_path)
+        os.replace(tmp_path, target_path)
+        stats.copied_files += 1
+        stats.copied_bytes += size
+    if manifest is not None:
+        manifest.record(source_path, target_path)
+    return stats
+
+def fingerprinted_path(path, digest):
+    """
+    Returns path with a content hash inserted before its extension, e.g.
+    images/a.png -> images/a.<hash>.png.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+def sync_static_image(source_path, target_path, image, manifest, use_hash, stats, assets, url):
+    """
+    Syncs the optimized version of an image (see image_pipeline) to
+    target_path and its resized variants next to it, fingerprinting all of
+    them by their own content when assets is given.
+    """
+    files = [(image["file"], target_path, url, image["hash"])]
+    for file, width, digest in image["variants"]:
+        files.append((file, variant_path(target_path, width), variant_path(url, width), digest))
+    outputs = []
+    for cached_path, path, file_url, digest in files:
+        if assets is not None:
+            path = fingerprinted_path(path, digest)
+            assets[file_url] = fingerprinted_path(file_url, digest)
+        sync_static_file(cached_path, path, None, use_hash, stats)
+        outputs.append(path)
+    if manifest is not None:
+        manifest.record(source_path, outputs[0], extra_outputs=outputs[1:])
+
+def sync_static_stylesheet(source_path, target_dir, item, manifest, use_hash, stats, assets, url):
+    """
+    Syncs a stylesheet of a fingerprinted build. Its url(...) references
+    to other assets are replaced by their fingerprinted names (see
+    rewrite_css_urls) and it is fingerprinted by the rewritten content, so
+    a changed image also gives the stylesheet that uses it a new name.
+    """
+    with open(source_path, "r", encoding="utf-8", newline="") as f:
+        css = f.read()
+    rewritten = rewrite_css_urls(css, url, assets)
+    if rewritten == css:
+        # nothing to rewrite, sync it like any other file
+        target_path = os.path.join(target_dir, fingerprinted_path(item, manifest.source_hash(source_path)))
+        assets[url] = url[:-len(item)] + os.path.basename(target_path)
+        sync_static_file(source_path, target_path, manifest, use_hash, stats)
+        return
+    data = rewritten.encode("utf-8")
+    hashed_item = fingerprinted_path(item, hashlib.sha256(data).hexdigest())
+    assets[url] = url[:-len(item)] + hashed_item
+    target_path = os.path.join(target_dir, hashed_item)
+    if os.path.isfile(target_path) and os.path.getsize(target_path) == len(data):
+        stats.skipped_files += 1
+        stats.skipped_bytes += len(data)
+    else:
+        print(f"Writing rewritten stylesheet: {source_path}")
+        os.makedirs(target_dir, exist_ok=True)
+        with atomic_write(target_path, "wb") as f:
+            f.write(data)
+        stats.copied_files += 1
+        stats.copied_bytes += len(data)
+    manifest.record(source_path, target_path)
+
+def sync_static_contents(source_dir, target_dir, manifest=None, use_hash=False, stats=None, assets=None, url_path="/",
+                         images=None, stylesheets=None):
+    """
+    Copies new or changed files from source_dir into target_dir, leaving
+    unchanged files (and anything the page generator wrote) in place.
+
+    Changed files are copied to a temporary name and renamed over the old
+    one, so hardlinks held by deploy caches keep pointing at the old data.
+    When a manifest is given, every synced file is recorded in it; call
+    manifest.remove_stale() afterwards to delete files whose source is gone
+    or that were replaced, e.g. by a new fingerprint.
+
+    When an assets dict is given, every file is written under a
+    fingerprinted name (see fingerprinted_path) and assets maps its
+    site-absolute URL to the fingerprinted one. The hash only depends on
+    the file's content, so unchanged files keep their names. Stylesheets
+    are synced last, once every other asset has its name, with their
+    url(...) references rewritten (see sync_static_stylesheet).
+
+    Images found in images are replaced by their optimized versions and
+    resized variants (see sync_static_image).
+
+    :param manifest: Optional BuildManifest tracking synced files
+    :param use_hash: Compare contents when size matches but mtime differs
+    :param stats: SyncStats to accumulate into (created when omitted)
+    :param assets: Optional dict that receives {url: fingerprinted url}
+    :param url_path: URL of target_dir, for the keys of assets
+    :param images: Optional {source path: optimize_image result}
+    :param stylesheets: List that collects the stylesheets of
+        subdirectories, for the recursive calls
+    """
+    if stats is None:
+        stats = SyncStats()
+    if assets is not None and manifest is None:
+        manifest = BuildManifest()
+    top_level = stylesheets is None
+    if top_level:
+        stylesheets = []
+
+    if not os.path.exists(target_dir):
+        print(f"Creating target directory: {target_dir}")
+        os.mkdir(target_dir)
+
+    for item in sorted(os.listdir(source_dir)):
 
-        # print(f"item: {item}")
         source_subpath = os.path.join(source_dir, item)
         target_subpath = os.path.join(target_dir, item)
 
-        if os.path.isfile(source_subpath):
-            print(f"found file: {source_subpath}")
-            copy(source_subpath, target_subpath)
+        if images and source_subpath in images:
+            sync_static_image(source_subpath, target_subpath, images[source_subpath], manifest, use_hash, stats, assets,
+                              url_path + item)
+        elif assets is not None and item.endswith(".css") and os.path.isfile(source_subpath):
+            stylesheets.append((source_subpath, target_dir, item, url_path + item))
+        elif os.path.isfile(source_subpath):
+            if assets is not None:
+                hashed_item = fingerprinted_path(item, manifest.source_hash(source_subpath))
+                assets[url_path + item] = url_path + hashed_item
+                target_subpath = os.path.join(target_dir, hashed_item)
+            sync_static_file(source_subpath, target_subpath, manifest, use_hash, stats)
         else:
-            print(f"Recursing into {source_subpath}")
-            copy_static_contents(source_subpath, target_subpath)
+            sync_static_contents(source_subpath, target_subpath, manifest, use_hash, stats, assets, url_path + item + "/",
+                                 images, stylesheets)
+
+    if top_level:
+        # a stylesheet referencing another stylesheet only sees its hashed
+        # name when that one sorts first
+        for source_path, stylesheet_dir, item, url in stylesheets:
+            sync_static_stylesheet(source_path, stylesheet_dir, item, manifest, use_hash, stats, assets, url)
+    return stats
+
+def write_asset_manifest(path, assets):
+    """
+    Writes the {url: fingerprinted url} map for deploy tooling, or removes a
+    map left by an earlier fingerprinted build when assets is None.
+    """
+    if assets is None:
+        if os.path.exists(path):
+            print(f"Removing stale output: {path}")
+            os.remove(path)
+        return
+    with atomic_write(path) as f:
+        json.dump(assets, f, indent=1, sort_keys=True)
+
+def optimize_static_images(static_dir, manifest, widths, jobs):
+    """
+    Optimizes every image under static_dir and returns ({source path:
+    optimize_image result}, {site URL: img attributes}).
+    """
+    sources = []
+    for dirpath, _, filenames in os.walk(static_dir):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if is_image(path):
+                sources.append((path, manifest.source_hash(path)))
+    images = optimize_images(sources, IMAGE_CACHE_DIR, widths, jobs)
+    image_info = {}
+    for path, image in images.items():
+        url = "/" + os.path.relpath(path, static_dir).replace(os.sep, "/")
+        image_info[url] = image_attributes(url, image)
+    return images, image_info
+
+def main(basepath="/", *, use_hash=False, jobs=1, profile_path=None, profile_top=10, fragment_cache_path=None, fragment_cache_size=64, pipeline=0,
+         url_attributes=URL_ATTRIBUTES, fingerprint=False, optimize=False, image_widths=DEFAULT_WIDTHS,
+         precompress=False, compress_extensions=COMPRESS_EXTENSIONS, compress_min_size=DEFAULT_MIN_SIZE, search=False,
+         search_prefix_length=SHARD_PREFIX_LENGTH, site_url=None, blog_page_size=0):
+    """
+    Builds the site and returns the number of broken internal links.
+    """
+    profile = BuildProfile() if profile_path else None
+    build_profile = profile if profile is not None else BuildProfile()
+
+    static_manifest = BuildManifest.load(STATIC_MANIFEST_PATH)
+    images, image_info = None, None
+    if optimize:
+        with build_profile.phase("image optimization"):
+            images, image_info = optimize_static_images(STATIC_DIR, static_manifest, image_widths, jobs)
+
+    with build_profile.phase("static sync"):
+        assets = {} if fingerprint else None
+        stats = sync_static_contents(STATIC_DIR, DEST_DIR, static_manifest, use_hash, assets=assets, images=images)
+        stats.removed_files = len(static_manifest.remove_stale())
+        static_manifest.save()
+        write_asset_manifest(os.path.join(DEST_DIR, ASSET_MANIFEST_PATH), assets)
+    print(f"Static sync: {stats}")
+
+    if fragment_cache_path:
+        hits_before, misses_before, _, _ = open_fragment_cache(fragment_cache_path).stats()
+
+    with build_profile.phase("manifest load"):
+        page_manifest = BuildManifest.load(PAGE_MANIFEST_PATH)
+        link_index = LinkIndex(LINK_INDEX_PATH, DEST_DIR)
+        if link_index.reset:
+            # the new index only learns the links of pages that are rendered
+            page_manifest.invalidate()
+    front_matter = {}
+    results = generate_pages_recursive(CONTENT_DIR, TEMPLATE_PATH, DEST_DIR, basepath, manifest=page_manifest, jobs=jobs,
+                             profile=profile, fragment_cache=fragment_cache_path, pipeline=pipeline, url_attributes=url_attributes,
+                             assets=assets, images=image_info, search=search, front_matter=front_matter)
+
+    aggregate_outputs = []
+    if site_url or blog_page_size:
+        with build_profile.phase("metadata"):
+            # the page build already walked the content tree and read the front matter
+            pages = [(source_path, page_manifest.entries[source_path]["output"]) for source_path in front_matter]
+            metadata = collect_metadata(pages, DEST_DIR, front_matter, METADATA_CACHE_PATH)
+        with build_profile.phase("aggregates"):
+            rewriter = url_rewriter(basepath, url_attributes, assets, image_info)
+            aggregate_outputs = generate_aggregates(metadata, CONTENT_DIR, DEST_DIR, TEMPLATE_PATH, AGGREGATE_STATE_PATH, basepath,
+                                                    rewriter, site_url, blog_page_size)
+    else:
+        remove_aggregates(AGGREGATE_STATE_PATH)
+        if os.path.exists(METADATA_CACHE_PATH):
+            os.remove(METADATA_CACHE_PATH)
+
+    with build_profile.phase("link check"):
+        for result in results:
+            link_index.update(result["source"], page_manifest.entries[result["source"]]["output"], result["links"])
+        pages = {source_path: entry["output"] for source_path, entry in page_manifest.entries.items()}
+        checked, _ = link_index.check(pages, site_outputs(page_manifest, static_manifest, aggregate_outputs), assets)
+        total, broken_count = link_index.count(), link_index.broken_count()
+        # links that were not checked again keep their stored result, and
+        # are listed along with the new ones
+        broken = link_index.broken() if broken_count else []
+        link_index.close()
+    for source_path, line, url in broken:
+        print(f"Broken link: {source_path}:{line}: {url}")
+    print(f"Link check: {checked} of {total} internal links checked, {broken_count} broken")
+
+    with build_profile.phase("search index"):
+        search_pages = site_search_pages(page_manifest, DEST_DIR, UrlRewriter(basepath).prefix) if search else None
+        written, unchanged, removed = write_search_index(search_pages, DEST_DIR, search_prefix_length)
+    if search:
+        print(f"Search index: {len(search_pages)} pages, {written} files written, {unchanged} unchanged, {removed} removed")
+
+    if precompress:
+        with build_profile.phase("precompress"):
+            compress_stats = precompress_site(DEST_DIR, compress_extensions, compress_min_size, jobs, static_manifest.outputs())
+        print(f"Precompress: {compress_stats}")
+    else:
+        remove_precompressed(DEST_DIR, compress_extensions, static_manifest.outputs())
+
+    if fragment_cache_path:
+        cache = open_fragment_cache(fragment_cache_path)
+        evicted = cache.evict(fragment_cache_size * 1024 * 1024)
+        hits, misses, entries, size = cache.stats()
+        close_fragment_caches()
+        print(f"Fragment cache: {hits - hits_before} hits, {misses - misses_before} misses, "
+              f"{entries} entries ({size / 1024:.1f} KB), {evicted} evicted")
+
+    if profile is not None:
+        profile.write_json(profile_path)
+        print(profile.summary(profile_top))
+        print(f"Wrote build profile to {profile_path}")
+
+    return broken_count
 
-def main(basepath):
-    copy_static_contents("static", "docs")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/")
+    parser.add_argument("basepath", nargs="?", default="/", help="path prefix for published links")
+    parser.add_argument("--hash", dest="use_hash", action="store_true",
+                        help="compare static files by content when their mtime differs")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes rendering pages (0 = one per CPU)")
+    parser.add_argument("--profile", nargs="?", const="build_profile.json", metavar="PATH",
+                        help="record per-phase timings and write a JSON report (default: build_profile.json)")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="number of slowest pages listed in the profile summary")
+    parser.add_argument("--fragment-cache", nargs="?", const=FRAGMENT_CACHE_PATH, metavar="PATH",
+                        help=f"reuse the rendered HTML of unchanged blocks across builds (default: {FRAGMENT_CACHE_PATH})")
+    parser.add_argument("--fragment-cache-size", type=int, default=64, metavar="MB",
+                        help="evict least recently used fragments beyond this size")
+    parser.add_argument("--pipeline", nargs="?", type=int, default=0, const=PIPELINE_DEPTH, metavar="N",
+                        help=f"overlap reading, rendering and writing with up to N pages in flight (default: {PIPELINE_DEPTH})")
+    parser.add_argument("--url-attributes", type=lambda value: [name for name in value.split(",") if name],
+                        default=list(URL_ATTRIBUTES), metavar="NAMES",
+                        help=f"comma-separated attributes whose site-absolute URLs get the basepath (default: {','.join(URL_ATTRIBUTES)})")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help=f"write static files as name.<hash>.ext, rewrite references and write {ASSET_MANIFEST_PATH}")
+    parser.add_argument("--optimize-images", action="store_true",
+                        help=f"recompress static images, write resized variants and size <img> tags (cached in {IMAGE_CACHE_DIR}/)")
+    parser.add_argument("--image-widths", type=lambda value: [int(width) for width in value.split(",") if width],
+                        default=list(DEFAULT_WIDTHS), metavar="WIDTHS",
+                        help=f"comma-separated widths of the resized image variants (default: {','.join(map(str, DEFAULT_WIDTHS))})")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz (and .br, when the brotli package is installed) copies of the generated files")
+    parser.add_argument("--compress-extensions", type=lambda value: [name for name in value.split(",") if name],
+                        default=list(COMPRESS_EXTENSIONS), metavar="EXTENSIONS",
+                        help=f"comma-separated extensions of the files to precompress (default: {','.join(COMPRESS_EXTENSIONS)})")
+    parser.add_argument("--compress-min-size", type=int, default=DEFAULT_MIN_SIZE, metavar="BYTES",
+                        help=f"smallest file to precompress (default: {DEFAULT_MIN_SIZE})")
+    parser.add_argument("--search", action="store_true",
+                        help="write a sharded search index to search/ for static/search.js")
+    parser.add_argument("--search-shard-prefix", type=int, default=SHARD_PREFIX_LENGTH, metavar="N",
+                        help=f"shard the search index by the first N characters of each term (default: {SHARD_PREFIX_LENGTH})")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="origin the site is published at, e.g. https://example.com; writes sitemap.xml and feed.xml")
+    parser.add_argument("--blog-page-size", type=int, default=0, metavar="N",
+                        help="write a blog listing with N posts per page to blog/ (default: 0, no listing)")
+    parser.add_argument("--strict", action="store_true", help="exit with an error when there are broken links")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    main(basepath)
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    broken = main(args.basepath, use_hash=args.use_hash, jobs=args.jobs, profile_path=args.profile, profile_top=args.profile_top,
+                  fragment_cache_path=args.fragment_cache, fragment_cache_size=args.fragment_cache_size, pipeline=args.pipeline,
+                  url_attributes=args.url_attributes, fingerprint=args.fingerprint, optimize=args.optimize_images,
+                  image_widths=args.image_widths, precompress=args.precompress, compress_extensions=args.compress_extensions,
+                  compress_min_size=args.compress_min_size, search=args.search, search_prefix_length=args.search_shard_prefix,
+                  site_url=args.site_url, blog_page_size=args.blog_page_size)
+    if broken and args.strict:
+        sys.exit(1)
@@ -0,0 +1,192 @@
+import re
+from markdown_enums import BlockType
+from inline_lexer import tokenize_inline
+
+HEADING_PREFIX_PATTERN = re.compile(r"#{1,6} ")
+HEADING_PATTERN = re.compile(r"(#{1,6}) +(.*)$")
+ORDERED_ITEM_PATTERN = re.compile(r"\d+\. ")
+
+class Block():
+    """
+    A block of the markdown AST. What it holds depends on its type:
+
+    * HEADING: level (1-6) and text
+    * CODE and QUOTE: text, taken literally
+    * PARAGRAPH: children, the paragraph's inline TextNodes
+    * UNORDERED_LIST and ORDERED_LIST: children, one list of inline
+      TextNodes per item
+
+    line is the line number the block starts on, when known.
+    """
+    __slots__ = ("block_type", "text", "children", "level", "line")
+
+    def __init__(self, block_type, text=None, children=None, level=None, line=None):
+        self.block_type = block_type
+        self.text = text
+        self.children = children
+        self.level = level
+        self.line = line
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return NotImplemented
+        return self.block_type == other.block_type \
+            and self.text == other.text \
+            and self.children == other.children \
+            and self.level == other.level \
+            and self.line == other.line
+
+    def __repr__(self):
+        return f"Block({self.block_type}, {self.text}, {self.children}, {self.level}, {self.line})"
+
+def block_to_block_type(block):
+    """
+
+    Returns a BlockType for a given block.
+
+    * Headings start with 1-6 # characters, followed by a space and then the heading text.
+    * Multiline Code blocks must start with 3 backticks and a newline, then end with 3 backticks.
+    * Every line in a quote block must start with a "greater-than" character and a space: >
+    * Every line in an unordered list block must start with a - character, followed by a space.
+    * Every line in an ordered list block must start with a number followed by a . character and a space.
+      The number should start at 1 and increment by 1 for each line (this is not enforced).
+    * Quote and list lines may be indented, e.g. nested list items.
+    * If none of the above conditions are met, the block is a normal paragraph.
+
+    The type is decided from the first character of the block, so at most
+    one scan over its lines is needed. The is_* helpers in
+    markdown_conversion are the older regex checks, which also accepted
+    markers in the middle of a line.
+
+    :param block: Description
+    """
+
+    first = block[:1]
+    if first == "#":
+        if HEADING_PREFIX_PATTERN.match(block) and block.find("\n") in (-1, len(block) - 1):
+            return BlockType.HEADING
+        return BlockType.PARAGRAPH
+
+    if first.isspace():
+        block = block.strip()
+        first = block[:1]
+
+    if first == "`":
+        if len(block) >= 8 and block.startswith("```\n") and block.endswith("\n```"):
+            return BlockType.CODE
+    elif first == ">":
+        if all(line.lstrip().startswith("> ") for line in block.split("\n")):
+            return BlockType.QUOTE
+    elif first == "-":
+        if all(line.lstrip().startswith("- ") for line in block.split("\n")):
+            return BlockType.UNORDERED_LIST
+    elif first.isdigit():
+        if all(ORDERED_ITEM_PATTERN.match(line.lstrip()) for line in block.split("\n")):
+            return BlockType.ORDERED_LIST
+
+    return BlockType.PARAGRAPH
+
+def iter_numbered_blocks(lines, first_line=1):
+    """
+    Lazily yields (line number, block) pairs for the blocks of a markdown
+    document from an iterable of lines, such as an open file, so only one
+    block is held in memory. Line numbers start at 1.
+
+    Blocks are separated by blank lines and stripped of surrounding
+    whitespace. Blank lines inside a ``` fence belong to the code block.
+
+    :param lines: Iterable of lines, with or without their trailing newline
+    :param first_line: Line number of the first line, e.g. after front
+        matter
+    """
+
+    block_lines = []
+    start = 0
+    in_fence = False
+    for number, line in enumerate(lines, first_line):
+        line = line.rstrip("\n")
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and not line.strip():
+            if block_lines:
+                block = "\n".join(block_lines).strip()
+                block_lines = []
+                if block:
+                    yield start, block
+            continue
+        if not block_lines:
+            start = number
+        block_lines.append(line)
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield start, block
+
+def item_texts(block, marker):
+    # the text after the marker of each line that starts with one,
+    # indentation included
+    texts = []
+    for line in block.split("\n"):
+        line = line.lstrip()
+        if line.startswith(marker):
+            texts.append(line[len(marker):])
+    return texts
+
+def ordered_item_texts(block):
+    texts = []
+    for line in block.split("\n"):
+        line = line.lstrip()
+        match = ORDERED_ITEM_PATTERN.match(line)
+        if match:
+            texts.append(line[match.end():])
+    return texts
+
+def parse_block(block, block_type=None, line=None):
+    """
+    Parses a single markdown block, as returned by markdown_to_blocks, into
+    a Block. Inline markdown is tokenized here, once.
+
+    :param block_type: The block's BlockType, if already known
+    :param line: Line number the block starts on
+    """
+
+    if block_type is None:
+        block_type = block_to_block_type(block)
+
+    match block_type:
+        case BlockType.HEADING:
+            match = HEADING_PATTERN.match(block)
+            if match is None:
+                raise Exception("No header detected")
+            return Block(block_type, match.group(2), level=len(match.group(1)), line=line)
+        case BlockType.CODE:
+            start = block.index("```\n") + 4
+            return Block(block_type, block[start:block.rindex("```", start)], line=line)
+        case BlockType.QUOTE:
+            return Block(block_type, "\n".join(item_texts(block, "> ")), line=line)
+        case BlockType.UNORDERED_LIST:
+            return Block(block_type, children=[tokenize_inline(text) for text in item_texts(block, "- ")], line=line)
+        case BlockType.ORDERED_LIST:
+            return Block(block_type, children=[tokenize_inline(text) for text in ordered_item_texts(block)], line=line)
+        case BlockType.PARAGRAPH:
+            return Block(block_type, children=tokenize_inline(block), line=line)
+        case _:
+            raise Exception("unexpected block type")
+
+def iter_parse(lines):
+    """
+    Lazily parses a markdown document from an iterable of lines into its
+    Blocks, one block at a time.
+    """
+    for line, block in iter_numbered_blocks(lines):
+        yield parse_block(block, line=line)
+
+def parse_markdown(markdown):
+    """
+    Parses a markdown document into a list of Blocks.
+
+    :param markdown: Markdown text, or an iterable of markdown lines
+    """
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    return list(iter_parse(markdown))
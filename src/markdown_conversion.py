@@ -1,9 +1,23 @@
-import os, re
+import collections, datetime, io, itertools, os, re, threading
+from html import escape
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from htmlnode import HTMLNode
 from leafnode import LeafNode
 from textnode import TextNode
 from parentnode import ParentNode
 from markdown_enums import TextType, BlockType
+from build_manifest import BuildManifest
+from inline_lexer import tokenize_inline, IMAGE_PATTERN, LINK_PATTERN
+from markdown_ast import block_to_block_type, iter_numbered_blocks, parse_block
+from renderers import text_node_to_html_node, render_html_node, render_html, block_plain_text
+from page_template import load_template, find_template, template_dependencies
+from page_io import atomic_write, read_text, write_text
+from url_rewrite import url_rewriter, URL_ATTRIBUTES
+from link_index import block_links
+from fragment_cache import open_fragment_cache, close_fragment_caches
+from search_index import count_terms
+from front_matter import split_front_matter, read_front_matter, is_draft, front_matter_context, check_slug, resolve_template
+from build_profile import PageProfile, NullProfile, BuildProfile
 from pathlib import Path
 
 def is_header(block):
@@ -30,10 +44,10 @@ def is_ordered_list(block):
     return len(lines) == len(matches)
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
+    return LINK_PATTERN.findall(text)
 
 def extract_title(text):
     if is_header(text):
@@ -45,202 +59,617 @@ def extract_title(text):
     else:
         raise Exception("Not a header")
 
-def block_to_block_type(block):
+def block_title(block):
     """
+    Returns the title of a page from its first parsed Block, which must be
+    an h1 heading.
+    """
+    if block is None or block.block_type != BlockType.HEADING:
+        raise Exception("Not a header")
+    if block.level != 1 or not block.text:
+        raise Exception("Invalid title")
+    return block.text
 
-    Returns a BlockType for a given block.
-    
-    * Headings start with 1-6 # characters, followed by a space and then the heading text.
-    * Multiline Code blocks must start with 3 backticks and a newline, then end with 3 backticks.
-    * Every line in a quote block must start with a "greater-than" character and a space: >
-    * Every line in an unordered list block must start with a - character, followed by a space.
-    * Every line in an ordered list block must start with a number followed by a . character and a space. 
-      The number must start at 1 and increment by 1 for each line.
-    * If none of the above conditions are met, the block is a normal paragraph.
-    
-    :param block: Description
-    """
-
-    if is_header(block):
-        return BlockType.HEADING
-    elif is_codeblock(block):
-        return BlockType.CODE
-    elif is_quoteblock(block):
-        return BlockType.QUOTE
-    elif is_unordered_list(block):
-        return BlockType.UNORDERED_LIST
-    elif is_ordered_list(block):
-        return BlockType.ORDERED_LIST
-    elif is_ordered_list(block):
-        return BlockType.ORDERED_LIST
-    else:
-        # return default the moment
-        return BlockType.PARAGRAPH
+def iter_blocks(lines):
+    """
+    Lazily yields the blocks of a markdown document from an iterable of
+    lines; see iter_numbered_blocks.
+    """
+    for _, block in iter_numbered_blocks(lines):
+        yield block
 
 def markdown_to_blocks(markdown):
     """
-    Breaks a markdown document into blocks based on blank lines (i.e. '\n\n').
+    Breaks a markdown document into blocks based on blank lines, keeping
+    fenced code blocks that contain blank lines in one piece.
     
     :param markdown: Raw markdown document
     """
 
-    # raw array from markdown
-    raw_blocks = markdown.split('\n\n')
-    clean_blocks = []
-    for block in raw_blocks:
-        clean_blocks.append(block.strip())
-    return clean_blocks
+    return list(iter_blocks(markdown.split('\n')))
 
 def get_file_contents(file_path):
     with open(file_path, "r") as f:
         return f.read()
 
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
+basepath_templates = {}
+
+def load_page_template(template_path, rewriter=None):
+    """
+    Returns the compiled template with the URLs in its source already
+    rewritten, so the rewrite happens once per build rather than once per
+    page.
+
+    :param rewriter: Optional UrlRewriter for the build's basepath
+    """
+    template = load_template(template_path)
+    if rewriter is None:
+        return template
+    cached = basepath_templates.get((template_path, rewriter.key()))
+    if cached is None or cached[0] is not template:
+        cached = (template, template.map_source(rewriter.rewrite_html))
+        basepath_templates[(template_path, rewriter.key())] = cached
+    return cached[1]
+
+def block_summary(blocks, max_length=160):
+    """
+    Returns the plain text of the first paragraph in a list of parsed
+    Blocks, shortened to at most max_length characters on a word boundary.
+    Paragraphs holding nothing but links and images, such as a "back"
+    link, are skipped.
+    """
+    for block in blocks:
+        if block.block_type == BlockType.PARAGRAPH and not is_link_paragraph(block):
+            text = " ".join(block_plain_text(block).split())
+            if len(text) > max_length:
+                text = text[:max_length].rsplit(" ", 1)[0] + "…"
+            return text
+    return ""
+
+def is_link_paragraph(block):
+    return all(node.text_type in (TextType.LINK, TextType.IMAGE) or not node.text.strip() for node in block.children)
+
+def extract_description(blocks, max_length=160):
+    """
+    Returns block_summary escaped for use in an attribute.
+    """
+    return escape(block_summary(blocks, max_length))
+
+def parse_head(head, describe, titled=False):
+    """
+    Parses the blocks buffered at the top of a page, as [line, block, None]
+    entries, that are needed before the content is rendered: the title
+    and, when describe is set, the paragraphs up to the first one that
+    block_summary uses. Their Blocks are stored in the entries so the
+    content reuses them.
+
+    :param titled: The title comes from front matter, so the page need
+        not start with an h1 heading, and the first Block is not the title
+    """
+    parsed = []
+    if not titled:
+        if not head or block_to_block_type(head[0][1]) != BlockType.HEADING:
+            raise Exception("Not a header")
+        head[0][2] = parse_block(head[0][1], BlockType.HEADING, head[0][0])
+        parsed.append(head[0][2])
+    for entry in head[len(parsed):] if describe else ():
+        block_type = block_to_block_type(entry[1])
+        if block_type == BlockType.PARAGRAPH:
+            entry[2] = parse_block(entry[1], block_type, entry[0])
+            parsed.append(entry[2])
+            if not is_link_paragraph(entry[2]):
+                break
+    return parsed
+
+def breadcrumb_nav(source_path, content_root):
+    """
+    Returns a <nav> breadcrumb for a page: Home, each parent directory
+    (linked when it has an index page) and finally the page itself.
+    """
+    relative_path = os.path.relpath(source_path, content_root)
+    parts = relative_path[:-3].split(os.sep)
+    if parts[-1] == "index":
+        parts = parts[:-1]
+    crumbs = ['<a href="/">Home</a>'] if parts else ["Home"]
+    for i, part in enumerate(parts):
+        if i == len(parts) - 1:
+            crumbs.append(part)
+        elif os.path.isfile(os.path.join(content_root, *parts[:i + 1], "index.md")):
+            crumbs.append(f'<a href="/{"/".join(parts[:i + 1])}/">{part}</a>')
+        else:
+            crumbs.append(part)
+    return "<nav>" + " / ".join(crumbs) + "</nav>"
+
+DESCRIPTION_LOOKAHEAD = 8
+# default pages in flight and I/O threads for generate_pages_pipelined
+PIPELINE_DEPTH = 16
+PIPELINE_IO_THREADS = 8
+
+def iter_block_nodes(numbered_blocks, page_profile=None, fragment_cache=None, rewriter=None, links=None, text=None):
+    """
+    Lazily converts (line number, block, parsed Block or None) entries to
+    their HTML nodes, parsing each block not parsed yet exactly once.
+
+    With a FragmentCache, a block rendered before is returned as a LeafNode
+    holding its cached HTML, and a new block is rendered once and stored.
+    Cached HTML already has its URLs rewritten by rewriter, so the cache
+    keeps one entry per block and rewrite configuration.
+
+    :param links: Optional list that receives a [line, url] pair for every
+        internal link and image target, as the blocks are converted
+    :param text: Optional list that receives the plain text of every block,
+        rendered from the same parse (see renderers.block_plain_text)
+    """
+    page_profile = page_profile or NullProfile()
+    variant = rewriter.key() if rewriter is not None else ""
+    for line, block, parsed in numbered_blocks:
+        if fragment_cache is not None:
+            with page_profile.phase("fragment cache"):
+                fragment = fragment_cache.get(block, variant)
+            if fragment is not None:
+                html, offsets, plain_text = fragment
+                if links is not None:
+                    links.extend([line + offset, url] for offset, url in offsets)
+                if text is not None:
+                    text.append(plain_text)
+                yield LeafNode(None, html)
+                continue
+        if parsed is None:
+            with page_profile.phase("block classify"):
+                block_type = block_to_block_type(block)
+            with page_profile.phase("inline parse"):
+                parsed = parse_block(block, block_type, line)
+        node = render_html_node(parsed)
+        if text is not None or fragment_cache is not None:
+            plain_text = block_plain_text(parsed)
+            if text is not None:
+                text.append(plain_text)
+        if links is not None or fragment_cache is not None:
+            offsets = block_links(block, node)
+            if links is not None:
+                links.extend([line + offset, url] for offset, url in offsets)
+        if fragment_cache is not None:
+            with page_profile.phase("serialize"):
+                html = node.to_html(rewriter)
+            fragment_cache.put(block, html, offsets, variant, plain_text)
+            node = LeafNode(None, html)
+        yield node
+
+def render_page(lines, template_path, out, basepath="/", context=None, page_profile=None, fragment_cache=None,
+                rewriter=None, links=None, text=None):
+    """
+    Renders the markdown read from lines into the template, writes the
+    page to the file object out and returns the page's title.
+
+    The template is compiled once per build (see page_template). Besides
+    Title and Content it can use Description, Date, Nav and Basepath; any
+    extra placeholder values can be passed in context. A Title in context,
+    e.g. from front matter, replaces the page's h1 heading as its title.
+    Front matter at the top of lines is skipped; page_job has already
+    read it.
+
+    Each block is converted and written out before the next one is read, so
+    memory use does not grow with the size of the document. Only the title
+    block, and up to DESCRIPTION_LOOKAHEAD blocks when the template uses
+    Description, are buffered.
+
+    URLs in generated elements, template tags and HTML context values are
+    rewritten by a UrlRewriter as they are emitted: by default one that
+    prefixes site-absolute URLs with basepath. Text is never rewritten.
+
+    :param lines: Iterable of markdown lines, e.g. an open file
+    :param context: Optional dict of extra placeholder values
+    :param page_profile: Optional PageProfile that receives phase timings
+    :param fragment_cache: Optional FragmentCache
+    :param rewriter: Optional UrlRewriter built for the whole build, e.g.
+        with fingerprinted assets (see generate_pages_recursive)
+    :param links: Optional list that receives the page's internal links
+        as [line, url] pairs
+    :param text: Optional list that receives the plain text of every block
+    """
+    page_profile = page_profile or NullProfile()
+    if rewriter is None:
+        rewriter = url_rewriter(basepath)
+    lines = page_profile.timed_iter("read", lines)
+    _, first_line, lines = split_front_matter(lines, parse=False)
+    blocks = page_profile.timed_iter("block split", iter_numbered_blocks(lines, first_line))
+
+    with page_profile.phase("template"):
+        template = load_page_template(template_path, rewriter)
+        describe = "Description" in template.placeholders()
+        titled = context is not None and "Title" in context
+        head = [[line, block, None] for line, block in itertools.islice(blocks, DESCRIPTION_LOOKAHEAD if describe else 1)]
+        head_blocks = parse_head(head, describe, titled)
+        title = context["Title"] if titled else block_title(head_blocks[0])
+        page_context = {
+            "Title": title,
+            "Description": extract_description(head_blocks),
+            "Date": "",
+            "Nav": "",
+        }
+        if context:
+            page_context.update(context)
+        if rewriter is not None:
+            page_context = {key: rewriter.rewrite_html(value) for key, value in page_context.items()}
+        if basepath != '/':
+            page_context["Basepath"] = basepath
+        rest = ((line, block, None) for line, block in blocks)
+        nodes = iter_block_nodes(itertools.chain(head, rest), page_profile, fragment_cache, rewriter, links, text)
+        page_context["Content"] = ParentNode("div", nodes).iter_html(rewriter)
+
+    page_profile.write_chunks(template.iter_render(page_context), out)
+    return title
+
+def generate_page(from_path, template_path, dest_path, basepath="/", context=None, profile=False, fragment_cache=None,
+                  rewriter=None, search=False):
+    """
+    Renders one markdown file with render_page, streaming it from the
+    source file into dest_path. The page is written to a temporary file
+    and renamed into place, so dest_path is never left half-written.
+
+    Returns the page's result dict: its source, its "title", its internal
+    "links" as [line, url] pairs, with search its search "terms" and, when
+    profiling, its PageProfile dict.
+
+    :param context: Optional dict of extra placeholder values
+    :param profile: Time each build phase and include a PageProfile dict
+    :param fragment_cache: Optional path of a FragmentCache database
+    :param rewriter: Optional UrlRewriter, see render_page
+    :param search: Count the page's search terms (see search_index)
+    """
     print(f"Generating page from {from_path} to {template_path} using {dest_path}")
-    markdown = get_file_contents(from_path)
-    template = get_file_contents(template_path)
-    html_content = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown_to_blocks(markdown)[0])
-    page_content = template.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
-    if basepath != '/':
-        # these next two lines are a templating hack for publishing to HitGub, but I'm prepared to forgive myself
-        page_content = page_content.replace('href="/', 'href="/{{ Basepath }}/').replace('src="/', 'src="/{{ Basepath }}/')
-        page_content = page_content.replace("{{ Basepath }}", f"{basepath}")
-    with open(dest_path, "w") as f:
-        f.write(page_content)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
+    page_profile = PageProfile(from_path) if profile else NullProfile()
+    cache = open_fragment_cache(fragment_cache)
+    links = []
+    text = [] if search else None
+
+    with open(from_path, "r") as source, atomic_write(dest_path) as f:
+        title = render_page(source, template_path, f, basepath, context, page_profile, cache, rewriter, links, text)
+
+    if cache is not None:
+        cache.flush()
+    if profile:
+        page_profile.bytes_read = os.path.getsize(from_path)
+        page_profile.bytes_written = os.path.getsize(dest_path)
+    return page_result(from_path, title, links, text, page_profile)
+
+def page_result(source_path, title, links, text, page_profile):
+    result = {
+        "source": source_path,
+        "title": title,
+        "links": links,
+        "profile": page_profile.to_dict() if page_profile.enabled else None,
+    }
+    if text is not None:
+        result["terms"] = count_terms(text)
+    return result
+
+def page_data(result):
+    """
+    Returns what the manifest keeps of a page result until the page is
+    rebuilt.
+    """
+    # links go to the separate link index (see link_index.LinkIndex), which
+    # keeps them out of the whole-file manifest
+    data = {"title": result["title"]}
+    if "terms" in result:
+        data["terms"] = result["terms"]
+    return data
+
+def generate_pages_pipelined(pages, basepath="/", in_flight=PIPELINE_DEPTH, profile=False, fragment_cache=None,
+                             rewriter=None, search=False):
+    """
+    Renders a work list like generate_pages, overlapping I/O with rendering:
+    a thread pool reads upcoming sources and writes finished pages while the
+    calling thread renders. At most in_flight pages are held in memory at
+    once, counting both prefetched sources and rendered pages waiting to be
+    written. Pages are written atomically, as in generate_page.
+
+    :param in_flight: Maximum number of pages read but not yet written
+    :param profile: Include a PageProfile dict in every page result
+    :param fragment_cache: Optional path of a FragmentCache database
+    """
+    in_flight = max(1, in_flight)
+    cache = open_fragment_cache(fragment_cache)
+    slots = threading.BoundedSemaphore(in_flight)
+    reads = collections.deque()
+    writes = []
+    pending = iter(pages)
+
+    def release_slot(future):
+        slots.release()
+
+    def submit_read(executor):
+        page = next(pending, None)
+        if page is None:
+            return
+        slots.acquire()
+        reads.append((page, executor.submit(read_text, page[0])))
+
+    with ThreadPoolExecutor(max_workers=min(in_flight, PIPELINE_IO_THREADS)) as executor:
+        for _ in range(in_flight):
+            submit_read(executor)
+        while reads:
+            (source_path, template_path, dest_path, context), read = reads.popleft()
+            text, bytes_read, read_seconds = read.result()
+            print(f"Generating page from {source_path} to {template_path} using {dest_path}")
+            page_profile = PageProfile(source_path) if profile else NullProfile()
+            page_profile.add("read", read_seconds)
+            page_profile.bytes_read = bytes_read
+            out = io.StringIO()
+            links = []
+            block_text = [] if search else None
+            title = render_page(io.StringIO(text), template_path, out, basepath, context, page_profile, cache, rewriter, links,
+                                block_text)
+            del text
+            write = executor.submit(write_text, dest_path, out.getvalue())
+            write.add_done_callback(release_slot)
+            writes.append((source_path, title, links, block_text, page_profile, write))
+            # blocks until a finished write frees a slot
+            submit_read(executor)
+
+    if cache is not None:
+        cache.flush()
+    results = []
+    for source_path, title, links, block_text, page_profile, write in writes:
+        bytes_written, write_seconds = write.result()
+        page_profile.add("write", write_seconds)
+        page_profile.bytes_written = bytes_written
+        results.append(page_result(source_path, title, links, block_text, page_profile))
+    return results
+
+def collect_pages(dir_path_content, dest_dir_path, front_matter=None):
+    """
+    Walks the content tree and returns a sorted work list of
+    (markdown source, html destination) pairs.
+
+    Only the front matter of each page is read here: drafts are left out
+    before any markdown is parsed, and a slug renames the page's output.
+
+    :param dir_path_content: Root of the markdown content tree
+    :param dest_dir_path: Directory the pages are generated into
+    :param front_matter: Optional dict that receives {source: fields} for
+        the collected pages, so they need not be read again
+    """
+
+    pages = []
+    print(f"Crawling directory: {dir_path_content}")
+    for dir_path, dir_names, file_names in os.walk(dir_path_content):
+        dir_names.sort()
+        for item in sorted(file_names):
+            if not item.endswith(".md"):
+                continue
+            source_path = os.path.join(dir_path, item)
+            fields = read_front_matter(source_path)
+            if is_draft(fields):
+                print(f"Skipping draft: {source_path}")
+                continue
+            if front_matter is not None:
+                front_matter[source_path] = fields
+            pages.append((source_path, page_destination(source_path, dir_path_content, dest_dir_path, fields.get("slug"))))
+    return pages
+
+def page_tree_context(source_path, content_root):
+    """
+    Returns the placeholder values for a page that depend on the content
+    tree rather than on the page's own markdown.
+    """
+    modified = datetime.date.fromtimestamp(os.stat(source_path).st_mtime)
+    return {
+        "Date": modified.isoformat(),
+        "Nav": breadcrumb_nav(source_path, content_root),
+    }
+
+def generate_pages(pages, basepath="/", jobs=1, profile=False, fragment_cache=None, pipeline=0,
+                   rewriter=None, search=False):
+    """
+    Renders a work list of (source, template, destination, context) tuples
+    with generate_page, returning generate_page's result dicts in work list
+    order.
+
+    With jobs > 1 the pages are rendered in a process pool. Every page is
+    written independently, so the output does not depend on the number of
+    workers or the order in which they finish.
+
+    :param jobs: Number of worker processes (0 means one per CPU)
+    :param profile: Include a PageProfile dict in every page result
+    :param fragment_cache: Optional path of a FragmentCache database
+    :param pipeline: Pages in flight for generate_pages_pipelined when
+        rendering in this process (0 renders one page at a time)
+    :param search: Count every page's search terms
+    """
+
+    for dest_dir_path in sorted(set(os.path.dirname(page[2]) for page in pages)):
+        if not os.path.exists(dest_dir_path):
+            print(f"Creating target directory: {dest_dir_path}")
+            os.makedirs(dest_dir_path)
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if (jobs == 1 or len(pages) < 2) and pipeline:
+        return generate_pages_pipelined(pages, basepath, pipeline, profile, fragment_cache, rewriter, search)
+    if jobs == 1 or len(pages) < 2:
+        results = []
+        for source_path, template_path, dest_path, context in pages:
+            results.append(generate_page(source_path, template_path, dest_path, basepath, context, profile, fragment_cache,
+                                         rewriter, search))
+        return results
+
+    # workers open their own connections
+    close_fragment_caches()
+    sources, templates, dests, contexts = zip(*pages)
+    chunksize = max(1, len(pages) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # consume the iterator so worker exceptions are raised here
+        return list(executor.map(generate_page, sources, templates, dests, [basepath] * len(pages), contexts,
+                                 [profile] * len(pages), [fragment_cache] * len(pages), [rewriter] * len(pages),
+                                 [search] * len(pages), chunksize=chunksize))
+
+def page_job(source_path, dest_path, dir_path_content, template_path, fields=None):
+    """
+    Returns the (source, template, destination, context) work item that
+    generate_pages renders for one page.
+
+    :param fields: The page's front matter, which may name its template
+        and set its Title and Date
+    """
+    fields = fields or {}
+    if "template" in fields:
+        page_template_path = resolve_template(fields["template"], source_path, template_path)
+    else:
+        page_template_path = find_template(source_path, dir_path_content, template_path)
+    context = page_tree_context(source_path, dir_path_content)
+    context.update(front_matter_context(fields))
+    return (source_path, page_template_path, dest_path, context)
+
+def page_destination(source_path, dir_path_content, dest_dir_path, slug=None):
+    """
+    Returns the html path of a page. A slug replaces the page's name: the
+    directory name for an index.md page, the file name otherwise.
+    """
+    relative_path = os.path.relpath(source_path, dir_path_content)[:-3]
+    if slug is not None:
+        slug = check_slug(slug, source_path)
+        parent, name = os.path.split(relative_path)
+        if name == "index":
+            relative_path = os.path.join(os.path.dirname(parent), slug, "index")
+        else:
+            relative_path = os.path.join(parent, slug)
+    return os.path.normpath(os.path.join(dest_dir_path, relative_path + ".html"))
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/", manifest_path=None, jobs=1, manifest=None, profile=None, fragment_cache=None, pipeline=0, url_attributes=URL_ATTRIBUTES,
+                             assets=None, images=None, search=False, front_matter=None):
+    """
+    Generates a page for every markdown file under dir_path_content.
+
+    Each page uses the nearest template.html in its content directory or
+    a parent directory, falling back to template_path.
+
+    When manifest_path is given, the build manifest stored there is used to
+    skip pages whose source, template, context and basepath are unchanged
+    since the last build, and to remove pages whose source has been deleted.
+    Long-running callers can pass an already loaded manifest instead.
+
+    Returns the result dicts (see generate_page) of the pages rendered in
+    this build, i.e. not skipped as unchanged.
+
+    :param manifest_path: Optional path of the persistent build manifest
+    :param jobs: Number of worker processes used to render pages
+    :param manifest: Optional BuildManifest to use instead of manifest_path
+    :param profile: Optional BuildProfile that receives phase and page timings
+    :param fragment_cache: Optional path of a FragmentCache database
+    :param pipeline: Pages in flight when overlapping I/O with rendering
+    :param url_attributes: Attribute names whose URLs get the basepath
+    :param assets: Optional {url: fingerprinted url} map of static assets
+    :param images: Optional {url: img attributes} of optimized images
+    :param search: Record every page's search terms in the manifest, for
+        search_index.write_search_index
+    :param front_matter: Optional dict that receives {source: fields} for
+        every page of the site, in work list order (see collect_pages)
+    """
+
+    build_profile = profile if profile is not None else BuildProfile()
+    rewriter = url_rewriter(basepath, url_attributes, assets, images)
+
+    with build_profile.phase("manifest load"):
+        if manifest is None:
+            manifest = BuildManifest.load(manifest_path)
+        manifest.new_build()
+        manifest.set_inputs(basepath=basepath, rewrite=rewriter.key() if rewriter is not None else None, search=search)
 
     if not os.path.exists(dest_dir_path):
-        # make the target directory (since we know it was removed)
         print(f"Creating target directory: {dest_dir_path}")
         os.mkdir(dest_dir_path)
 
-    # find and copy source contents
-    print(f"Crawling directory: {dir_path_content}")
+    with build_profile.phase("collect"):
+        pages = []
+        if front_matter is None:
+            front_matter = {}
+        for source_path, dest_path in collect_pages(dir_path_content, dest_dir_path, front_matter):
+            pages.append(page_job(source_path, dest_path, dir_path_content, template_path, front_matter[source_path]))
+
+    with build_profile.phase("manifest check"):
+        # template and partials of each template, the edges of the page
+        # dependency graph kept in the manifest
+        dependencies = {}
+        for page_template_path in sorted(set(page[1] for page in pages)):
+            dependencies[page_template_path] = template_dependencies(page_template_path)
+        dirty_pages = []
+        for source_path, page_template_path, dest_path, context in pages:
+            if manifest.is_current(source_path, dest_path, dependencies[page_template_path], context):
+                print(f"Skipping unchanged page: {source_path}")
+            else:
+                dirty_pages.append((source_path, page_template_path, dest_path, context))
 
-    contents = os.listdir(dir_path_content)
-    for item in contents:
+    with build_profile.phase("render"):
+        results = generate_pages(dirty_pages, basepath, jobs, profile is not None, fragment_cache, pipeline, rewriter, search)
+        build_profile.add_pages(result["profile"] for result in results)
 
-        # print(f"item: {item}")
-        source_subpath = os.path.join(dir_path_content, item)
-        target_subpath = os.path.join(dest_dir_path, item)
+    with build_profile.phase("manifest save"):
+        for (source_path, page_template_path, dest_path, context), result in zip(dirty_pages, results):
+            manifest.record(source_path, dest_path, dependencies[page_template_path], context, page_data(result))
+        manifest.remove_stale()
+        manifest.save()
+    return results
 
-        if os.path.isfile(source_subpath):
-            print(f"found file: {source_subpath}")
-            target_filename = item[:-3] + ".html"
-            generate_page(source_subpath, template_path, os.path.join(dest_dir_path, target_filename), basepath)
-        else:
-            print(f"Recursing into {source_subpath}")
-            generate_pages_recursive(source_subpath, template_path, target_subpath, basepath)
+def rebuild_page(source_path, dir_path_content, template_path, dest_dir_path, basepath, manifest, fragment_cache=None,
+                 search=False):
+    """
+    Regenerates a single page whose markdown changed and records it in the
+    manifest, without walking the rest of the content tree. Pages that were
+    added or removed change other pages' navigation, so those should go
+    through generate_pages_recursive instead.
+
+    Returns the page's result dict (see generate_page), or None when its
+    front matter turned it into a draft or moved its output, which also
+    needs a full rebuild.
+    """
+    fields = read_front_matter(source_path)
+    dest_path = page_destination(source_path, dir_path_content, dest_dir_path, fields.get("slug"))
+    entry = manifest.entries.get(source_path)
+    if is_draft(fields) or (entry is not None and entry["output"] != dest_path):
+        return None
+    job = page_job(source_path, dest_path, dir_path_content, template_path, fields)
+    result, = generate_pages([job], basepath, fragment_cache=fragment_cache, search=search)
+    manifest.record(source_path, dest_path, template_dependencies(job[1]), job[3], page_data(result))
+    return result
 
 def get_header_from_block(block):
-    matches = re.findall(r"^(#{1,6}) +(.*)$", block)
-    if len(matches) == 0:
-        raise Exception("No header detected")
-    tag = f"h{len(matches[0][0])}"
-    return LeafNode(tag, matches[0][1])
+    return render_html_node(parse_block(block, BlockType.HEADING))
 
 def get_codeblock_from_block(block):
-    matches = re.findall(r"```\n(.*)```", block, re.DOTALL)
-    codeblock = LeafNode("code", matches[0])
-    preformat_node = ParentNode("pre", [codeblock])
-    return preformat_node
+    return render_html_node(parse_block(block, BlockType.CODE))
 
 def get_blockquote_from_block(block):
-    matches = re.findall(r"> (.*)", block, re.MULTILINE)
-    quoteblock = LeafNode("blockquote", "\n".join(matches))
-    return quoteblock
+    return render_html_node(parse_block(block, BlockType.QUOTE))
 
 def get_ul_from_block(block):
-    matches = re.findall(r"- (.*)", block, re.MULTILINE)
-    children = []
-    for match in matches:
-        text_nodes = text_to_textnodes(match)
-        # print(f"text_nodes: {text_nodes}")
-        leaf_nodes = []
-        for node in text_nodes:
-            leaf_nodes.append(text_node_to_html_node(node))
-        children.append(ParentNode("li", leaf_nodes))
-    return ParentNode("ul", children)
+    return render_html_node(parse_block(block, BlockType.UNORDERED_LIST))
 
 def get_ol_from_block(block):
-    matches = re.findall(r"\d+\. (.*)", block, re.MULTILINE)
-    children = []
-    for match in matches:
-        text_nodes = text_to_textnodes(match)
-        # print(f"text_nodes: {text_nodes}")
-        leaf_nodes = []
-        for node in text_nodes:
-            leaf_nodes.append(text_node_to_html_node(node))
-        children.append(ParentNode("li", leaf_nodes))
-    return ParentNode("ol", children)
+    return render_html_node(parse_block(block, BlockType.ORDERED_LIST))
 
 def get_para_from_block(block):
-    text_nodes = text_to_textnodes(block)
-    leaf_nodes = []
-    for node in text_nodes:
-        leaf_nodes.append(text_node_to_html_node(node))
-    return ParentNode("p", leaf_nodes)
+    return render_html_node(parse_block(block, BlockType.PARAGRAPH))
 
 def markdown_to_html_node(markdown):
     """
     Converts a markdown block to a parent ParentNode (i.e. a DIV)
     with recursively nested subnodes, each of the appropriate tag.
+
+    Given an open file (or any iterable of lines) instead of a string, the
+    children are converted lazily while the node is serialized, so the node
+    can be written out with iter_html() or write_to() exactly once.
     
-    :param markdown: Markdown text 
+    :param markdown: Markdown text, or an iterable of markdown lines
     """
 
-    children = []
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
+    if not isinstance(markdown, str):
+        return ParentNode("div", iter_block_nodes((line, block, None) for line, block in iter_numbered_blocks(markdown)))
+
+    return render_html(parse_block(block) for block in markdown_to_blocks(markdown))
 
-        block_type = block_to_block_type(block)
-        #print(f"\nDetected block type: {block_type} for block: {block[:20]}")
-
-        match block_type:
-            case BlockType.HEADING:
-                children.append(get_header_from_block(block))
-            case BlockType.CODE:
-                children.append(get_codeblock_from_block(block))
-            case BlockType.QUOTE:
-                children.append(get_blockquote_from_block(block))
-            case BlockType.UNORDERED_LIST:
-                children.append(get_ul_from_block(block))
-            case BlockType.ORDERED_LIST:
-                children.append(get_ol_from_block(block))
-            case BlockType.PARAGRAPH:
-                children.append(get_para_from_block(block))
-            case _:
-                raise Exception("unexpected block type")
-    
-    # create a parent node and return it
-    return ParentNode("div", children)
-
-
-def text_node_to_html_node(text_node):
-    match text_node.text_type:
-        case TextType.TEXT:
-            return LeafNode(None, text_node.text)
-        case TextType.BOLD:
-            return LeafNode("b", text_node.text)
-        case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
-        case TextType.CODE:
-            return LeafNode("code", text_node.text)
-        case TextType.LINK:
-            props = {}
-            props["href"] = text_node.url
-            return LeafNode("a", text_node.text, props)
-        case TextType.IMAGE:
-            props = {}
-            props["src"] = text_node.url
-            props["alt"] = text_node.text
-            return LeafNode("img", "", props)
-        case _:
-            raise Exception("unknown text type")
-        
 def text_type_from_delimiter(delimiter):
     match delimiter:
         case '**':
@@ -344,14 +773,14 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 def text_to_textnodes(text):
+    """
+    Converts inline markdown to a list of TextNodes.
 
-    node = TextNode(text, TextType.TEXT)
-    bold_nodes = split_nodes_delimiter([node], '**', TextType.BOLD)
-    code_nodes = split_nodes_delimiter(bold_nodes, '`', TextType.CODE)
-    italic_nodes = split_nodes_delimiter(code_nodes, '_', TextType.ITALIC)
-    image_nodes = split_nodes_image(italic_nodes)
-    new_nodes = split_nodes_link(image_nodes)
+    This is equivalent to chaining split_nodes_delimiter (for **, ` and _),
+    split_nodes_image and split_nodes_link, but done in one linear scan by
+    inline_lexer.tokenize_inline.
 
-    # print(f"Nodes: {new_nodes}")
+    :param text: Inline markdown text
+    """
 
-    return new_nodes
+    return tokenize_inline(text)
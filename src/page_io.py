@@ -0,0 +1,44 @@
+import os, time
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_write(file_path, mode="w"):
+    """
+    Opens a temporary file next to file_path for writing and renames it over
+    file_path once the block completes, so readers (and deploys) only ever
+    see the old file or the complete new one. On error the temporary file
+    is removed and file_path is left untouched.
+
+    :param file_path: Path of the file to replace
+    :param mode: "w" for text or "wb" for bytes
+    """
+    tmp_path = file_path + ".tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_text(file_path):
+    """
+    Returns (text, bytes read, seconds spent reading) for a file.
+    """
+    start = time.perf_counter()
+    with open(file_path, "r") as f:
+        text = f.read()
+        size = f.tell()
+    return text, size, time.perf_counter() - start
+
+def write_text(file_path, text):
+    """
+    Atomically replaces file_path with text and returns (bytes written,
+    seconds spent writing).
+    """
+    start = time.perf_counter()
+    with atomic_write(file_path) as f:
+        f.write(text)
+        size = f.tell()
+    return size, time.perf_counter() - start
@@ -0,0 +1,160 @@
+import os, re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ *(\w+) *\}\}")
+PARTIAL_PATTERN = re.compile(r"\{\{> *([\w.-]+(?:/[\w.-]+)*) *\}\}")
+TEMPLATE_FILENAME = "template.html"
+PARTIALS_DIR = "partials"
+
+class PageTemplate():
+    """
+    A template parsed once into a list of literal and placeholder segments.
+
+    Rendering walks the segments and substitutes values from a context dict,
+    so a page costs one pass over the template instead of a chain of
+    str.replace calls. Placeholders missing from the context are left as
+    they were written.
+    """
+
+    def __init__(self, source, path=None, partials=()):
+        self.path = path
+        # the source with partials expanded, kept for map_source
+        self.source = source
+        # paths of the partials included while the source was expanded
+        self.partials = list(partials)
+        # (is_placeholder, text) pairs; text is the name for placeholders
+        self.segments = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > position:
+                self.segments.append((False, source[position:match.start()]))
+            self.segments.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            self.segments.append((False, source[position:]))
+
+    def placeholders(self):
+        return [text for is_placeholder, text in self.segments if is_placeholder]
+
+    def map_source(self, function):
+        """
+        Returns a copy of the template parsed from function(source), e.g. to
+        rewrite URLs once per build. The function sees whole tags, including
+        tags that hold a placeholder, such as <img src="/a.png" alt="{{ Title }}">,
+        which would be split across segments.
+        """
+        return PageTemplate(function(self.source), self.path, self.partials)
+
+    def iter_render(self, context):
+        """
+        Yields the rendered page in chunks. A context value may be a string
+        or an iterable of string chunks, such as HTMLNode.iter_html().
+        """
+        for is_placeholder, text in self.segments:
+            if not is_placeholder:
+                yield text
+            elif text not in context:
+                yield f"{{{{ {text} }}}}"
+            elif isinstance(context[text], str):
+                yield context[text]
+            else:
+                yield from context[text]
+
+    def render(self, context):
+        return "".join(self.iter_render(context))
+
+def find_partial(name, template_path):
+    """
+    Returns the path of the partial {{> name }}: partials/<name>.html (or
+    partials/<name>, when name has an extension) in the directory of the
+    template that includes it or the nearest parent directory that has
+    one.
+    """
+    if ".." in name.split("/"):
+        raise Exception(f"{template_path}: invalid partial name {name!r}")
+    file_name = name if os.path.splitext(name)[1] else name + ".html"
+    dir_path = os.path.dirname(template_path)
+    while True:
+        candidate = os.path.join(dir_path, PARTIALS_DIR, *file_name.split("/"))
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+        parent = os.path.dirname(dir_path)
+        if not dir_path or parent == dir_path:
+            raise Exception(f"{template_path}: partial {name!r} not found")
+        dir_path = parent
+
+def expand_partials(source, template_path, partials, including=()):
+    """
+    Returns source with every {{> name }} replaced by the contents of the
+    partial, itself expanded, so placeholders inside partials are rendered
+    like the template's own. The path of every partial used is appended to
+    partials. One trailing newline of a partial file is dropped.
+
+    :param including: Paths of the partials being expanded, to catch cycles
+    """
+    def include(match):
+        partial_path = find_partial(match.group(1), template_path)
+        if partial_path in including:
+            raise Exception(f"{template_path}: partial {match.group(1)!r} includes itself")
+        if partial_path not in partials:
+            partials.append(partial_path)
+        with open(partial_path, "r") as f:
+            text = f.read()
+        if text.endswith("\n"):
+            text = text[:-1]
+        return expand_partials(text, partial_path, partials, including + (partial_path,))
+    return PARTIAL_PATTERN.sub(include, source)
+
+def file_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+template_cache = {}
+
+def load_template(template_path):
+    """
+    Returns the parsed PageTemplate for template_path, with its partials
+    included. Templates are parsed once per process and re-read only when
+    the size or mtime of the file or of one of its partials change.
+
+    :param template_path: Path of the template file
+    """
+    cached = template_cache.get(template_path)
+    if cached is not None and all(file_key(path) == key for path, key in cached[0]):
+        return cached[1]
+    with open(template_path, "r") as f:
+        source = f.read()
+    partials = []
+    template = PageTemplate(expand_partials(source, template_path, partials), template_path, partials)
+    template_cache[template_path] = ([(path, file_key(path)) for path in [template_path] + partials], template)
+    return template
+
+def template_dependencies(template_path):
+    """
+    Returns the files a page rendered with template_path depends on: the
+    template and every partial it includes.
+    """
+    return [template_path] + load_template(template_path).partials
+
+def find_template(source_path, content_root, default_template_path):
+    """
+    Returns the template for a page: the nearest template.html in the page's
+    directory or one of its parents inside content_root, falling back to
+    default_template_path.
+
+    :param source_path: Path of the markdown page
+    :param content_root: Root of the content tree
+    :param default_template_path: Site-wide template
+    """
+    root = os.path.normpath(content_root)
+    dir_path = os.path.dirname(os.path.normpath(source_path))
+    while True:
+        candidate = os.path.join(dir_path, TEMPLATE_FILENAME)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(dir_path)
+        if dir_path == root or parent == dir_path:
+            return default_template_path
+        dir_path = parent
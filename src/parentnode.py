@@ -1,22 +1,23 @@
 from htmlnode import HTMLNode
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def iter_html(self, url_rewriter=None):
         if not self.tag:
             raise ValueError("missing node tag")
         if not self.children:
             raise ValueError("parent tag must have children")
-        
-        inner_html = ""
-        for child in self.children:
-            inner_html += child.to_html()
 
-        props_string = "" if not self.props else self.props_to_html()
+        props_string = "" if not self.props else self.props_to_html(url_rewriter)
 
-        return f"<{self.tag}{props_string}>{inner_html}</{self.tag}>"
+        yield f"<{self.tag}{props_string}>"
+        for child in self.children:
+            yield from child.iter_html(url_rewriter)
+        yield f"</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
\ No newline at end of file
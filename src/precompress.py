@@ -0,0 +1,146 @@
+import gzip, os
+from concurrent.futures import ProcessPoolExecutor
+from page_io import atomic_write
+
+try:
+    import brotli
+except ImportError:
+    # without the brotli package only .gz files are written
+    brotli = None
+
+COMPRESS_EXTENSIONS = (".html", ".css", ".js", ".json", ".txt", ".xml", ".svg")
+# files smaller than this gain too little to be worth a second copy
+DEFAULT_MIN_SIZE = 1024
+
+def available_encodings():
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+def compress(data, encoding):
+    if encoding == ".gz":
+        # mtime=0 keeps the output identical across builds
+        return gzip.compress(data, 9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def is_compressed_copy(path, extensions):
+    # data.tar.gz is a static file in its own right, index.html.gz is not
+    return path.endswith((".gz", ".br")) and path[:-3].lower().endswith(extensions + COMPRESS_EXTENSIONS)
+
+def wants_copy(path, extensions, min_size):
+    return path.lower().endswith(extensions) and os.path.getsize(path) >= min_size
+
+class PrecompressStats():
+    """
+    Counts what precompress_site did.
+    """
+    def __init__(self):
+        self.compressed_files = 0
+        self.skipped_files = 0
+        self.removed_files = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+
+    def __repr__(self):
+        return (f"PrecompressStats(compressed {self.compressed_files} files / {self.input_bytes} -> {self.output_bytes} bytes, "
+                f"skipped {self.skipped_files} files, removed {self.removed_files} files)")
+
+def is_up_to_date(path, compressed_path):
+    """
+    A compressed copy is stamped with the mtime of the file it was made
+    from, so it is current as long as that file has not been rewritten.
+    """
+    return os.path.exists(compressed_path) and os.stat(compressed_path).st_mtime_ns == os.stat(path).st_mtime_ns
+
+def precompress_file(path, encodings):
+    """
+    Writes path.gz (and path.br) next to path and returns (input bytes,
+    output bytes). The copies get the mtime of path.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    stat = os.stat(path)
+    output_size = 0
+    for encoding in encodings:
+        compressed = compress(data, encoding)
+        with atomic_write(path + encoding, "wb") as f:
+            f.write(compressed)
+        os.utime(path + encoding, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        output_size += len(compressed)
+    return len(data), output_size
+
+def precompress_site(dest_dir, extensions=COMPRESS_EXTENSIONS, min_size=DEFAULT_MIN_SIZE, jobs=1, keep=()):
+    """
+    Writes compressed copies of the generated files in dest_dir for static
+    servers to send as-is, and returns a PrecompressStats.
+
+    Only files with one of the given extensions and at least min_size bytes
+    are compressed; files whose copies are up to date are skipped. Copies
+    left over from files that were removed or no longer qualify are
+    deleted. Files listed in keep, such as a shipped static data.json.gz,
+    are never deleted or overwritten.
+
+    :param extensions: File extensions to compress
+    :param min_size: Smallest file size, in bytes, worth compressing
+    :param jobs: Number of worker processes (0 means one per CPU)
+    :param keep: Paths of files in dest_dir written by other build steps
+    """
+    stats = PrecompressStats()
+    encodings = available_encodings()
+    extensions = tuple(extension.lower() for extension in extensions)
+    keep = set(os.path.normpath(path) for path in keep)
+    pending = []
+    for dirpath, _, filenames in os.walk(dest_dir):
+        names = set(filenames)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if is_compressed_copy(filename, extensions):
+                if os.path.normpath(path) in keep:
+                    continue
+                if filename[:-3] not in names or filename[-3:] not in encodings \
+                        or not wants_copy(path[:-3], extensions, min_size):
+                    print(f"Removing stale compressed file: {path}")
+                    os.remove(path)
+                    stats.removed_files += 1
+            elif wants_copy(path, extensions, min_size) \
+                    and not any(os.path.normpath(path + encoding) in keep for encoding in encodings):
+                if all(is_up_to_date(path, path + encoding) for encoding in encodings):
+                    stats.skipped_files += 1
+                else:
+                    pending.append(path)
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(pending) < 2:
+        results = [precompress_file(path, encodings) for path in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(precompress_file, pending, [encodings] * len(pending), chunksize=8))
+    for input_size, output_size in results:
+        stats.compressed_files += 1
+        stats.input_bytes += input_size
+        stats.output_bytes += output_size
+    return stats
+
+def remove_precompressed(dest_dir, extensions=COMPRESS_EXTENSIONS, keep=()):
+    """
+    Deletes the compressed copies an earlier --precompress build left in
+    dest_dir, once precompression is turned off, so servers that send
+    .gz/.br files as-is never serve stale pages. Returns the number of
+    files removed.
+
+    :param keep: Paths of files in dest_dir written by other build steps,
+        which are left alone even when they look like copies
+    """
+    extensions = tuple(extension.lower() for extension in extensions)
+    keep = set(os.path.normpath(path) for path in keep)
+    removed = 0
+    for dirpath, _, filenames in os.walk(dest_dir):
+        names = set(filenames)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.normpath(path) in keep:
+                continue
+            if filename.endswith((".gz", ".br")) and (filename[:-3] in names or is_compressed_copy(filename, extensions)):
+                print(f"Removing stale compressed file: {path}")
+                os.remove(path)
+                removed += 1
+    return removed
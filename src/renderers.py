@@ -0,0 +1,99 @@
+import json
+from leafnode import LeafNode
+from parentnode import ParentNode
+from markdown_enums import TextType, BlockType
+
+def text_node_to_html_node(text_node):
+    match text_node.text_type:
+        case TextType.TEXT:
+            return LeafNode(None, text_node.text)
+        case TextType.BOLD:
+            return LeafNode("b", text_node.text)
+        case TextType.ITALIC:
+            return LeafNode("i", text_node.text)
+        case TextType.CODE:
+            return LeafNode("code", text_node.text)
+        case TextType.LINK:
+            props = {}
+            props["href"] = text_node.url
+            return LeafNode("a", text_node.text, props)
+        case TextType.IMAGE:
+            props = {}
+            props["src"] = text_node.url
+            props["alt"] = text_node.text
+            return LeafNode("img", "", props)
+        case _:
+            raise Exception("unknown text type")
+
+def render_html_node(block):
+    """
+    Renders a Block of the markdown AST to its HTML node.
+    """
+    match block.block_type:
+        case BlockType.HEADING:
+            return LeafNode(f"h{block.level}", block.text)
+        case BlockType.CODE:
+            return ParentNode("pre", [LeafNode("code", block.text)])
+        case BlockType.QUOTE:
+            return LeafNode("blockquote", block.text)
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            items = [ParentNode("li", [text_node_to_html_node(node) for node in item]) for item in block.children]
+            return ParentNode("ul" if block.block_type == BlockType.UNORDERED_LIST else "ol", items)
+        case BlockType.PARAGRAPH:
+            return ParentNode("p", [text_node_to_html_node(node) for node in block.children])
+        case _:
+            raise Exception("unexpected block type")
+
+def render_html(blocks):
+    """
+    Renders the Blocks of a document to the <div> node holding the page
+    content.
+    """
+    return ParentNode("div", [render_html_node(block) for block in blocks])
+
+def inline_text(text_nodes):
+    # images contribute their alt text
+    return "".join(node.text for node in text_nodes)
+
+def block_plain_text(block):
+    """
+    Returns the text of a Block without any markup, e.g. for search
+    indexing or descriptions. List items are put on lines of their own.
+    """
+    if block.block_type == BlockType.PARAGRAPH:
+        return inline_text(block.children)
+    if block.children is not None:
+        return "\n".join(inline_text(item) for item in block.children)
+    return block.text
+
+def render_plain_text(blocks):
+    return "\n\n".join(block_plain_text(block) for block in blocks)
+
+def text_node_json(text_node):
+    data = {"type": str(text_node.text_type), "text": text_node.text}
+    if text_node.url is not None:
+        data["url"] = text_node.url
+    return data
+
+def block_json(block):
+    """
+    Returns a Block as a dict of JSON values.
+    """
+    data = {"type": str(block.block_type)}
+    if block.line is not None:
+        data["line"] = block.line
+    if block.level is not None:
+        data["level"] = block.level
+    if block.text is not None:
+        data["text"] = block.text
+    if block.block_type == BlockType.PARAGRAPH:
+        data["children"] = [text_node_json(node) for node in block.children]
+    elif block.children is not None:
+        data["items"] = [[text_node_json(node) for node in item] for item in block.children]
+    return data
+
+def render_json(blocks, indent=None):
+    """
+    Dumps the Blocks of a document as a JSON list.
+    """
+    return json.dumps([block_json(block) for block in blocks], indent=indent, ensure_ascii=False)
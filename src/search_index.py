@@ -0,0 +1,141 @@
+import json, os, re
+from page_io import atomic_write
+from url_rewrite import page_url
+
+SEARCH_DIR = "search"
+# shards hold the terms sharing their first SHARD_PREFIX_LENGTH characters
+# by default: longer prefixes make smaller but more numerous shards
+SHARD_PREFIX_LENGTH = 2
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 30
+# bumped when tokenizing or the file layout changes; search.js checks it
+INDEX_VERSION = 1
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but
+by can did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their theirs them themselves then
+there these they this those through to too under until up very was we were what when where which while who whom why
+will with you your yours yourself yourselves
+""".split())
+
+def stem(word):
+    """
+    Strips common English suffixes so that e.g. "link", "links", "linked"
+    and "linking" share one term. This is a deliberately small stemmer; search.js
+    implements the same rules for queries.
+    """
+    for suffix, replacement in (("ies", "y"), ("sses", "ss"), ("ing", ""), ("ed", ""), ("ly", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= 3:
+            if suffix == "s" and word.endswith(("ss", "us", "is")):
+                return word
+            word = word[:len(word) - len(suffix)] + replacement
+            if suffix in ("ing", "ed") and word[-1] == word[-2] and word[-1] not in "aeiouylsz":
+                # running -> runn -> run
+                word = word[:-1]
+            return word
+    return word
+
+def tokenize(text):
+    """
+    Yields the index terms of a text: lowercased words that are not
+    stopwords, stemmed.
+    """
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word in STOPWORDS or not MIN_TERM_LENGTH <= len(word) <= MAX_TERM_LENGTH:
+            continue
+        yield stem(word)
+
+def count_terms(texts):
+    """
+    Returns {term: occurrences} for an iterable of texts, e.g. the plain
+    text of every block of a page.
+    """
+    counts = {}
+    for text in texts:
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+    return dict(sorted(counts.items()))
+
+def build_search_shards(pages, prefix_length=SHARD_PREFIX_LENGTH):
+    """
+    Builds the inverted index of a list of (url, title, {term: count})
+    pages and returns (page list, {shard key: {term: postings}}). Postings
+    are [page number, count] pairs, page numbers pointing into the page
+    list, which is sorted by URL.
+    """
+    pages = sorted(pages)
+    shards = {}
+    for number, (_, _, terms) in enumerate(pages):
+        for term, count in terms.items():
+            shards.setdefault(term[:prefix_length], {}).setdefault(term, []).append([number, count])
+    for shard in shards.values():
+        for term in shard:
+            # most frequent first, so the client can stop reading early
+            shard[term].sort(key=lambda posting: -posting[1])
+    return [[url, title] for url, title, _ in pages], shards
+
+def write_if_changed(path, text):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            if f.read() == text:
+                return False
+    with atomic_write(path) as f:
+        f.write(text)
+    return True
+
+def write_search_index(pages, dest_dir, prefix_length=SHARD_PREFIX_LENGTH):
+    """
+    Writes the search index for a list of (url, title, {term: count})
+    pages into dest_dir/search/: index.json with the page list and shard
+    keys, and one <key>.json postings file per shard, which the browser
+    loads only when a query needs it. Unchanged files are not rewritten
+    and shards that no longer exist are removed. When pages is None, an
+    index left by an earlier build is removed.
+
+    Returns (files written, files unchanged, files removed).
+    """
+    search_dir = os.path.join(dest_dir, SEARCH_DIR)
+    files = {}
+    if pages is not None:
+        os.makedirs(search_dir, exist_ok=True)
+        page_list, shards = build_search_shards(pages, prefix_length)
+        files["index.json"] = {
+            "version": INDEX_VERSION,
+            "prefix": prefix_length,
+            "pages": page_list,
+            "shards": sorted(shards),
+        }
+        for key, shard in shards.items():
+            files[f"{key}.json"] = shard
+    elif not os.path.exists(os.path.join(search_dir, "index.json")):
+        return 0, 0, 0
+
+    written = unchanged = removed = 0
+    for name, data in sorted(files.items()):
+        if write_if_changed(os.path.join(search_dir, name), json.dumps(data, separators=(",", ":"), ensure_ascii=False)):
+            written += 1
+        else:
+            unchanged += 1
+    for name in sorted(os.listdir(search_dir)):
+        if name.endswith(".json") and name not in files:
+            print(f"Removing stale search index file: {name}")
+            os.remove(os.path.join(search_dir, name))
+            removed += 1
+    if pages is None and not os.listdir(search_dir):
+        os.rmdir(search_dir)
+    return written, unchanged, removed
+
+def site_search_pages(page_manifest, dest_dir, prefix=""):
+    """
+    Returns the (url, title, {term: count}) of every page in the manifest
+    that recorded search terms.
+    """
+    pages = []
+    for source_path, entry in page_manifest.entries.items():
+        data = page_manifest.data(source_path)
+        if "terms" in data:
+            pages.append((page_url(entry["output"], dest_dir, prefix), data.get("title", ""), data["terms"]))
+    return pages
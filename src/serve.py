@@ -0,0 +1,208 @@
+import argparse, functools, os, sys, threading, time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from build_manifest import BuildManifest
+from link_index import LinkIndex
+from markdown_conversion import generate_pages_recursive, rebuild_page
+from page_template import TEMPLATE_FILENAME, PARTIALS_DIR
+from main import STATIC_DIR, CONTENT_DIR, TEMPLATE_PATH, DEST_DIR, PAGE_MANIFEST_PATH, STATIC_MANIFEST_PATH, FRAGMENT_CACHE_PATH
+from main import LINK_INDEX_PATH
+from main import sync_static_contents, sync_static_file
+
+def snapshot(paths):
+    """
+    Returns {file path: (size, mtime_ns)} for every file under paths.
+    """
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+            continue
+        for dir_path, _, file_names in os.walk(path):
+            for item in file_names:
+                file_path = os.path.join(dir_path, item)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def is_under(path, dir_path):
+    return os.path.normpath(path).startswith(os.path.normpath(dir_path) + os.sep)
+
+class SiteWatcher():
+    """
+    Polls the content, static and template inputs and applies the smallest
+    rebuild that covers each change:
+
+    * an edited markdown page is regenerated on its own;
+    * an added or removed page, or any template or partial, goes through the
+      incremental generate_pages_recursive, which re-renders exactly the
+      pages whose inputs or navigation changed;
+    * a static file is copied or deleted on its own.
+
+    Both manifests stay in memory between rebuilds and are saved by save().
+    The links of every rendered page are stored in the link index, so the
+    next main.py build checks them even though it skips the page.
+    """
+
+    def __init__(self, basepath="/", jobs=1, content_dir=CONTENT_DIR, static_dir=STATIC_DIR,
+                 template_path=TEMPLATE_PATH, dest_dir=DEST_DIR,
+                 page_manifest_path=PAGE_MANIFEST_PATH, static_manifest_path=STATIC_MANIFEST_PATH, fragment_cache=None,
+                 link_index_path=LINK_INDEX_PATH):
+        self.basepath = basepath
+        self.jobs = jobs
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.fragment_cache = fragment_cache
+        self.link_index_path = link_index_path
+        self.page_manifest = BuildManifest.load(page_manifest_path)
+        self.static_manifest = BuildManifest.load(static_manifest_path)
+        self.files = {}
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, self.template_path,
+                os.path.join(os.path.dirname(self.template_path), PARTIALS_DIR)]
+
+    def build(self):
+        self.files = snapshot(self.watched_paths())
+        self.static_manifest.new_build()
+        sync_static_contents(self.static_dir, self.dest_dir, self.static_manifest)
+        self.static_manifest.remove_stale()
+        self.generate_all_pages()
+        self.save()
+
+    def generate_all_pages(self):
+        results = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, self.basepath,
+                                           jobs=self.jobs, manifest=self.page_manifest, fragment_cache=self.fragment_cache)
+        self.store_links(results)
+
+    def store_links(self, results):
+        if not results:
+            return
+        link_index = LinkIndex(self.link_index_path, self.dest_dir)
+        if link_index.reset and not set(self.page_manifest.entries) <= set(result["source"] for result in results):
+            # a new index needs the links of every page, which only a
+            # full render gives it
+            self.page_manifest.invalidate()
+        else:
+            for result in results:
+                link_index.update(result["source"], self.page_manifest.entries[result["source"]]["output"], result["links"])
+            link_index.save()
+        link_index.close()
+
+    def poll(self):
+        """
+        Rebuilds whatever changed since the last poll and returns the list
+        of changed input paths.
+        """
+        files = snapshot(self.watched_paths())
+        changed = sorted(path for path in set(files) | set(self.files) if files.get(path) != self.files.get(path))
+        if changed:
+            self.apply(changed, self.files, files)
+        self.files = files
+        return changed
+
+    def update(self, paths):
+        """
+        Rebuilds for a list of input paths reported as changed, e.g. by an
+        editor, without polling the whole tree, and returns the ones that
+        did change since the last poll or update.
+        """
+        files = dict(self.files)
+        for path in paths:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                files[path] = (stat.st_size, stat.st_mtime_ns)
+            else:
+                files.pop(path, None)
+        changed = sorted(path for path in set(paths) if files.get(path) != self.files.get(path))
+        if changed:
+            self.apply(changed, self.files, files)
+        self.files = files
+        return changed
+
+    def apply(self, changed, old_files, new_files):
+        self.page_manifest.new_build()
+        rebuild_all_pages = False
+
+        for path in changed:
+            if path == self.template_path or os.path.basename(path) == TEMPLATE_FILENAME or PARTIALS_DIR in path.split(os.sep):
+                rebuild_all_pages = True
+            elif is_under(path, self.content_dir):
+                if path.endswith(".md") and path in old_files and path in new_files:
+                    result = rebuild_page(path, self.content_dir, self.template_path, self.dest_dir, self.basepath,
+                                          self.page_manifest, self.fragment_cache)
+                    if result is None:
+                        rebuild_all_pages = True
+                    else:
+                        self.store_links([result])
+                elif path.endswith(".md"):
+                    rebuild_all_pages = True
+            elif is_under(path, self.static_dir):
+                target_path = os.path.join(self.dest_dir, os.path.relpath(path, self.static_dir))
+                if path in new_files:
+                    sync_static_file(path, target_path, self.static_manifest)
+                else:
+                    self.static_manifest.forget(path)
+                    if os.path.exists(target_path):
+                        print(f"Removing stale output: {target_path}")
+                        os.remove(target_path)
+
+        if rebuild_all_pages:
+            self.generate_all_pages()
+
+    def save(self):
+        self.page_manifest.save()
+        self.static_manifest.save()
+
+class NoCacheHandler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        # always revalidate, so a reload shows the latest rebuild
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+def start_server(directory, host, port):
+    handler = functools.partial(NoCacheHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {directory} at http://{host}:{server.server_address[1]}/")
+    return server
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the site and serve docs/ locally")
+    parser.add_argument("--watch", action="store_true", help="rebuild affected pages and assets when inputs change")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between polls of the inputs")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processes used for full page rebuilds")
+    parser.add_argument("--fragment-cache", nargs="?", const=FRAGMENT_CACHE_PATH, metavar="PATH",
+                        help="reuse the rendered HTML of unchanged blocks across rebuilds")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    watcher = SiteWatcher("/", args.jobs, fragment_cache=args.fragment_cache)
+    watcher.build()
+    server = start_server(DEST_DIR, args.host, args.port)
+    try:
+        while True:
+            time.sleep(args.interval)
+            if not args.watch:
+                continue
+            start = time.perf_counter()
+            changed = watcher.poll()
+            if changed:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rebuilt {len(changed)} changed input(s) in {elapsed:.1f} ms: {', '.join(changed)}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        watcher.save()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
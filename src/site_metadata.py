@@ -0,0 +1,283 @@
+import datetime, itertools, json, os
+from xml.sax.saxutils import escape as xml_escape
+from build_manifest import context_hash, hash_file
+from leafnode import LeafNode
+from parentnode import ParentNode
+from markdown_conversion import DESCRIPTION_LOOKAHEAD, iter_numbered_blocks, parse_head, block_title, block_summary
+from markdown_conversion import load_page_template
+from page_io import atomic_write
+from front_matter import split_front_matter
+from page_template import find_template, template_dependencies
+from url_rewrite import page_url
+
+BLOG_DIR = "blog"
+SITEMAP_PATH = "sitemap.xml"
+FEED_PATH = "feed.xml"
+FEED_ENTRIES = 20
+# bumped when the aggregate outputs change for the same metadata
+AGGREGATES_VERSION = 1
+# bumped when read_page_metadata returns something else for the same page
+METADATA_VERSION = 1
+
+def read_page_metadata(source_path, dest_path, dest_dir, fields=None):
+    """
+    Returns the metadata of a page without rendering it: only the blocks
+    up to the first paragraph (at most DESCRIPTION_LOOKAHEAD) are read
+    and parsed.
+
+        {"source", "url", "title", "summary", "date", "updated"}
+
+    url is site-absolute, without the basepath, like links in markdown.
+    A title or date in the page's front matter (fields) is used over the
+    h1 heading and the file's modification time.
+    """
+    fields = fields or {}
+    titled = "title" in fields
+    with open(source_path, "r") as f:
+        _, first_line, body = split_front_matter(f, source_path, parse=False)
+        head = [[line, block, None] for line, block in itertools.islice(iter_numbered_blocks(body, first_line), DESCRIPTION_LOOKAHEAD)]
+    blocks = parse_head(head, True, titled)
+    if "date" in fields:
+        date = str(fields["date"])
+        updated = date if "T" in date else date + "T00:00:00Z"
+    else:
+        modified = os.stat(source_path).st_mtime
+        date = datetime.date.fromtimestamp(modified).isoformat()
+        updated = datetime.datetime.fromtimestamp(int(modified), datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+    return {
+        "source": source_path,
+        "url": page_url(dest_path, dest_dir),
+        "title": str(fields["title"]) if titled else block_title(blocks[0]),
+        "summary": block_summary(blocks),
+        "date": date,
+        "updated": updated,
+    }
+
+def collect_metadata(pages, dest_dir, front_matter=None, cache_path=None):
+    """
+    Runs read_page_metadata for a work list of (source, destination)
+    pairs, as returned by collect_pages.
+
+    When cache_path is given, the metadata of every page is kept there
+    along with the source's size, mtime and destination, and a page whose
+    values are unchanged is not read again.
+
+    :param front_matter: {source: fields}, as filled in by collect_pages
+    :param cache_path: Optional path of the persistent metadata cache
+    """
+    front_matter = front_matter or {}
+    cached = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            data = json.load(f)
+        if data.get("version") == METADATA_VERSION:
+            cached = data["pages"]
+
+    metadata, entries = [], {}
+    for source_path, dest_path in pages:
+        stat = os.stat(source_path)
+        key = [stat.st_size, stat.st_mtime_ns, dest_path]
+        entry = cached.get(source_path)
+        if entry is None or entry["key"] != key:
+            entry = {"key": key, "metadata": read_page_metadata(source_path, dest_path, dest_dir, front_matter.get(source_path))}
+        entries[source_path] = entry
+        metadata.append(entry["metadata"])
+
+    if cache_path is not None and entries != cached:
+        with atomic_write(cache_path) as f:
+            json.dump({"version": METADATA_VERSION, "pages": entries}, f, indent=1, sort_keys=True)
+    return metadata
+
+def blog_posts(metadata, content_root):
+    """
+    Returns the pages under content/blog/, except the section's own index
+    page, newest first.
+    """
+    blog_root = os.path.join(os.path.normpath(content_root), BLOG_DIR)
+    posts = []
+    for page in metadata:
+        source_path = os.path.normpath(page["source"])
+        if source_path.startswith(blog_root + os.sep) and source_path != os.path.join(blog_root, "index.md"):
+            posts.append(page)
+    return sorted(posts, key=lambda page: (page["updated"], page["url"]), reverse=True)
+
+def sitemap_xml(metadata, site_url):
+    """
+    Returns a sitemap.xml listing every page.
+
+    :param site_url: URL that page URLs are relative to, including the
+        basepath
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for page in sorted(metadata, key=lambda page: page["url"]):
+        lines.append(f"  <url><loc>{xml_escape(site_url + page['url'])}</loc><lastmod>{page['date']}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+def atom_feed(posts, site_url, site_title, feed_url):
+    """
+    Returns an Atom feed of the newest FEED_ENTRIES posts.
+
+    :param site_url: URL that page URLs are relative to, see sitemap_xml
+    """
+    posts = posts[:FEED_ENTRIES]
+    updated = max((post["updated"] for post in posts), default="1970-01-01T00:00:00Z")
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{xml_escape(site_title)}</title>",
+        f"  <id>{xml_escape(feed_url)}</id>",
+        f'  <link rel="self" href="{xml_escape(feed_url)}"/>',
+        f'  <link href="{xml_escape(site_url)}/"/>',
+        f"  <updated>{updated}</updated>",
+    ]
+    for post in posts:
+        url = xml_escape(site_url + post["url"])
+        lines += [
+            "  <entry>",
+            f"    <title>{xml_escape(post['title'])}</title>",
+            f'    <link href="{url}"/>',
+            f"    <id>{url}</id>",
+            f"    <updated>{post['updated']}</updated>",
+            f"    <author><name>{xml_escape(site_title)}</name></author>",
+            f"    <summary>{xml_escape(post['summary'])}</summary>",
+            "  </entry>",
+        ]
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+def listing_path(dest_dir, number, has_index_page):
+    """
+    Returns where page `number` of the blog listing goes: blog/index.html
+    for the first page, unless content/blog/index.md claims it, and
+    blog/page/<number>/index.html otherwise.
+    """
+    if number == 1 and not has_index_page:
+        return os.path.join(dest_dir, BLOG_DIR, "index.html")
+    return os.path.join(dest_dir, BLOG_DIR, "page", str(number), "index.html")
+
+def listing_node(posts, previous_url, next_url):
+    items = []
+    for post in posts:
+        children = [LeafNode("a", post["title"], {"href": post["url"]}), LeafNode(None, " "), LeafNode("time", post["date"])]
+        if post["summary"]:
+            children.append(LeafNode("p", xml_escape(post["summary"])))
+        items.append(ParentNode("li", children))
+    nodes = [ParentNode("ul", items)]
+    links = []
+    if previous_url:
+        links.append(LeafNode("a", "Newer posts", {"href": previous_url, "rel": "prev"}))
+    if next_url:
+        links.append(LeafNode("a", "Older posts", {"href": next_url, "rel": "next"}))
+    if links:
+        nodes.append(ParentNode("nav", links))
+    return ParentNode("div", nodes)
+
+def write_blog_listing(posts, page_size, template_path, dest_dir, basepath="/", rewriter=None, has_index_page=False):
+    """
+    Renders the blog listing, page_size posts per page, into the site
+    template and returns the paths written.
+    """
+    template = load_page_template(template_path, rewriter)
+    pages = [posts[start:start + page_size] for start in range(0, len(posts), page_size)]
+    # like page URLs, these get the basepath from the rewriter
+    urls = [page_url(listing_path(dest_dir, number, has_index_page), dest_dir) for number in range(1, len(pages) + 1)]
+    paths = []
+    for number, page_posts in enumerate(pages, 1):
+        title = "Blog" if number == 1 else f"Blog - page {number}"
+        node = listing_node(page_posts, urls[number - 2] if number > 1 else None, urls[number] if number < len(pages) else None)
+        context = {"Title": title, "Description": "", "Date": "", "Nav": ""}
+        if rewriter is not None:
+            context = {key: rewriter.rewrite_html(value) for key, value in context.items()}
+        if basepath != "/":
+            context["Basepath"] = basepath
+        context["Content"] = node.iter_html(rewriter)
+        path = listing_path(dest_dir, number, has_index_page)
+        print(f"Generating blog listing page {number}: {path}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as f:
+            for chunk in template.iter_render(context):
+                f.write(chunk)
+        paths.append(path)
+    return paths
+
+def generate_aggregates(metadata, content_root, dest_dir, template_path, state_path, basepath="/", rewriter=None,
+                        site_url=None, page_size=0):
+    """
+    Writes the outputs that aggregate every page's metadata. These are
+    sitemap.xml and feed.xml when site_url is given, and the paginated
+    blog listing when page_size > 0. Returns the paths of the outputs,
+    for the link check.
+
+    Nothing is rewritten when the metadata and settings hash stored in
+    state_path still matches and the outputs exist. Outputs of an
+    earlier build that are no longer produced are removed.
+
+    :param site_url: Origin the site is published at, e.g.
+        https://example.com, without the basepath
+    :param page_size: Posts per blog listing page (0 for no listing)
+    """
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            state = json.load(f)
+
+    blog_template = find_template(os.path.join(content_root, BLOG_DIR, "index.md"), content_root, template_path)
+    current_hash = context_hash({
+        "version": AGGREGATES_VERSION,
+        "metadata": metadata,
+        "site_url": site_url,
+        "page_size": page_size,
+        "basepath": basepath,
+        "rewrite": rewriter.key() if rewriter is not None else None,
+        "template": {path: hash_file(path) for path in template_dependencies(blog_template)} if page_size else None,
+    })
+    outputs = state.get("outputs", [])
+    if state.get("hash") == current_hash and all(os.path.exists(path) for path in outputs):
+        print("Skipping unchanged aggregate pages")
+        return outputs
+
+    posts = blog_posts(metadata, content_root)
+    outputs = []
+    os.makedirs(dest_dir, exist_ok=True)
+    if site_url:
+        # page URLs lack the basepath, so it goes on the site URL
+        site_url = site_url.rstrip("/") + (rewriter.prefix if rewriter is not None else "")
+        sitemap_path = os.path.join(dest_dir, SITEMAP_PATH)
+        with atomic_write(sitemap_path) as f:
+            f.write(sitemap_xml(metadata, site_url))
+        outputs.append(sitemap_path)
+
+        home = [page["title"] for page in metadata if page["url"] == "/"]
+        feed_path = os.path.join(dest_dir, FEED_PATH)
+        with atomic_write(feed_path) as f:
+            f.write(atom_feed(posts, site_url, home[0] if home else site_url, site_url + "/" + FEED_PATH))
+        outputs.append(feed_path)
+        print(f"Wrote {SITEMAP_PATH} ({len(metadata)} pages) and {FEED_PATH} ({min(len(posts), FEED_ENTRIES)} posts)")
+    if page_size > 0:
+        has_index_page = any(os.path.normpath(page["source"]) == os.path.normpath(os.path.join(content_root, BLOG_DIR, "index.md"))
+                             for page in metadata)
+        outputs += write_blog_listing(posts, page_size, blog_template, dest_dir, basepath, rewriter, has_index_page)
+
+    for path in state.get("outputs", []):
+        if path not in outputs and os.path.exists(path):
+            print(f"Removing stale output: {path}")
+            os.remove(path)
+    with atomic_write(state_path) as f:
+        json.dump({"hash": current_hash, "outputs": outputs}, f, indent=1)
+    return outputs
+
+def remove_aggregates(state_path):
+    """
+    Removes the outputs recorded in state_path, and the state itself, once
+    aggregate outputs are turned off.
+    """
+    if not os.path.exists(state_path):
+        return
+    with open(state_path, "r") as f:
+        state = json.load(f)
+    for path in state.get("outputs", []):
+        if os.path.exists(path):
+            print(f"Removing stale output: {path}")
+            os.remove(path)
+    os.remove(state_path)
@@ -70,6 +70,37 @@ def test_h7(self):
 """
         self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
 
+    def test_multiline_heading_is_paragraph(self):
+        block = "# Heading\nfollowed by text"
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_heading_needs_space(self):
+        self.assertEqual(block_to_block_type("#hashtag"), BlockType.PARAGRAPH)
+
+    def test_unclosed_codeblock_is_paragraph(self):
+        block = "```\nprint('never closed')"
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_markers_must_start_each_line(self):
+        self.assertEqual(block_to_block_type("> quoted\nnot quoted"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("- item\nnot an item"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("a - b\nc - d"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("1. one\n2) two"), BlockType.PARAGRAPH)
+
+    def test_indented_items(self):
+        block = "- one\n  - nested\n- two"
+        self.assertEqual(block_to_block_type(block), BlockType.UNORDERED_LIST)
+        self.assertEqual(markdown_to_html_node(block).to_html(), "<div><ul><li>one</li><li>nested</li><li>two</li></ul></div>")
+        block = "1. one\n   1. nested\n2. two"
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
+        self.assertEqual(markdown_to_html_node(block).to_html(), "<div><ol><li>one</li><li>nested</li><li>two</li></ol></div>")
+        block = "> quoted\n  > indented"
+        self.assertEqual(block_to_block_type(block), BlockType.QUOTE)
+        self.assertEqual(markdown_to_html_node(block).to_html(), "<div><blockquote>quoted\nindented</blockquote></div>")
+
+    def test_ordered_list_numbering_not_checked(self):
+        self.assertEqual(block_to_block_type("10. ten\n11. eleven"), BlockType.ORDERED_LIST)
+
     def test_can_get_header_from_block(self):
         block = "### This should be an H3 block"
         header = get_header_from_block(block)
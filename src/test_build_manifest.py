@@ -0,0 +1,113 @@
+import os, tempfile, unittest
+
+from build_manifest import BuildManifest, hash_file
+from markdown_conversion import generate_pages_recursive
+from test_support import read_file, silence_output, write_file
+
+
+class TestBuildManifest(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, "manifest.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\nWords")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/"):
+        generate_pages_recursive(self.content, self.template, self.docs, basepath, manifest_path=self.manifest)
+
+    def test_hash_file(self):
+        path = os.path.join(self.root, "hello.txt")
+        write_file(path, "hello")
+        self.assertEqual(hash_file(path), "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        post = os.path.join(self.docs, "blog", "post.html")
+        write_file(post, "untouched")
+        self.build()
+        self.assertEqual(read_file(post), "untouched")
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\nMore words here")
+        self.build()
+        self.assertIn("More words here", read_file(os.path.join(self.docs, "blog", "post.html")))
+
+    def test_changed_template_rebuilds_all(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue(read_file(os.path.join(self.docs, "index.html")).startswith("<h1>Home</h1>"))
+        self.assertTrue(read_file(os.path.join(self.docs, "blog", "post.html")).startswith("<h1>Post</h1>"))
+
+    def test_changed_basepath_rebuilds_all(self):
+        self.build()
+        manifest = BuildManifest.load(self.manifest)
+        self.assertEqual(manifest.inputs["basepath"], "/")
+        self.build("site")
+        manifest = BuildManifest.load(self.manifest)
+        self.assertEqual(manifest.inputs["basepath"], "site")
+        self.assertEqual(len(manifest.entries), 2)
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "post.html")))
+        self.assertEqual(list(BuildManifest.load(self.manifest).entries), [os.path.join(self.content, "index.md")])
+
+    def test_changed_partial_rebuilds_dependents_only(self):
+        partial = os.path.join(self.content, "blog", "partials", "footer.html")
+        write_file(partial, "<footer>v1</footer>\n")
+        write_file(os.path.join(self.content, "blog", "template.html"), "{{ Content }}{{> footer }}")
+        self.build()
+        post = os.path.join(self.docs, "blog", "post.html")
+        self.assertTrue(read_file(post).endswith("<footer>v1</footer>"))
+        write_file(os.path.join(self.docs, "index.html"), "untouched")
+        write_file(partial, "<footer>v2</footer>")
+        self.build()
+        self.assertEqual(read_file(os.path.join(self.docs, "index.html")), "untouched")
+        self.assertTrue(read_file(post).endswith("<footer>v2</footer>"))
+
+        manifest = BuildManifest.load(self.manifest)
+        self.assertEqual(manifest.dependents(partial), [os.path.join(self.content, "blog", "post.md")])
+        self.assertEqual(manifest.dependents(self.template), [os.path.join(self.content, "index.md")])
+
+    def test_stale_reasons(self):
+        self.build()
+        manifest = BuildManifest.load(self.manifest)
+        source = os.path.join(self.content, "index.md")
+        output = os.path.join(self.docs, "index.html")
+        context = {"Date": "x"}
+        manifest.entries[source]["context"] = None
+        self.assertEqual(manifest.stale_reasons(source, output, [self.template], None), [])
+        write_file(self.template, "changed {{ Content }}")
+        write_file(source, "# Home\n\nChanged")
+        os.remove(output)
+        manifest.new_build()
+        self.assertEqual(manifest.stale_reasons(source, output, [self.template], context), [
+            f"output missing: {output}",
+            "source changed",
+            "render context changed (date, navigation or front matter)",
+            f"dependency changed: {self.template}",
+        ])
+        self.assertEqual(manifest.stale_reasons("other.md", output), ["never built"])
+
+if __name__ == "__main__":
+    unittest.main()
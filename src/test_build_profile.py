@@ -0,0 +1,52 @@
+import io, json, os, tempfile, unittest
+from contextlib import redirect_stdout
+
+from build_profile import PageProfile, NullProfile, BuildProfile, PAGE_PHASES
+from markdown_conversion import generate_pages_recursive
+from test_support import write_file
+
+
+class TestBuildProfile(unittest.TestCase):
+
+    def test_page_profile_phases_accumulate(self):
+        profile = PageProfile("a.md")
+        profile.add("read", 0.5)
+        profile.add("read", 0.25)
+        with profile.phase("write"):
+            pass
+        self.assertEqual(profile.timings["read"], 0.75)
+        self.assertIn("write", profile.timings)
+        self.assertEqual(profile.to_dict()["source"], "a.md")
+
+    def test_write_chunks(self):
+        for profile in [PageProfile("a.md"), NullProfile()]:
+            out = io.StringIO()
+            profile.write_chunks(iter(["<p>", "x", "</p>"]), out)
+            self.assertEqual(out.getvalue(), "<p>x</p>")
+
+    def test_profiled_build(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            template = os.path.join(root, "template.html")
+            write_file(template, "{{ Content }}")
+            write_file(os.path.join(content, "index.md"), "# Home\n\n- a\n- b")
+            write_file(os.path.join(content, "big.md"), "# Big\n\n" + "word " * 5000)
+
+            profile = BuildProfile()
+            with redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content, template, os.path.join(root, "docs"), profile=profile)
+
+            report = profile.report()
+            self.assertEqual(report["pages"], 2)
+            # the fragment cache phase only appears when a cache is used
+            self.assertEqual(sorted(report["page_phases"]), sorted(set(PAGE_PHASES) - {"fragment cache"}))
+            self.assertEqual(report["bytes_read"], os.path.getsize(os.path.join(content, "index.md")) + os.path.getsize(os.path.join(content, "big.md")))
+            self.assertIn("render", report["build"])
+
+            profile.write_json(os.path.join(root, "profile.json"))
+            with open(os.path.join(root, "profile.json")) as f:
+                self.assertEqual(json.load(f)["pages"], 2)
+            self.assertIn("Slowest 1 pages:", profile.summary(top=1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os, tempfile, threading, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from daemon import BuildDaemon, send_request
+from serve import SiteWatcher
+from test_support import read_file, write_file
+
+
+class TestBuildDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        write_file(os.path.join(root, "template.html"), "<t>{{ Content }}</t>", bump_mtime=True)
+        write_file(os.path.join(self.content, "index.md"), "# Home", bump_mtime=True)
+        write_file(os.path.join(self.content, "about", "index.md"), "# About", bump_mtime=True)
+        write_file(os.path.join(root, "static", "site.css"), "a {}", bump_mtime=True)
+        watcher = SiteWatcher(
+            content_dir=self.content, static_dir=os.path.join(root, "static"), template_path=os.path.join(root, "template.html"),
+            dest_dir=self.docs, page_manifest_path=os.path.join(root, "pages.json"),
+            static_manifest_path=os.path.join(root, "static.json"),
+            link_index_path=os.path.join(root, "links.sqlite"),
+        )
+        self.daemon = BuildDaemon(watcher, os.path.join(root, "daemon.sock"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def request(self, **request):
+        with redirect_stdout(StringIO()):
+            return self.daemon.handle(request)
+
+    def test_build_and_rebuild(self):
+        self.assertTrue(self.request(command="build")["ok"])
+        self.assertEqual(read_file(os.path.join(self.docs, "index.html")), "<t><div><h1>Home</h1></div></t>")
+
+        about = os.path.join(self.docs, "about", "index.html")
+        write_file(about, "marker", bump_mtime=True)
+        index = os.path.join(self.content, "index.md")
+        write_file(index, "# Home again", bump_mtime=True)
+        self.assertEqual(self.request(command="rebuild", paths=[index])["changed"], [index])
+        self.assertEqual(read_file(os.path.join(self.docs, "index.html")), "<t><div><h1>Home again</h1></div></t>")
+        self.assertEqual(read_file(about), "marker")
+        # nothing left for a poll to find
+        self.assertEqual(self.request(command="rebuild")["changed"], [])
+
+    def test_stats_and_errors(self):
+        self.request(command="build")
+        stats = self.request(command="stats")
+        self.assertEqual((stats["requests"], stats["builds"], stats["pages"]), (2, 1, 2))
+        with self.assertRaisesRegex(Exception, "unknown command"):
+            self.request(command="deploy")
+
+    def test_socket(self):
+        server = self.daemon.listen()
+        thread = threading.Thread(target=lambda: self.daemon.serve(server))
+        with redirect_stdout(StringIO()):
+            thread.start()
+            self.assertTrue(send_request({"command": "build"}, self.daemon.socket_path)["ok"])
+            self.assertEqual(send_request({"command": "bogus"}, self.daemon.socket_path),
+                             {"ok": False, "error": "unknown command: 'bogus'"})
+            with self.assertRaisesRegex(Exception, "already listening"):
+                BuildDaemon(self.daemon.watcher, self.daemon.socket_path).listen()
+            self.assertEqual(send_request({"command": "shutdown"}, self.daemon.socket_path), {"ok": True})
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.daemon.socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from build_manifest import BuildManifest
+from explain import explain
+from markdown_conversion import generate_pages_recursive
+from test_support import write_file
+
+
+class TestExplain(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.partial = os.path.join(self.root, "partials", "nav.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        write_file(self.template, "{{> nav }}{{ Content }}")
+        write_file(self.partial, "<nav></nav>")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "post.md"), "# Post")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, manifest_path=self.manifest_path)
+        self.manifest = BuildManifest.load(self.manifest_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def explain(self, *paths):
+        return explain(list(paths), self.manifest, self.content, self.template, self.docs)
+
+    def test_graph(self):
+        self.assertEqual(self.explain(), [f"{self.partial}: 2 page(s)", f"{self.template}: 2 page(s)"])
+        self.assertEqual(explain([], BuildManifest()), ["No pages in the build manifest; build the site first"])
+
+    def test_dependency(self):
+        lines = self.explain(self.partial)
+        self.assertEqual(lines[0], f"{self.partial}: an edit re-renders 2 page(s)")
+        self.assertEqual(lines[-2:], ["  included by:", f"    {self.template}"])
+
+    def test_page(self):
+        source = os.path.join(self.content, "post.md")
+        self.assertEqual(self.explain(source), [
+            f"{source} -> {os.path.join(self.docs, 'post.html')}",
+            "  depends on:",
+            f"    {self.template}",
+            f"    {self.partial}",
+            "  up to date",
+        ])
+        write_file(self.partial, "<nav>changed</nav>")
+        self.assertEqual(self.explain(source)[-1], f"  next build re-renders it: dependency changed: {self.partial}")
+
+    def test_unknown_path(self):
+        self.assertEqual(self.explain("nowhere.html"), ["nowhere.html: not in the dependency graph"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os, tempfile, unittest
+
+from fragment_cache import FragmentCache, close_fragment_caches
+from markdown_conversion import generate_page, generate_pages_recursive
+from test_support import read_file, silence_output, write_file
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "fragments.sqlite")
+
+    def tearDown(self):
+        close_fragment_caches()
+        self.tmp.cleanup()
+
+    def test_round_trip_and_counters(self):
+        cache = FragmentCache(self.path, "v1")
+        self.assertIsNone(cache.get("para"))
+        cache.put("para", "<p>para</p>", [[0, "/x"]], text="para")
+        self.assertEqual(cache.get("para"), ("<p>para</p>", [[0, "/x"]], "para"))
+        cache.close()
+
+        cache = FragmentCache(self.path, "v1")
+        self.assertEqual(cache.get("para"), ("<p>para</p>", [[0, "/x"]], "para"))
+        self.assertEqual(cache.stats(), (2, 1, 1, len("<p>para</p>")))
+        cache.close()
+
+    def test_version_change_clears_cache(self):
+        cache = FragmentCache(self.path, "v1")
+        cache.put("para", "<p>para</p>")
+        cache.close()
+        cache = FragmentCache(self.path, "v2")
+        self.assertIsNone(cache.get("para"))
+        self.assertEqual(cache.stats(), (0, 1, 0, 0))
+        cache.close()
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(self.path, "v1")
+        for name in ["a", "b", "c"]:
+            cache.put(name, name * 10)
+            cache.flush()
+        cache.get("a")
+        cache.flush()
+        self.assertEqual(cache.evict(20), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ("a" * 10, [], ""))
+        self.assertEqual(cache.get("c"), ("c" * 10, [], ""))
+        cache.close()
+
+    def test_cached_pages_match_uncached_pages(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        content = os.path.join(self.tmp.name, "content")
+        write_file(template, "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        footer = "> Shared **footer** with a [link](/about)"
+        for name in ["a", "b", "c"]:
+            write_file(os.path.join(content, name, "index.md"), f"# Page {name}\n\n- item _{name}_\n\n{footer}")
+
+        plain = os.path.join(self.tmp.name, "plain")
+        cached = os.path.join(self.tmp.name, "cached")
+        generate_pages_recursive(content, template, plain, "site")
+        generate_pages_recursive(content, template, cached, "site", jobs=2, fragment_cache=self.path)
+        for name in ["a", "b", "c"]:
+            relative_path = os.path.join(name, "index.html")
+            self.assertEqual(read_file(os.path.join(cached, relative_path)), read_file(os.path.join(plain, relative_path)))
+
+        cache = FragmentCache(self.path)
+        hits, misses, entries, _ = cache.stats()
+        self.assertEqual(hits + misses, 9)
+        self.assertEqual(entries, 7)
+        cache.close()
+
+        generate_page(os.path.join(content, "a", "index.md"), template, os.path.join(cached, "again.html"), "site",
+                      fragment_cache=self.path)
+        self.assertEqual(read_file(os.path.join(cached, "again.html")), read_file(os.path.join(plain, "a", "index.html")))
+
+if __name__ == "__main__":
+    unittest.main()
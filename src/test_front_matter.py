@@ -0,0 +1,146 @@
+import os, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from front_matter import split_front_matter, read_front_matter, is_draft, front_matter_context, resolve_template
+from markdown_conversion import collect_pages, page_destination, page_job, generate_page, generate_pages_recursive
+from site_metadata import read_page_metadata
+from test_support import write_file
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+
+    def test_fields(self):
+        lines = iter([
+            "---\n",
+            'title: "Why: a story"\n',
+            "# a comment\n",
+            "Date: 2024-03-01\n",
+            "draft: yes\n",
+            "slug: why\n",
+            "---\n",
+            "# Heading\n",
+        ])
+        fields, first_line, body = split_front_matter(lines)
+        self.assertEqual(fields, {"title": "Why: a story", "date": "2024-03-01", "draft": True, "slug": "why"})
+        self.assertEqual(first_line, 8)
+        # the body is the rest of the same iterator
+        self.assertIs(body, lines)
+        self.assertEqual(list(body), ["# Heading\n"])
+
+    def test_no_front_matter(self):
+        fields, first_line, body = split_front_matter(["# Heading\n", "\n", "Text\n"])
+        self.assertEqual(fields, {})
+        self.assertEqual(first_line, 1)
+        self.assertEqual(list(body), ["# Heading\n", "\n", "Text\n"])
+        self.assertEqual(list(split_front_matter([])[2]), [])
+
+    def test_not_parsed(self):
+        fields, first_line, body = split_front_matter(["---", "not a field", "---", "# Heading"], parse=False)
+        self.assertEqual((fields, first_line, list(body)), ({}, 4, ["# Heading"]))
+
+    def test_errors(self):
+        with self.assertRaisesRegex(Exception, "page.md:2: expected 'key: value'"):
+            split_front_matter(["---", "no colon", "---"], "page.md")
+        with self.assertRaisesRegex(Exception, "not closed"):
+            split_front_matter(["---", "title: x", "# Heading"])
+
+    def test_draft_and_context(self):
+        self.assertTrue(is_draft({"draft": True}))
+        self.assertFalse(is_draft({"draft": "maybe"}))
+        self.assertFalse(is_draft({}))
+        self.assertEqual(front_matter_context({"title": "T", "date": "2024-03-01", "slug": "s"}),
+                         {"Title": "T", "Date": "2024-03-01"})
+
+
+class TestFrontMatterPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title><time>{{ Date }}</time>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome.")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_draft_skipped(self):
+        write_file(os.path.join(self.content, "wip.md"), "---\ndraft: true\n---\n# Not yet")
+        with redirect_stdout(StringIO()) as output:
+            pages = collect_pages(self.content, self.docs)
+        self.assertEqual([os.path.basename(source) for source, _ in pages], ["index.md"])
+        self.assertIn("Skipping draft", output.getvalue())
+
+    def test_slug(self):
+        self.assertEqual(page_destination(os.path.join(self.content, "a", "post.md"), self.content, self.docs, "new"),
+                         os.path.join(self.docs, "a", "new.html"))
+        self.assertEqual(page_destination(os.path.join(self.content, "a", "index.md"), self.content, self.docs, "b"),
+                         os.path.join(self.docs, "b", "index.html"))
+        with self.assertRaisesRegex(Exception, "invalid slug"):
+            page_destination(os.path.join(self.content, "post.md"), self.content, self.docs, "../up")
+
+    def test_template_override(self):
+        source = os.path.join(self.content, "post.md")
+        write_file(source, "---\ntemplate: plain.html\n---\n# Post")
+        write_file(os.path.join(self.tmp.name, "plain.html"), "{{ Content }}")
+        _, template, _, _ = page_job(source, "post.html", self.content, self.template, read_front_matter(source))
+        self.assertEqual(template, os.path.join(self.tmp.name, "plain.html"))
+        with self.assertRaisesRegex(Exception, "not found"):
+            resolve_template("missing.html", source, self.template)
+
+    def test_title_and_line_numbers(self):
+        source = os.path.join(self.content, "post.md")
+        write_file(source, "---\ntitle: From front matter\ndate: 2024-03-01\n---\n\nIntro.\n\n[link](/missing)\n")
+        fields = read_front_matter(source)
+        _, template, dest, context = page_job(source, os.path.join(self.docs, "post.html"), self.content, self.template, fields)
+        os.makedirs(self.docs)
+        with redirect_stdout(StringIO()):
+            result = generate_page(source, template, dest, context=context)
+        with open(dest) as f:
+            html = f.read()
+        self.assertIn("<title>From front matter</title><time>2024-03-01</time>", html)
+        self.assertNotIn("title:", html)
+        self.assertEqual(result["title"], "From front matter")
+        # line numbers count the front matter lines
+        self.assertEqual(result["links"], [[8, "/missing"]])
+
+        metadata = read_page_metadata(source, dest, self.docs, fields)
+        self.assertEqual((metadata["title"], metadata["summary"]), ("From front matter", "Intro."))
+        self.assertEqual((metadata["date"], metadata["updated"]), ("2024-03-01", "2024-03-01T00:00:00Z"))
+
+    def test_build(self):
+        write_file(os.path.join(self.content, "post.md"), "---\nslug: renamed\n---\n# Post\n\nText.")
+        write_file(os.path.join(self.content, "wip.md"), "---\ndraft: true\n---\n# Draft")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, pipeline=4)
+        self.assertEqual(sorted(os.listdir(self.docs)), ["index.html", "renamed.html"])
+        with open(os.path.join(self.docs, "renamed.html")) as f:
+            self.assertIn("<title>Post</title>", f.read())
+
+    def test_slug_change_removes_old_output(self):
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        contact = os.path.join(self.content, "contact", "index.md")
+        write_file(contact, "---\nslug: reach-us\n---\n# Contact")
+        write_file(os.path.join(self.content, "a.md"), "# A")
+        write_file(os.path.join(self.content, "b.md"), "# B")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, manifest_path=manifest)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "reach-us", "index.html")))
+
+        write_file(contact, "---\nslug: write-us\n---\n# Contact")
+        # a and b swap their outputs
+        write_file(os.path.join(self.content, "a.md"), "---\nslug: b\n---\n# A")
+        write_file(os.path.join(self.content, "b.md"), "---\nslug: a\n---\n# B")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, manifest_path=manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "reach-us", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "write-us", "index.html")))
+        with open(os.path.join(self.docs, "a.html")) as f:
+            self.assertIn("<h1>B</h1>", f.read())
+        with open(os.path.join(self.docs, "b.html")) as f:
+            self.assertIn("<h1>A</h1>", f.read())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os, tempfile, unittest
+
+from markdown_conversion import collect_pages, generate_page, generate_pages_recursive
+from test_support import silence_output, write_file
+
+
+def read_tree(root):
+    tree = {}
+    for dir_path, _, file_names in os.walk(root):
+        for item in file_names:
+            path = os.path.join(dir_path, item)
+            with open(path, "r") as f:
+                tree[os.path.relpath(path, root)] = f.read()
+    return tree
+
+
+class TestGeneratePages(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/b/)")
+        for name in ["c", "a", "b"]:
+            write_file(os.path.join(self.content, "blog", name, "index.md"), f"# Post {name}\n\n- item **{name}**")
+        write_file(os.path.join(self.content, "notes.txt"), "not markdown")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_collect_pages_is_sorted(self):
+        docs = os.path.join(self.tmp.name, "docs")
+        pages = collect_pages(self.content, docs)
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(self.content, "index.md"), os.path.join(docs, "index.html")),
+                (os.path.join(self.content, "blog", "a", "index.md"), os.path.join(docs, "blog", "a", "index.html")),
+                (os.path.join(self.content, "blog", "b", "index.md"), os.path.join(docs, "blog", "b", "index.html")),
+                (os.path.join(self.content, "blog", "c", "index.md"), os.path.join(docs, "blog", "c", "index.html")),
+            ],
+        )
+
+    def test_parallel_build_matches_serial_build(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "site", jobs=1)
+        generate_pages_recursive(self.content, self.template, parallel, "site", jobs=3)
+        self.assertEqual(read_tree(serial), read_tree(parallel))
+        self.assertEqual(len(read_tree(parallel)), 4)
+
+    def test_pipelined_build_matches_serial_build(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        for in_flight in [1, 2, 16]:
+            pipelined = os.path.join(self.tmp.name, f"pipelined{in_flight}")
+            generate_pages_recursive(self.content, self.template, serial, "site")
+            generate_pages_recursive(self.content, self.template, pipelined, "site", pipeline=in_flight)
+            self.assertEqual(read_tree(serial), read_tree(pipelined))
+
+    def test_generate_page_streams_large_file(self):
+        source = os.path.join(self.tmp.name, "big.md")
+        dest = os.path.join(self.tmp.name, "big.html")
+        with open(source, "w") as f:
+            f.write("# Changelog\n\n")
+            for number in range(2000):
+                f.write(f"## {number}\n\n- fixed **bug** {number}\n\n```\nbefore\n\nafter\n```\n\n")
+        generate_page(source, self.template, dest)
+        with open(dest, "r") as f:
+            html = f.read()
+        self.assertTrue(html.startswith("<title>Changelog</title>"))
+        self.assertEqual(html.count("<pre><code>before\n\nafter\n</code></pre>"), 2000)
+        self.assertTrue(html.endswith("</code></pre></div>"))
+
+if __name__ == "__main__":
+    unittest.main()
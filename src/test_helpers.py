@@ -1,4 +1,4 @@
-import unittest
+import io, unittest
 
 from markdown_conversion import *
 from markdown_enums import *
@@ -116,6 +116,26 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
             ],
         )
 
+    def test_md_to_blocks_keeps_fenced_blank_lines(self):
+        md = "# Title\n\n```\nfirst\n\n\nsecond\n```\n\n   \n\n\ntail"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["# Title", "```\nfirst\n\n\nsecond\n```", "tail"],
+        )
+
+    def test_iter_blocks_reads_file_lazily(self):
+        md = io.StringIO("para one\ncontinued\n\n- item\n\n```\ncode\n")
+        blocks = iter_blocks(md)
+        self.assertEqual(next(blocks), "para one\ncontinued")
+        self.assertEqual(md.readline(), "- item\n")
+        # an unclosed fence runs to the end of the file
+        self.assertEqual(list(blocks), ["```\ncode"])
+
+    def test_markdown_to_html_node_from_file(self):
+        md = "# Big\n\n" + "Some _text_ here.\n\n" * 200
+        node = markdown_to_html_node(io.StringIO(md))
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+
     def test_markdown_to_html_node(self):
         md = """
 This is **bolded** paragraph
@@ -25,5 +25,21 @@ class TestHTMLNode(unittest.TestCase):
         prop_string = node.props_to_html()
         self.assertEqual(prop_string, ' href="https://www.google.com" target="_blank"')
 
+    def test_eq(self):
+        node = HTMLNode("a", "Google", None, {"href": "https://www.google.com"})
+        node2 = HTMLNode("a", "Google", None, {"href": "https://www.google.com"})
+        self.assertEqual(node, node2)
+
+    def test_neq(self):
+        node = HTMLNode("a", "Google", None, {"href": "https://www.google.com"})
+        self.assertNotEqual(node, HTMLNode("a", "Google", None, {"href": "https://www.boot.dev"}))
+        self.assertNotEqual(node, HTMLNode("b", "Google", None, {"href": "https://www.google.com"}))
+        self.assertNotEqual(node, "Google")
+
+    def test_no_instance_dict(self):
+        node = HTMLNode("p")
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
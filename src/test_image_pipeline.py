@@ -0,0 +1,94 @@
+import os, struct, tempfile, unittest, zlib
+from contextlib import redirect_stdout
+from io import StringIO
+
+from image_pipeline import (image_size, recompress_png, png_chunks, png_chunk, variant_path, optimize_image,
+                            image_attributes, PNG_SIGNATURE, Image)
+
+
+def make_png(width, height):
+    # an 8-bit grayscale gradient, stored without compression and split
+    # over several IDAT chunks
+    rows = b"".join(b"\x00" + bytes((x + y) % 256 for x in range(width)) for y in range(height))
+    data = zlib.compress(rows, 0)
+    header = png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+    middle = len(data) // 2
+    return (PNG_SIGNATURE + header + png_chunk(b"IDAT", data[:middle]) + png_chunk(b"IDAT", data[middle:])
+            + png_chunk(b"IEND", b""))
+
+def pixels(png):
+    return zlib.decompress(b"".join(body for kind, body in png_chunks(png) if kind == b"IDAT"))
+
+
+class TestImagePipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "a.png")
+        with open(self.path, "wb") as f:
+            f.write(make_png(64, 32))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_image_size(self):
+        self.assertEqual(image_size(self.path), (64, 32))
+        gif = os.path.join(self.tmp.name, "a.gif")
+        with open(gif, "wb") as f:
+            f.write(b"GIF89a" + struct.pack("<HH", 5, 7) + b"\x00" * 16)
+        self.assertEqual(image_size(gif), (5, 7))
+
+    def test_recompress_png_keeps_pixels(self):
+        with open(self.path, "rb") as f:
+            original = f.read()
+        recompressed = recompress_png(original)
+        self.assertLess(len(recompressed), len(original))
+        self.assertEqual(pixels(recompressed), pixels(original))
+        self.assertEqual([kind for kind, _ in png_chunks(recompressed)], [b"IHDR", b"IDAT", b"IEND"])
+
+    def test_derivatives_are_cached_by_source_hash(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        output = StringIO()
+        with redirect_stdout(output):
+            image = optimize_image(self.path, "hash", cache_dir)
+        self.assertIn("Optimizing image", output.getvalue())
+        self.assertEqual((image["width"], image["height"]), (64, 32))
+        self.assertTrue(os.path.exists(image["file"]))
+
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(optimize_image(self.path, "hash", cache_dir), image)
+        self.assertEqual(output.getvalue(), "")
+        with redirect_stdout(output):
+            self.assertNotEqual(optimize_image(self.path, "hash", cache_dir, [16])["file"], image["file"])
+
+    def test_image_attributes(self):
+        self.assertEqual(variant_path("/images/a.png", 480), "/images/a.480w.png")
+        image = {"width": 960, "height": 540, "file": "a.png", "hash": "x", "variants": [["a.480w.png", 480, "y"]]}
+        self.assertEqual(
+            image_attributes("/a.png", image),
+            {"width": 960, "height": 540, "srcset": "/a.480w.png 480w, /a.png 960w"},
+        )
+        self.assertEqual(image_attributes("/a.png", {**image, "variants": []}), {"width": 960, "height": 540})
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_pillow_keeps_jpeg_quality_and_frames(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        jpeg = os.path.join(self.tmp.name, "a.jpg")
+        Image.linear_gradient("L").resize((64, 32)).save(jpeg, "JPEG", quality=95)
+        gif = os.path.join(self.tmp.name, "a.gif")
+        frames = [Image.new("RGB", (64, 32), color) for color in ("red", "green", "blue")]
+        frames[0].save(gif, "GIF", save_all=True, append_images=frames[1:])
+        with redirect_stdout(StringIO()):
+            photo = optimize_image(jpeg, "jpeg", cache_dir, [16])
+            animation = optimize_image(gif, "gif", cache_dir, [16])
+
+        with Image.open(jpeg) as source, Image.open(photo["file"]) as optimized:
+            self.assertEqual(optimized.quantization, source.quantization)
+        self.assertEqual(len(photo["variants"]), 1)
+        with Image.open(animation["file"]) as optimized:
+            self.assertEqual(optimized.n_frames, 3)
+        self.assertEqual(animation["variants"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
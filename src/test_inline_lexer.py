@@ -0,0 +1,92 @@
+import random, unittest
+
+from inline_lexer import tokenize_inline
+from markdown_conversion import split_nodes_delimiter, split_nodes_image, split_nodes_link
+from markdown_enums import TextType
+from textnode import TextNode
+
+
+def chained_text_to_textnodes(text):
+    """
+    The original five-pass pipeline that tokenize_inline replaces.
+    """
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, '**', TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, '`', TextType.CODE)
+    nodes = split_nodes_delimiter(nodes, '_', TextType.ITALIC)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+def outcome(function, text):
+    try:
+        return function(text)
+    except Exception as e:
+        return str(e)
+
+
+class TestInlineLexer(unittest.TestCase):
+
+    def assertSameAsChain(self, text):
+        self.assertEqual(outcome(tokenize_inline, text), outcome(chained_text_to_textnodes, text), repr(text))
+
+    def test_mixed_inline(self):
+        nodes = tokenize_inline("a **b** _c_ `d` ![e](f.png) [g](h)")
+        self.assertListEqual(
+            [
+                TextNode("a ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode(" ", TextType.TEXT),
+                TextNode("c", TextType.ITALIC),
+                TextNode(" ", TextType.TEXT),
+                TextNode("d", TextType.CODE),
+                TextNode(" ", TextType.TEXT),
+                TextNode("e", TextType.IMAGE, "f.png"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("g", TextType.LINK, "h"),
+            ],
+            nodes,
+        )
+
+    def test_delimiters_inside_code_are_literal(self):
+        self.assertEqual(tokenize_inline("`snake_case`"), [TextNode("snake_case", TextType.CODE)])
+
+    def test_bold_wins_over_code(self):
+        self.assertEqual(tokenize_inline("**`x**"), [TextNode("`x", TextType.BOLD)])
+
+    def test_unmatched_delimiters(self):
+        for text in ["**a", "`a", "_a", "`a**b**c`", "_a`b`c"]:
+            with self.assertRaises(Exception):
+                tokenize_inline(text)
+
+    def test_empty_text(self):
+        self.assertEqual(tokenize_inline(""), [])
+
+    def test_edge_cases_match_chain(self):
+        cases = [
+            "",
+            "****",
+            "a***b***c",
+            "a____b",
+            "[a_b](c_d)",
+            "[x ![img](u) y](v)",
+            "![a](b)[c](d)",
+            "![a](b)![a](b)",
+            "[a](b)(c)",
+            "[a]\n(b)",
+            "`a**b`**",
+            "_a `b` c_",
+            "**[bold link](/x)**",
+            "text with [many](/1) [links](/2) and ![pics](/3.png)!",
+        ]
+        for text in cases:
+            self.assertSameAsChain(text)
+
+    def test_random_text_matches_chain(self):
+        rng = random.Random(1234)
+        alphabet = ["a", "b", " ", "**", "*", "`", "_", "!", "[", "]", "(", ")", "\n", "[t](/u)", "![i](/p.png)"]
+        for _ in range(3000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14)))
+            self.assertSameAsChain(text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from build_manifest import BuildManifest
+from link_index import is_internal, resolve_link, LinkIndex, site_outputs
+from markdown_conversion import generate_pages_recursive
+from test_support import write_file
+
+
+class TestLinkIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_is_internal(self):
+        for url in ["/", "/blog/", "post.html", "../x", "/a#top"]:
+            self.assertTrue(is_internal(url), url)
+        for url in ["", "#top", "//cdn.example.com/x.js", "https://example.com/", "mailto:me@example.com"]:
+            self.assertFalse(is_internal(url), url)
+
+    def test_resolve_link(self):
+        docs = self.docs
+        page = os.path.join(docs, "blog", "post.html")
+        outputs = set([
+            os.path.join(docs, "index.html"),
+            os.path.join(docs, "blog", "index.html"),
+            os.path.join(docs, "blog", "other.html"),
+            os.path.join(docs, "logo.png"),
+        ])
+        resolved = [resolve_link(url, page, docs, outputs) for url in ["/", "/blog/", "other", "../logo.png", "/missing/", "gone.png#x"]]
+        self.assertEqual(resolved, [
+            os.path.join(docs, "index.html"), os.path.join(docs, "blog", "index.html"), os.path.join(docs, "blog", "other.html"),
+            os.path.join(docs, "logo.png"), None, None,
+        ])
+
+    def build(self, manifest_path, index_path):
+        manifest = BuildManifest.load(manifest_path)
+        link_index = LinkIndex(index_path, self.docs)
+        with redirect_stdout(StringIO()):
+            results = generate_pages_recursive(self.content, self.template, self.docs, manifest=manifest)
+        for result in results:
+            link_index.update(result["source"], manifest.entries[result["source"]]["output"], result["links"])
+        pages = {source: entry["output"] for source, entry in manifest.entries.items()}
+        checked, broken = link_index.check(pages, site_outputs(manifest, BuildManifest()))
+        self.all_broken = link_index.broken()
+        link_index.close()
+        return checked, broken
+
+    def test_links_are_recorded_with_lines_across_builds(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nSee [post](/post/)\nand [nowhere](/nowhere/).\n\n```\n[not](/a-link/)\n```\n\n![logo](/logo.png)")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post\n\n[home](/) [site](https://example.com/)")
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        index_path = os.path.join(self.tmp.name, "links.sqlite")
+        index = os.path.join(self.content, "index.md")
+        expected = [(index, 4, "/nowhere/"), (index, 10, "/logo.png")]
+
+        self.assertEqual(self.build(manifest_path, index_path), (4, expected))
+        # the second build skips every page, checks nothing and keeps the results
+        self.assertEqual(self.build(manifest_path, index_path), (0, []))
+        self.assertEqual(self.all_broken, expected)
+        self.assertNotIn("links", BuildManifest.load(manifest_path).data(index))
+
+        # an added output only rechecks the broken links
+        write_file(os.path.join(self.content, "nowhere", "index.md"), "# Nowhere")
+        self.assertEqual(self.build(manifest_path, index_path), (2, [(index, 10, "/logo.png")]))
+        # a removed output rechecks the links that pointed at it
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        self.assertEqual(self.build(manifest_path, index_path), (1, [(index, 3, "/post/")]))
+        self.assertEqual(self.all_broken, [(index, 3, "/post/"), (index, 10, "/logo.png")])
+
+    def test_saved_pages_are_resolved_by_the_next_check(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/post/)")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post")
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        index_path = os.path.join(self.tmp.name, "links.sqlite")
+        self.build(manifest_path, index_path)
+
+        # a page rendered without a link check, as serve.py does
+        post = os.path.join(self.content, "post", "index.md")
+        link_index = LinkIndex(index_path, self.docs)
+        link_index.update(post, os.path.join(self.docs, "post", "index.html"), [[3, "/gone/"]])
+        link_index.save()
+        link_index.close()
+        self.assertEqual(self.build(manifest_path, index_path), (1, [(post, 3, "/gone/")]))
+        self.assertEqual(self.build(manifest_path, index_path), (0, []))
+        self.assertEqual(self.all_broken, [(post, 3, "/gone/")])
+
+if __name__ == "__main__":
+    unittest.main()
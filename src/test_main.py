@@ -0,0 +1,130 @@
+import os, tempfile, unittest
+
+from build_manifest import BuildManifest, hash_file
+from main import sync_static_contents
+from test_support import read_file, silence_output, write_file
+
+
+class TestStaticSync(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.manifest_path = os.path.join(self.tmp.name, "static.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png-a")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, use_hash=False, assets=None, images=None):
+        manifest = BuildManifest.load(self.manifest_path)
+        stats = sync_static_contents(self.static, self.docs, manifest, use_hash, assets=assets, images=images)
+        stats.removed_files = len(manifest.remove_stale())
+        manifest.save()
+        return stats
+
+    def test_first_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual(stats.copied_files, 2)
+        self.assertEqual(stats.copied_bytes, 12)
+        self.assertEqual(read_file(os.path.join(self.docs, "images", "a.png")), "png-a")
+
+    def test_unchanged_files_are_skipped(self):
+        self.sync()
+        stats = self.sync()
+        self.assertEqual(stats.copied_files, 0)
+        self.assertEqual(stats.skipped_files, 2)
+        self.assertEqual(stats.skipped_bytes, 12)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        stats = self.sync()
+        self.assertEqual(stats.copied_files, 1)
+        self.assertEqual(read_file(os.path.join(self.docs, "index.css")), "body { margin: 0 }")
+
+    def test_touched_file_is_skipped_with_hash(self):
+        self.sync()
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(0, 0))
+        stats = self.sync(use_hash=True)
+        self.assertEqual(stats.copied_files, 0)
+        self.assertEqual(os.stat(os.path.join(self.docs, "index.css")).st_mtime_ns, 0)
+
+    def test_removed_source_is_deleted(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = self.sync()
+        self.assertEqual(stats.removed_files, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "a.png")))
+
+    def test_generated_html_is_left_alone(self):
+        self.sync()
+        page = os.path.join(self.docs, "index.html")
+        write_file(page, "<p>generated</p>")
+        self.sync()
+        self.assertEqual(read_file(page), "<p>generated</p>")
+
+    def test_fingerprinted_names_follow_content(self):
+        assets = {}
+        self.sync(assets=assets)
+        css_hash = hash_file(os.path.join(self.static, "index.css"))[:10]
+        self.assertEqual(assets["/index.css"], f"/index.{css_hash}.css")
+        self.assertEqual(sorted(assets), ["/images/a.png", "/index.css"])
+        self.assertEqual(sorted(os.listdir(self.docs)), ["images", f"index.{css_hash}.css"])
+
+        unchanged = {}
+        stats = self.sync(assets=unchanged)
+        self.assertEqual((unchanged, stats.copied_files), (assets, 0))
+
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        changed = {}
+        self.sync(assets=changed)
+        self.assertNotEqual(changed["/index.css"], assets["/index.css"])
+        self.assertEqual(changed["/images/a.png"], assets["/images/a.png"])
+        self.assertEqual(sorted(os.listdir(self.docs)), ["images", changed["/index.css"][1:]])
+
+    def test_fingerprinted_stylesheet_urls_are_rewritten(self):
+        write_file(os.path.join(self.static, "index.css"), 'body { background: url("images/a.png?v=1") }')
+        write_file(os.path.join(self.static, "css", "print.css"), "h1 { background: url(../images/a.png) }")
+        assets = {}
+        self.sync(assets=assets)
+        image = os.path.basename(assets["/images/a.png"])
+        self.assertEqual(read_file(os.path.join(self.docs, assets["/index.css"][1:])),
+                         f'body {{ background: url("images/{image}?v=1") }}')
+        self.assertEqual(read_file(os.path.join(self.docs, assets["/css/print.css"][1:])),
+                         f"h1 {{ background: url(../images/{image}) }}")
+
+        # a new image gives the stylesheets using it new names
+        write_file(os.path.join(self.static, "images", "a.png"), "png-a2")
+        changed = {}
+        self.sync(assets=changed)
+        self.assertNotEqual(changed["/index.css"], assets["/index.css"])
+        self.assertEqual(sorted(os.listdir(self.docs)), ["css", "images", changed["/index.css"][1:]])
+        self.assertEqual(os.listdir(os.path.join(self.docs, "css")), [os.path.basename(changed["/css/print.css"])])
+
+    def test_optimized_images_replace_their_source(self):
+        cache = os.path.join(self.tmp.name, "cache")
+        write_file(os.path.join(cache, "a.png"), "small-a")
+        write_file(os.path.join(cache, "a.480w.png"), "a-480")
+        source = os.path.join(self.static, "images", "a.png")
+        image = {"width": 960, "height": 540, "file": os.path.join(cache, "a.png"), "hash": "1" * 64,
+                 "variants": [[os.path.join(cache, "a.480w.png"), 480, "2" * 64]]}
+        assets = {}
+        self.sync(assets=assets, images={source: image})
+        self.assertEqual(assets["/images/a.png"], "/images/a.1111111111.png")
+        self.assertEqual(assets["/images/a.480w.png"], "/images/a.480w.2222222222.png")
+        images_dir = os.path.join(self.docs, "images")
+        self.assertEqual(sorted(os.listdir(images_dir)), ["a.1111111111.png", "a.480w.2222222222.png"])
+        self.assertEqual(read_file(os.path.join(images_dir, "a.1111111111.png")), "small-a")
+
+        # dropping the optimization removes the variant along with the old name
+        self.sync()
+        self.assertEqual(os.listdir(images_dir), ["a.png"])
+        self.assertEqual(read_file(os.path.join(images_dir, "a.png")), "png-a")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json, unittest
+
+from markdown_ast import Block, parse_block, parse_markdown
+from markdown_enums import BlockType, TextType
+from renderers import render_html, render_plain_text, render_json
+from textnode import TextNode
+
+MARKDOWN = """# Title
+
+Some **bold** and a [link](/about) with ![alt](/a.png)
+
+```
+code _stays_ literal
+```
+
+> quoted
+> lines
+
+- one
+- _two_
+
+1. first
+2. second"""
+
+
+class TestMarkdownAst(unittest.TestCase):
+
+    def test_parse_markdown(self):
+        blocks = parse_markdown(MARKDOWN)
+        self.assertEqual([block.block_type for block in blocks], [
+            BlockType.HEADING, BlockType.PARAGRAPH, BlockType.CODE, BlockType.QUOTE,
+            BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST,
+        ])
+        self.assertEqual(blocks[0], Block(BlockType.HEADING, "Title", level=1, line=1))
+        self.assertEqual(blocks[1].children[3], TextNode("link", TextType.LINK, "/about"))
+        self.assertEqual(blocks[2].text, "code _stays_ literal\n")
+        self.assertEqual(blocks[3].text, "quoted\nlines")
+        self.assertEqual(blocks[4].children, [[TextNode("one", TextType.TEXT)], [TextNode("two", TextType.ITALIC)]])
+        self.assertEqual([block.line for block in blocks], [1, 3, 5, 9, 12, 15])
+
+    def test_parse_block_keeps_heading_text_literal(self):
+        self.assertEqual(parse_block("###   A _b_"), Block(BlockType.HEADING, "A _b_", level=3))
+        with self.assertRaises(Exception):
+            parse_block("not a heading", BlockType.HEADING)
+
+    def test_render_html(self):
+        self.assertEqual(
+            render_html(parse_markdown(MARKDOWN)).to_html(),
+            '<div><h1>Title</h1><p>Some <b>bold</b> and a <a href="/about">link</a> with <img alt="alt" src="/a.png"></img></p>'
+            '<pre><code>code _stays_ literal\n</code></pre><blockquote>quoted\nlines</blockquote>'
+            '<ul><li>one</li><li><i>two</i></li></ul><ol><li>first</li><li>second</li></ol></div>',
+        )
+
+    def test_render_plain_text(self):
+        self.assertEqual(
+            render_plain_text(parse_markdown(MARKDOWN)),
+            "Title\n\nSome bold and a link with alt\n\ncode _stays_ literal\n\n\nquoted\nlines\n\none\ntwo\n\nfirst\nsecond",
+        )
+
+    def test_render_json(self):
+        data = json.loads(render_json(parse_markdown(MARKDOWN)))
+        self.assertEqual(data[0], {"type": "heading", "line": 1, "level": 1, "text": "Title"})
+        self.assertEqual(data[1]["children"][3], {"type": "link", "text": "link", "url": "/about"})
+        self.assertEqual(data[5]["items"], [[{"type": "text", "text": "first"}], [{"type": "text", "text": "second"}]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import os, tempfile, unittest
+
+from page_io import atomic_write, read_text, write_text
+
+
+class TestPageIO(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_and_read(self):
+        self.assertEqual(write_text(self.path, "<p>e</p>")[0], 8)
+        text, size, _ = read_text(self.path)
+        self.assertEqual((text, size), ("<p>e</p>", 8))
+        self.assertEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_failed_write_keeps_old_file(self):
+        write_text(self.path, "old")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as f:
+                f.write("half a page")
+                raise RuntimeError("render failed")
+        self.assertEqual(read_text(self.path)[0], "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["page.html"])
+
+if __name__ == "__main__":
+    unittest.main()
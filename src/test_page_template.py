@@ -0,0 +1,112 @@
+import os, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from page_template import PageTemplate, load_template, find_template, template_dependencies
+from markdown_conversion import generate_pages_recursive, breadcrumb_nav
+from url_rewrite import UrlRewriter
+from test_support import read_file, write_file
+
+
+class TestPageTemplate(unittest.TestCase):
+
+    def test_segments(self):
+        template = PageTemplate("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(
+            template.segments,
+            [(False, "<title>"), (True, "Title"), (False, "</title>"), (True, "Content"), (False, "!")],
+        )
+        self.assertEqual(template.placeholders(), ["Title", "Content"])
+
+    def test_render(self):
+        template = PageTemplate("<h1>{{ Title }}</h1><p>{{ Date }}</p>")
+        self.assertEqual(template.render({"Title": "Hi", "Date": "2024-01-01"}), "<h1>Hi</h1><p>2024-01-01</p>")
+
+    def test_missing_placeholder_is_kept(self):
+        template = PageTemplate("{{ Title }} {{ Unknown }}")
+        self.assertEqual(template.render({"Title": "Hi"}), "Hi {{ Unknown }}")
+
+    def test_iterable_values_are_streamed(self):
+        template = PageTemplate("<article>{{ Content }}</article>")
+        chunks = list(template.iter_render({"Content": iter(["<p>", "x", "</p>"])}))
+        self.assertEqual(chunks, ["<article>", "<p>", "x", "</p>", "</article>"])
+
+    def test_map_source_leaves_placeholders(self):
+        template = PageTemplate('<a href="/">{{ Title }}</a>').map_source(str.upper)
+        self.assertEqual(template.render({"TITLE": "x"}), '<A HREF="/">x</A>')
+
+    def test_rewrite_tags_holding_placeholders(self):
+        source = ('<img src="/a.png" alt="{{ Title }}"><link href="/index.css" data-page="{{ Title }}">'
+                  '<a href="/{{ Slug }}">{{ Title }}</a>')
+        rewriter = UrlRewriter("/bd", assets={"/index.css": "/index.abc.css"})
+        template = PageTemplate(source).map_source(rewriter.rewrite_html)
+        self.assertEqual(template.render({"Title": "T", "Slug": "s"}),
+                         '<img src="/bd/a.png" alt="T"><link href="/bd/index.abc.css" data-page="T"><a href="/bd/s">T</a>')
+
+
+class TestTemplateFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, "<main>{{ Nav }}{{ Content }}</main>")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome **home**")
+        write_file(os.path.join(self.content, "blog", "template.html"), "<blog>{{ Title }}|{{ Description }}</blog>")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nFirst _para_")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_load_template_is_cached(self):
+        first = load_template(self.template)
+        self.assertIs(load_template(self.template), first)
+        write_file(self.template, "changed {{ Content }} template", bump_mtime=True)
+        self.assertIsNot(load_template(self.template), first)
+
+    def test_partials(self):
+        write_file(os.path.join(self.root, "partials", "head.html"), "<head>{{> nav/links }}{{ Title }}</head>\n")
+        write_file(os.path.join(self.root, "partials", "nav", "links.html"), "<a>home</a>")
+        write_file(self.template, "{{> head }}{{ Content }}")
+        template = load_template(self.template)
+        self.assertEqual(template.render({"Title": "T", "Content": "C"}), "<head><a>home</a>T</head>C")
+        self.assertEqual(template_dependencies(self.template), [
+            self.template, os.path.join(self.root, "partials", "head.html"), os.path.join(self.root, "partials", "nav", "links.html"),
+        ])
+
+        # an edited partial is picked up without touching the template
+        write_file(os.path.join(self.root, "partials", "nav", "links.html"), "<a>start</a>", bump_mtime=True)
+        self.assertEqual(load_template(self.template).render({"Title": "T", "Content": "C"}), "<head><a>start</a>T</head>C")
+
+    def test_partial_errors(self):
+        write_file(self.template, "{{> missing }}")
+        with self.assertRaisesRegex(Exception, "partial 'missing' not found"):
+            load_template(self.template)
+        write_file(os.path.join(self.root, "partials", "loop.html"), "{{> loop }}")
+        write_file(self.template, "{{> loop }}", bump_mtime=True)
+        with self.assertRaisesRegex(Exception, "includes itself"):
+            load_template(self.template)
+
+    def test_find_template_override(self):
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.assertEqual(find_template(post, self.content, self.template), os.path.join(self.content, "blog", "template.html"))
+        index = os.path.join(self.content, "index.md")
+        self.assertEqual(find_template(index, self.content, self.template), self.template)
+
+    def test_breadcrumb_nav(self):
+        self.assertEqual(breadcrumb_nav(os.path.join(self.content, "index.md"), self.content), "<nav>Home</nav>")
+        self.assertEqual(
+            breadcrumb_nav(os.path.join(self.content, "blog", "post", "index.md"), self.content),
+            '<nav><a href="/">Home</a> / blog / post</nav>',
+        )
+
+    def test_generate_with_override_and_placeholders(self):
+        docs = os.path.join(self.root, "docs")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, docs)
+        self.assertEqual(read_file(os.path.join(docs, "index.html")), "<main><nav>Home</nav><div><h1>Home</h1><p>Welcome <b>home</b></p></div></main>")
+        self.assertEqual(read_file(os.path.join(docs, "blog", "post", "index.html")), "<blog>Post|First para</blog>")
+
+if __name__ == "__main__":
+    unittest.main()
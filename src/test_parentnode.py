@@ -1,4 +1,4 @@
-import unittest
+import io, unittest
 
 from parentnode import ParentNode
 from leafnode import LeafNode
@@ -30,5 +30,30 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             node.to_html()
 
+    def test_eq_compares_children(self):
+        node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(node, ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")]))
+        self.assertNotEqual(node, ParentNode("p", [LeafNode("i", "bold"), LeafNode(None, " text")]))
+        self.assertNotEqual(LeafNode("p", "x"), ParentNode("p", None))
+
+    def test_iter_html_streams_chunks(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("b", "one")]), ParentNode("li", [LeafNode(None, "two")])])
+        self.assertEqual(
+            list(node.iter_html()),
+            ["<ul>", "<li>", "<b>one</b>", "</li>", "<li>", "two", "</li>", "</ul>"],
+        )
+
+    def test_write_to_matches_to_html(self):
+        node = ParentNode("div", [LeafNode("p", "text", {"class": "lead"}), ParentNode("span", [LeafNode(None, "x")])])
+        out = io.StringIO()
+        node.write_to(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_deep_tree_to_html(self):
+        node = LeafNode("b", "leaf")
+        for _ in range(200):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 200 + "<b>leaf</b>" + "</span>" * 200)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
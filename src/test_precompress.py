@@ -0,0 +1,91 @@
+import gzip, os, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from precompress import precompress_site, remove_precompressed
+from test_support import write_file
+
+
+class TestPrecompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = self.tmp.name
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        write_file(self.page, "<p>post</p>\n" * 200)
+        write_file(os.path.join(self.docs, "index.css"), "body {}")
+        write_file(os.path.join(self.docs, "data.json.txt"), "x" * 2000)
+        write_file(os.path.join(self.docs, "archive.tar.gz"), "not really gzip")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def precompress(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            return precompress_site(self.docs, **kwargs)
+
+    def test_compresses_large_files_of_listed_types(self):
+        stats = self.precompress()
+        self.assertEqual(stats.compressed_files, 2)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>post</p>\n" * 200)
+        # too small to be worth it
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "archive.tar.gz")))
+
+        stats = self.precompress(extensions=[".css"], min_size=0)
+        self.assertEqual(stats.compressed_files, 1)
+        self.assertEqual(stats.removed_files, 2)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    def test_unchanged_files_are_skipped_and_orphans_removed(self):
+        self.precompress()
+        stats = self.precompress(jobs=2)
+        self.assertEqual((stats.compressed_files, stats.skipped_files), (0, 2))
+
+        write_file(self.page, "<p>edited</p>\n" * 200)
+        os.utime(self.page, ns=(0, os.stat(self.page + ".gz").st_mtime_ns + 1))
+        stats = self.precompress()
+        self.assertEqual((stats.compressed_files, stats.skipped_files), (1, 1))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>edited</p>\n" * 200)
+
+        os.remove(self.page)
+        stats = self.precompress()
+        self.assertEqual(stats.removed_files, 1)
+        self.assertEqual(os.listdir(os.path.dirname(self.page)), [])
+
+    def test_copies_removed_when_turned_off(self):
+        self.precompress()
+        orphan = os.path.join(self.docs, "feed.xml.gz")
+        write_file(orphan, "left from a removed feed")
+        with redirect_stdout(StringIO()):
+            self.assertEqual(remove_precompressed(self.docs), 3)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "archive.tar.gz")))
+    def test_shipped_static_copies_are_kept(self):
+        # static/data.json.gz and its source both come from the static tree
+        shipped = os.path.join(self.docs, "data.json.gz")
+        write_file(os.path.join(self.docs, "data.json"), "{}" * 1000)
+        write_file(shipped, "shipped as is")
+        keep = [shipped, os.path.join(self.docs, "data.json")]
+        stats = self.precompress(keep=keep)
+        # data.json is only compressed when that would not replace the shipped copy
+        self.assertEqual((stats.compressed_files, stats.removed_files), (2, 0))
+        write_file(os.path.join(self.docs, "site.js"), "x" * 2000)
+        keep.append(os.path.join(self.docs, "site.js"))
+        self.assertEqual(self.precompress(keep=keep).compressed_files, 1)
+        with redirect_stdout(StringIO()):
+            self.assertEqual(remove_precompressed(self.docs, keep=keep), 3)
+        with open(shipped) as f:
+            self.assertEqual(f.read(), "shipped as is")
+
+        # without keep it would have been taken for a generated copy
+        with redirect_stdout(StringIO()):
+            self.assertEqual(remove_precompressed(self.docs), 1)
+        self.assertFalse(os.path.exists(shipped))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json, os, tempfile, unittest
+
+from build_manifest import BuildManifest
+from fragment_cache import close_fragment_caches
+from markdown_conversion import generate_pages_recursive
+from url_rewrite import page_url
+from search_index import stem, tokenize, count_terms, build_search_shards, write_search_index, site_search_pages
+from test_support import silence_output, write_file
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+
+    def tearDown(self):
+        close_fragment_caches()
+        self.tmp.cleanup()
+
+    def test_tokenize_stems_and_drops_stopwords(self):
+        self.assertEqual([stem(word) for word in ["links", "linked", "linking", "stories", "class", "running"]],
+                         ["link", "link", "link", "story", "class", "run"])
+        self.assertEqual(list(tokenize("The Hobbits of the Shire, walking!")), ["hobbit", "shire", "walk"])
+        self.assertEqual(count_terms(["Elves and elves", "an elf"]), {"elf": 1, "elve": 2})
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join(self.docs, "index.html"), self.docs), "/")
+        self.assertEqual(page_url(os.path.join(self.docs, "blog", "index.html"), self.docs, "/site"), "/site/blog/")
+        self.assertEqual(page_url(os.path.join(self.docs, "about.html"), self.docs), "/about.html")
+
+    def test_shards_and_incremental_writes(self):
+        pages = [("/b/", "B", {"hobbit": 1, "ring": 3}), ("/a/", "A", {"ring": 1})]
+        page_list, shards = build_search_shards(pages)
+        self.assertEqual(page_list, [["/a/", "A"], ["/b/", "B"]])
+        self.assertEqual(shards, {"ho": {"hobbit": [[1, 1]]}, "ri": {"ring": [[1, 3], [0, 1]]}})
+
+        self.assertEqual(write_search_index(pages, self.docs), (3, 0, 0))
+        search_dir = os.path.join(self.docs, "search")
+        with open(os.path.join(search_dir, "index.json")) as f:
+            self.assertEqual(json.load(f)["shards"], ["ho", "ri"])
+        self.assertEqual(write_search_index(pages, self.docs), (0, 3, 0))
+        self.assertEqual(write_search_index(pages[1:], self.docs), (2, 0, 1))
+        self.assertEqual(sorted(os.listdir(search_dir)), ["index.json", "ri.json"])
+        self.assertEqual(write_search_index(None, self.docs), (0, 0, 2))
+        self.assertFalse(os.path.exists(search_dir))
+
+    def test_terms_are_recorded_with_and_without_fragment_cache(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        write_file(template, "{{ Content }}")
+        write_file(os.path.join(content, "index.md"), "# Home\n\nWelcome, **travellers**, to [Rivendell](/rivendell/)")
+        write_file(os.path.join(content, "rivendell", "index.md"), "# Rivendell\n\n- elves\n- travelling\n\n```\nrings\n```")
+
+        recorded = []
+        for fragment_cache in [None, os.path.join(self.tmp.name, "fragments.sqlite")] * 2:
+            manifest = BuildManifest()
+            generate_pages_recursive(content, template, self.docs, "/site/", manifest=manifest, fragment_cache=fragment_cache,
+                                     search=True)
+            recorded.append(sorted(site_search_pages(manifest, self.docs, "/site")))
+        self.assertEqual(recorded[0], [
+            ("/site/", "Home", {"home": 1, "rivendell": 1, "traveller": 1, "welcome": 1}),
+            ("/site/rivendell/", "Rivendell", {"elve": 1, "ring": 1, "rivendell": 1, "travell": 1}),
+        ])
+        # the last build is served from the fragment cache
+        self.assertEqual(recorded, [recorded[0]] * 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os, tempfile, unittest
+
+from link_index import LinkIndex, site_outputs
+from serve import SiteWatcher, snapshot
+from test_support import read_file, silence_output, write_file
+
+
+class TestSiteWatcher(unittest.TestCase):
+
+    def setUp(self):
+        silence_output(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<t>{{ Content }}</t>", bump_mtime=True)
+        write_file(os.path.join(self.content, "index.md"), "# Home", bump_mtime=True)
+        write_file(os.path.join(self.content, "about", "index.md"), "# About", bump_mtime=True)
+        write_file(os.path.join(self.static, "site.css"), "a {}", bump_mtime=True)
+        self.watcher = SiteWatcher(
+            content_dir=self.content, static_dir=self.static, template_path=self.template, dest_dir=self.docs,
+            page_manifest_path=os.path.join(root, "pages.json"), static_manifest_path=os.path.join(root, "static.json"),
+            link_index_path=os.path.join(root, "links.sqlite"),
+        )
+        self.watcher.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot(self):
+        self.assertEqual(sorted(snapshot([self.static, self.template])), [os.path.join(self.static, "site.css"), self.template])
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_edited_page_is_rebuilt_alone(self):
+        about = os.path.join(self.docs, "about", "index.html")
+        write_file(about, "marker", bump_mtime=True)
+        write_file(os.path.join(self.content, "index.md"), "# Home again", bump_mtime=True)
+        self.assertEqual(self.watcher.poll(), [os.path.join(self.content, "index.md")])
+        self.assertEqual(read_file(os.path.join(self.docs, "index.html")), "<t><div><h1>Home again</h1></div></t>")
+        self.assertEqual(read_file(about), "marker")
+
+    def test_rebuilt_page_links_reach_the_link_index(self):
+        index = os.path.join(self.content, "index.md")
+        write_file(index, "# Home\n\n[x](/does-not-exist/)", bump_mtime=True)
+        self.watcher.poll()
+        self.watcher.save()
+        # what the next main.py build sees
+        link_index = LinkIndex(self.watcher.link_index_path, self.docs)
+        pages = {source_path: entry["output"] for source_path, entry in self.watcher.page_manifest.entries.items()}
+        link_index.check(pages, site_outputs(self.watcher.page_manifest, self.watcher.static_manifest))
+        self.assertEqual(link_index.broken(), [(index, 3, "/does-not-exist/")])
+        link_index.close()
+
+    def test_template_change_rebuilds_all_pages(self):
+        write_file(self.template, "<u>{{ Content }}</u>", bump_mtime=True)
+        self.watcher.poll()
+        self.assertEqual(read_file(os.path.join(self.docs, "about", "index.html")), "<u><div><h1>About</h1></div></u>")
+
+    def test_added_and_removed_pages(self):
+        write_file(os.path.join(self.content, "new.md"), "# New", bump_mtime=True)
+        self.watcher.poll()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "new.html")))
+        os.remove(os.path.join(self.content, "new.md"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "new.html")))
+
+    def test_static_changes(self):
+        write_file(os.path.join(self.static, "site.css"), "b {}", bump_mtime=True)
+        write_file(os.path.join(self.static, "img", "x.png"), "png", bump_mtime=True)
+        self.watcher.poll()
+        self.assertEqual(read_file(os.path.join(self.docs, "site.css")), "b {}")
+        self.assertEqual(read_file(os.path.join(self.docs, "img", "x.png")), "png")
+        os.remove(os.path.join(self.static, "site.css"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "site.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import json, os, tempfile, unittest
+import xml.etree.ElementTree as ElementTree
+from contextlib import redirect_stdout
+from io import StringIO
+
+from markdown_conversion import collect_pages
+from site_metadata import read_page_metadata, collect_metadata, generate_aggregates, remove_aggregates
+from url_rewrite import UrlRewriter
+from test_support import write_file
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+class TestSiteMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.state = os.path.join(self.tmp.name, "aggregates.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home & Garden\n\nWelcome.")
+        for number in range(3):
+            path = os.path.join(self.content, "blog", f"post{number}", "index.md")
+            write_file(path, f"# Post {number}\n\n[< Back](/)\n\nPost **{number}** text.")
+            os.utime(path, (1700000000 + number * 86400, 1700000000 + number * 86400))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def aggregates(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            metadata = collect_metadata(collect_pages(self.content, self.docs), self.docs)
+        with redirect_stdout(StringIO()) as output:
+            outputs = generate_aggregates(metadata, self.content, self.docs, self.template, self.state, "/site/",
+                                          UrlRewriter("/site/"), **kwargs)
+        return outputs, output.getvalue()
+
+    def test_read_page_metadata(self):
+        source = os.path.join(self.content, "blog", "post1", "index.md")
+        metadata = read_page_metadata(source, os.path.join(self.docs, "blog", "post1", "index.html"), self.docs)
+        self.assertEqual(metadata["url"], "/blog/post1/")
+        self.assertEqual(metadata["title"], "Post 1")
+        # the back link is not a summary
+        self.assertEqual(metadata["summary"], "Post 1 text.")
+        self.assertEqual(metadata["updated"], "2023-11-15T22:13:20Z")
+
+    def test_metadata_cache(self):
+        cache = os.path.join(self.tmp.name, "metadata.json")
+        with redirect_stdout(StringIO()):
+            pages = collect_pages(self.content, self.docs)
+        first = collect_metadata(pages, self.docs, cache_path=cache)
+        self.assertEqual(collect_metadata(pages, self.docs), first)
+
+        # unchanged pages come from the cache, without reading the source
+        with open(cache) as f:
+            data = json.load(f)
+        source = pages[0][0]
+        data["pages"][source]["metadata"]["title"] = "Cached"
+        with open(cache, "w") as f:
+            json.dump(data, f)
+        self.assertEqual(collect_metadata(pages, self.docs, cache_path=cache)[0]["title"], "Cached")
+
+        write_file(source, "# Home again")
+        self.assertEqual(collect_metadata(pages, self.docs, cache_path=cache)[0]["title"], "Home again")
+        collect_metadata(pages[1:], self.docs, cache_path=cache)
+        with open(cache) as f:
+            self.assertNotIn(source, json.load(f)["pages"])
+
+    def test_sitemap_feed_and_listing(self):
+        outputs, _ = self.aggregates(site_url="https://example.com/", page_size=2)
+        self.assertEqual([os.path.relpath(path, self.docs) for path in outputs], [
+            "sitemap.xml", "feed.xml", os.path.join("blog", "index.html"), os.path.join("blog", "page", "2", "index.html"),
+        ])
+        sitemap = ElementTree.parse(os.path.join(self.docs, "sitemap.xml")).getroot()
+        self.assertEqual(len(sitemap), 4)
+        self.assertEqual(sitemap[0][0].text, "https://example.com/site/")
+
+        feed = ElementTree.parse(os.path.join(self.docs, "feed.xml")).getroot()
+        self.assertEqual(feed.find(f"{ATOM}title").text, "Home & Garden")
+        entries = feed.findall(f"{ATOM}entry")
+        self.assertEqual([entry.find(f"{ATOM}title").text for entry in entries], ["Post 2", "Post 1", "Post 0"])
+        self.assertEqual(entries[0].find(f"{ATOM}id").text, "https://example.com/site/blog/post2/")
+
+        with open(outputs[2], "r") as f:
+            first_page = f.read()
+        self.assertIn('<a href="/site/blog/post2/">Post 2</a>', first_page)
+        self.assertIn('<a href="/site/blog/page/2/" rel="next">Older posts</a>', first_page)
+        self.assertNotIn("Post 0", first_page)
+
+    def test_aggregates_follow_metadata_changes(self):
+        outputs, _ = self.aggregates(page_size=2)
+        self.assertEqual(len(outputs), 2)
+        self.assertEqual(self.aggregates(page_size=2), (outputs, "Skipping unchanged aggregate pages\n"))
+
+        write_file(os.path.join(self.content, "blog", "post0", "index.md"), "# Renamed\n\nText.")
+        _, output = self.aggregates(page_size=2)
+        self.assertIn("Generating blog listing", output)
+
+        outputs, _ = self.aggregates(page_size=5)
+        self.assertEqual(len(outputs), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "page", "2", "index.html")))
+
+        with redirect_stdout(StringIO()):
+            remove_aggregates(self.state)
+        self.assertFalse(os.path.exists(outputs[0]))
+        self.assertFalse(os.path.exists(self.state))
+
+if __name__ == "__main__":
+    unittest.main()
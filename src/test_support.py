@@ -0,0 +1,37 @@
+import os, time
+from contextlib import redirect_stdout
+from io import StringIO
+
+# helpers shared by the test modules; there are no tests in here
+
+
+def write_file(path, text, bump_mtime=False):
+    """
+    Writes text to path, creating its directory first.
+
+    :param bump_mtime: Set the mtime a second ahead, so a change is visible
+        to mtime checks even on filesystems with coarse timestamps
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    if bump_mtime:
+        stamp = time.time_ns() + 10**9
+        os.utime(path, ns=(stamp, stamp))
+
+def read_file(path):
+    with open(path, "r") as f:
+        return f.read()
+
+def silence_output(test):
+    """
+    Captures what the build prints for the rest of a test, and returns the
+    buffer it goes to.
+
+    :param test: The running TestCase, usually called from setUp
+    """
+    output = StringIO()
+    redirect = redirect_stdout(output)
+    redirect.__enter__()
+    test.addCleanup(redirect.__exit__, None, None, None)
+    return output
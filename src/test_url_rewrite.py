@@ -0,0 +1,81 @@
+import unittest
+
+from leafnode import LeafNode
+from markdown_conversion import markdown_to_html_node
+from url_rewrite import UrlRewriter, url_rewriter, rewrite_css_urls
+
+
+class TestUrlRewrite(unittest.TestCase):
+
+    def setUp(self):
+        self.rewriter = UrlRewriter("site")
+
+    def test_rewrite_url(self):
+        self.assertEqual(self.rewriter.rewrite_url("/blog/"), "/site/blog/")
+        self.assertEqual(self.rewriter.rewrite_url("//cdn.example.com/x.js"), "//cdn.example.com/x.js")
+        self.assertEqual(self.rewriter.rewrite_url("https://example.com/"), "https://example.com/")
+        self.assertEqual(self.rewriter.rewrite_url("about"), "about")
+
+    def test_basepath_slashes_are_normalized(self):
+        self.assertEqual(UrlRewriter("/site/").rewrite_url("/x"), "/site/x")
+        self.assertIsNone(url_rewriter("/"))
+
+    def test_rewrite_props(self):
+        node = LeafNode("img", "", {"src": "/a.png", "alt": "/not-a-url", "srcset": "/a.png 1x, /a@2x.png 2x"})
+        self.assertEqual(
+            node.to_html(self.rewriter),
+            '<img alt="/not-a-url" src="/site/a.png" srcset="/site/a.png 1x, /site/a@2x.png 2x"></img>',
+        )
+
+    def test_attributes_are_configurable(self):
+        rewriter = UrlRewriter("site", ["data-href"])
+        node = LeafNode("a", "x", {"href": "/a", "data-href": "/b"})
+        self.assertEqual(node.to_html(rewriter), '<a data-href="/site/b" href="/a">x</a>')
+
+    def test_fingerprinted_assets(self):
+        assets = {"/index.css": "/index.abc.css", "/a.png": "/a.def.png"}
+        self.assertEqual(UrlRewriter("/", assets=assets).rewrite_url("/index.css?v=1"), "/index.abc.css?v=1")
+        rewriter = UrlRewriter("site", assets=assets)
+        self.assertEqual(rewriter.rewrite_url("/index.css"), "/site/index.abc.css")
+        self.assertEqual(rewriter.rewrite_url("/other.css"), "/site/other.css")
+        self.assertEqual(rewriter.rewrite_value("srcset", "/a.png 1x, /b.png 2x"), "/site/a.def.png 1x, /site/b.png 2x")
+        self.assertNotEqual(rewriter.key(), UrlRewriter("site").key())
+        self.assertIsNotNone(url_rewriter("/", assets=assets))
+
+    def test_css_urls(self):
+        assets = {"/images/a.png": "/images/a.abc.png", "/fonts/f.woff2": "/fonts/f.def.woff2"}
+        css = ("a { background: url('../images/a.png#top') } b { src: url( /fonts/f.woff2 ) } "
+               "c { background: url(data:image/png;base64,AA) } d { background: url(https://cdn/images/a.png) } "
+               "e { background: url(missing.png) }")
+        self.assertEqual(rewrite_css_urls(css, "/css/site.css", assets), (
+            "a { background: url('../images/a.abc.png#top') } b { src: url(/fonts/f.def.woff2) } "
+            "c { background: url(data:image/png;base64,AA) } d { background: url(https://cdn/images/a.png) } "
+            "e { background: url(missing.png) }"))
+
+    def test_optimized_images_get_their_size(self):
+        images = {"/a.png": {"width": 960, "height": 540, "srcset": "/a.480w.png 480w, /a.png 960w"}}
+        rewriter = UrlRewriter("site", assets={"/a.480w.png": "/a.480w.abc.png"}, images=images)
+        self.assertEqual(
+            LeafNode("img", "", {"src": "/a.png", "alt": "a"}).to_html(rewriter),
+            '<img alt="a" height="540" src="/site/a.png" srcset="/site/a.480w.abc.png 480w, /site/a.png 960w" width="960"></img>',
+        )
+        self.assertEqual(LeafNode("a", "x", {"src": "/a.png"}).to_html(rewriter), '<a src="/site/a.png">x</a>')
+        self.assertNotEqual(rewriter.key(), UrlRewriter("site", assets={"/a.480w.png": "/a.480w.abc.png"}).key())
+
+    def test_rewrite_html_only_touches_tags(self):
+        html = '<link href="/index.css" rel="stylesheet" />\n<p>use href="/x"</p><script src=\'/a.js\'></script>'
+        self.assertEqual(
+            self.rewriter.rewrite_html(html),
+            '<link href="/site/index.css" rel="stylesheet" />\n<p>use href="/x"</p><script src=\'/site/a.js\'></script>',
+        )
+
+    def test_code_blocks_are_not_rewritten(self):
+        md = "[home](/)\n\n```\n<a href=\"/x\">\n```\n\n`src=\"/y\"`"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(self.rewriter),
+            '<div><p><a href="/site/">home</a></p><pre><code><a href="/x">\n</code></pre>'
+            '<p><code>src="/y"</code></p></div>',
+        )
+
+if __name__ == "__main__":
+    unittest.main()
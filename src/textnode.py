@@ -1,4 +1,6 @@
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -8,6 +10,8 @@ class TextNode():
         return self.text
 
     def __eq__(self, other):
+        if not isinstance(other, TextNode):
+            return NotImplemented
         return self.text == other.text \
             and self.text_type == other.text_type \
             and self.url == other.url
@@ -0,0 +1,124 @@
+import os, posixpath, re
+from build_manifest import context_hash
+
+# attributes holding a URL that is rewritten by default
+URL_ATTRIBUTES = ("href", "src", "srcset")
+TAG_PATTERN = re.compile(r"<[A-Za-z][^>]*>")
+ATTRIBUTE_PATTERN = re.compile(r"""(\s)([\w:-]+)(\s*=\s*)("[^"]*"|'[^']*')""")
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(["']?)([^"')\s]+)\1\s*\)""")
+
+class UrlRewriter():
+    """
+    Rewrites site-absolute URLs ("/...", but not protocol-relative "//..."):
+    fingerprinted static assets are replaced by their hashed names from
+    `assets`, then the basepath the site is published under is prefixed.
+    <img> elements showing an optimized image from `images` also get its
+    width, height and srcset.
+
+    It works on markup rather than text: node props as they are serialized
+    and the attributes inside tags of template literals, so text content
+    such as code samples is never touched. Only the attributes listed in
+    `attributes` are rewritten; srcset values are rewritten per candidate.
+    """
+
+    def __init__(self, basepath="/", attributes=URL_ATTRIBUTES, assets=None, images=None):
+        self.basepath = basepath
+        self.prefix = "/" + basepath.strip("/") if basepath.strip("/") else ""
+        self.attributes = frozenset(attributes)
+        # {"/index.css": "/index.<hash>.css"}
+        self.assets = assets or {}
+        # {"/images/a.png": {"width": 960, "height": 540, "srcset": ...}}
+        self.images = images or {}
+        self.assets_hash = context_hash([self.assets, self.images]) if self.assets or self.images else ""
+
+    def key(self):
+        """
+        Returns a string identifying the rewrite, for use in cache keys.
+        """
+        return f"{self.prefix} {','.join(sorted(self.attributes))} {self.assets_hash}"
+
+    def rewrite_url(self, url):
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        if self.assets:
+            end = len(url)
+            for separator in "?#":
+                if separator in url:
+                    end = min(end, url.index(separator))
+            url = self.assets.get(url[:end], url[:end]) + url[end:]
+        return self.prefix + url
+
+    def rewrite_value(self, name, value):
+        if name not in self.attributes:
+            return value
+        if name == "srcset":
+            return ", ".join(self.rewrite_candidate(candidate) for candidate in value.split(","))
+        return self.rewrite_url(value)
+
+    def rewrite_candidate(self, candidate):
+        # a srcset candidate is a URL optionally followed by a descriptor
+        url, _, descriptor = candidate.strip().partition(" ")
+        return f"{self.rewrite_url(url)} {descriptor}" if descriptor else self.rewrite_url(url)
+
+    def rewrite_props(self, props, tag=None):
+        """
+        Returns props with its URL attributes rewritten.
+        """
+        if tag == "img" and props.get("src") in self.images:
+            props = {**self.images[props["src"]], **props}
+        return {name: self.rewrite_value(name, value) for name, value in props.items()}
+
+    def rewrite_html(self, html):
+        """
+        Rewrites the URL attributes of every tag in an HTML fragment, leaving
+        the text between tags as it is.
+        """
+        return TAG_PATTERN.sub(lambda tag: ATTRIBUTE_PATTERN.sub(self.rewrite_attribute, tag.group()), html)
+
+    def rewrite_attribute(self, match):
+        space, name, equals, quoted = match.groups()
+        value = self.rewrite_value(name.lower(), quoted[1:-1])
+        return f"{space}{name}{equals}{quoted[0]}{value}{quoted[0]}"
+
+def url_rewriter(basepath, attributes=URL_ATTRIBUTES, assets=None, images=None):
+    """
+    Returns the UrlRewriter for basepath, the fingerprinted assets and the
+    optimized images, or None when the site is served from the root
+    without either and URLs are left alone.
+    """
+    if basepath.strip("/") == "" and not assets and not images:
+        return None
+    return UrlRewriter(basepath, attributes, assets, images)
+
+def rewrite_css_urls(css, css_url, assets):
+    """
+    Replaces the url(...) references of a stylesheet served at css_url
+    that point at fingerprinted assets with their hashed names. Relative
+    references stay relative: fingerprinting keeps a file in its
+    directory, so only the last path segment changes.
+
+    :param assets: {url: fingerprinted url} of the static assets
+    """
+    def replace(match):
+        quote, url = match.groups()
+        path = re.match(r"[^?#]*", url).group()
+        if not path or path.startswith("//") or ":" in path.split("/")[0]:
+            return match.group()
+        target = path if path.startswith("/") else posixpath.normpath(posixpath.join(posixpath.dirname(css_url), path))
+        if target not in assets:
+            return match.group()
+        directory = path[:path.rindex("/") + 1] if "/" in path else ""
+        return f"url({quote}{directory}{posixpath.basename(assets[target])}{url[len(path):]}{quote})"
+    return CSS_URL_PATTERN.sub(replace, css)
+
+def page_url(output_path, dest_dir, prefix=""):
+    """
+    Returns the site URL of a generated page, e.g. docs/blog/index.html ->
+    /blog/, with prefix (the basepath) in front.
+    """
+    path = os.path.relpath(output_path, dest_dir).replace(os.sep, "/")
+    if path == "index.html":
+        path = ""
+    elif path.endswith("/index.html"):
+        path = path[:-len("index.html")]
+    return f"{prefix}/{path}"
@@ -0,0 +1,149 @@
+// Client for the search index written by `main.py --search` (see
+// src/search_index.py). Include it on a page with a search box:
+//
+//   <input type="search" data-search />
+//   <ol data-search-results></ol>
+//   <script src="/search.js" defer></script>
+//
+// index.json (the page list) is fetched on the first query; a postings
+// shard is fetched only when a query has a term in it, and kept.
+(function () {
+  "use strict";
+
+  var INDEX_VERSION = 1;
+  var STOPWORDS = new Set((
+    "a about above after again against all am an and any are as at be because been before being below between both but " +
+    "by can did do does doing down during each few for from further had has have having he her here hers herself him " +
+    "himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or " +
+    "other our ours ourselves out over own same she should so some such than that the their theirs them themselves then " +
+    "there these they this those through to too under until up very was we were what when where which while who whom why " +
+    "will with you your yours yourself yourselves"
+  ).split(" "));
+  var SUFFIXES = [["ies", "y"], ["sses", "ss"], ["ing", ""], ["ed", ""], ["ly", ""], ["s", ""]];
+
+  // the same rules as search_index.stem
+  function stem(word) {
+    for (var i = 0; i < SUFFIXES.length; i++) {
+      var suffix = SUFFIXES[i][0], replacement = SUFFIXES[i][1];
+      if (word.endsWith(suffix) && word.length - suffix.length + replacement.length >= 3) {
+        if (suffix === "s" && (word.endsWith("ss") || word.endsWith("us") || word.endsWith("is"))) {
+          return word;
+        }
+        word = word.slice(0, word.length - suffix.length) + replacement;
+        var last = word[word.length - 1];
+        if ((suffix === "ing" || suffix === "ed") && last === word[word.length - 2] && "aeiouylsz".indexOf(last) === -1) {
+          word = word.slice(0, -1);
+        }
+        return word;
+      }
+    }
+    return word;
+  }
+
+  function tokenize(text) {
+    var words = text.toLowerCase().match(/[a-z0-9]+/g) || [];
+    return words.filter(function (word) {
+      return !STOPWORDS.has(word) && word.length >= 2 && word.length <= 30;
+    }).map(stem);
+  }
+
+  var script = document.currentScript;
+  // the index sits in search/ next to this script, which may be fingerprinted
+  var base = script ? script.src.replace(/[^\/]*$/, "search/") : "/search/";
+  var index = null;
+  var shards = {};
+
+  function fetchJson(name) {
+    return fetch(base + name).then(function (response) {
+      if (!response.ok) {
+        throw new Error("search index: " + response.status + " for " + name);
+      }
+      return response.json();
+    });
+  }
+
+  function loadIndex() {
+    if (!index) {
+      index = fetchJson("index.json").then(function (data) {
+        if (data.version !== INDEX_VERSION) {
+          throw new Error("search index: unsupported version " + data.version);
+        }
+        return data;
+      });
+    }
+    return index;
+  }
+
+  function loadShard(data, key) {
+    if (data.shards.indexOf(key) === -1) {
+      return Promise.resolve({});
+    }
+    if (!shards[key]) {
+      shards[key] = fetchJson(key + ".json");
+    }
+    return shards[key];
+  }
+
+  // resolves to [{url, title, score}], best first; pages must contain every term
+  function search(query) {
+    var terms = Array.from(new Set(tokenize(query)));
+    if (!terms.length) {
+      return Promise.resolve([]);
+    }
+    return loadIndex().then(function (data) {
+      return Promise.all(terms.map(function (term) {
+        return loadShard(data, term.slice(0, data.prefix)).then(function (shard) {
+          return shard[term] || [];
+        });
+      })).then(function (postingLists) {
+        var scores = null;
+        postingLists.forEach(function (postings) {
+          var weight = Math.log(1 + data.pages.length / (postings.length || 1));
+          var next = new Map();
+          postings.forEach(function (posting) {
+            if (scores === null || scores.has(posting[0])) {
+              next.set(posting[0], (scores ? scores.get(posting[0]) : 0) + posting[1] * weight);
+            }
+          });
+          scores = next;
+        });
+        return Array.from(scores.entries()).sort(function (a, b) {
+          return b[1] - a[1];
+        }).map(function (entry) {
+          var page = data.pages[entry[0]];
+          return { url: page[0], title: page[1], score: entry[1] };
+        });
+      });
+    });
+  }
+
+  function attach(input, list) {
+    var latest = 0;
+    input.addEventListener("input", function () {
+      var query = ++latest;
+      search(input.value).then(function (results) {
+        if (query !== latest) {
+          return;
+        }
+        list.textContent = "";
+        results.slice(0, 20).forEach(function (result) {
+          var item = document.createElement("li");
+          var link = document.createElement("a");
+          link.href = result.url;
+          link.textContent = result.title || result.url;
+          item.appendChild(link);
+          list.appendChild(item);
+        });
+      });
+    });
+  }
+
+  window.siteSearch = search;
+  document.addEventListener("DOMContentLoaded", function () {
+    var input = document.querySelector("[data-search]");
+    var list = document.querySelector("[data-search-results]");
+    if (input && list) {
+      attach(input, list);
+    }
+  });
+})();